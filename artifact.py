@@ -0,0 +1,144 @@
+"""Binary contract artifacts.
+
+An artifact stores an automaton (declarations, variable
+order, players, BDDs of `init`, `action`, `win`) and other
+named BDDs (for example `Inv`, unzipped actions, assumption
+stacks), as one shared node table. The layout is:
+
+  - `MAGIC` (4 bytes)
+  - version (`uint32`, little endian)
+  - length of header in bytes (`uint32`)
+  - header (JSON, UTF-8), padded with spaces to
+    a multiple of 4 bytes
+  - nodes (`int32` array of shape `(n, 3)`, little endian)
+    of rows `(bit, low, high)`, where `bit` indexes
+    `header['bits']`, and `low`, `high` are references
+    as described in `bdd.dump_nodes`
+
+Loading maps the node array to memory, so no formulas are
+parsed. The nodes can then be added to a BDD manager with
+`Artifact.load_automaton`, or evaluated directly with
+`Artifact.evaluate`, without a BDD manager.
+"""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import json
+import mmap
+import struct
+
+import numpy as np
+
+import serialization
+
+
+MAGIC = b'CMKR'
+VERSION = 1
+_PREFIX = struct.Struct('<4sII')
+
+
+def dump(fname, aut, roots=None):
+    """Write automaton `aut` and BDDs `roots` to file `fname`.
+
+    @param roots: `dict` that maps names (`str`) to BDDs
+    """
+    d = serialization.dump_automaton(aut, roots=roots)
+    nodes = d.pop('nodes')
+    levels = d['levels']
+    bits = sorted(levels, key=levels.get)
+    index = {bit: i for i, bit in enumerate(bits)}
+    table = np.array(
+        [(index[var], low, high) for var, low, high in nodes],
+        dtype='<i4').reshape(-1, 3)
+    header = dict(d, bits=bits, n_nodes=len(table))
+    s = json.dumps(header, sort_keys=True).encode('utf-8')
+    s += b' ' * (-len(s) % 4)
+    with open(fname, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, VERSION, len(s)))
+        f.write(s)
+        f.write(table.tobytes())
+
+
+class Artifact(object):
+    """Contract artifact, mapped to memory from a file."""
+
+    def __init__(self, fname):
+        self._file = open(fname, 'rb')
+        self._mmap = mmap.mmap(
+            self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n = _PREFIX.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(
+                'not a contract artifact: "{f}"'.format(f=fname))
+        if version != VERSION:
+            raise ValueError(
+                'unknown version: {v}'.format(v=version))
+        start = _PREFIX.size
+        self.header = json.loads(
+            self._mmap[start:start + n].decode('utf-8'))
+        self.nodes = np.frombuffer(
+            self._mmap, dtype='<i4',
+            count=3 * self.header['n_nodes'],
+            offset=start + n).reshape(-1, 3)
+        self._bits = _bit_indices(self.header)
+
+    def close(self):
+        self.nodes = None
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def roots(self):
+        """`dict` of references of the named BDDs."""
+        return self.header['roots']
+
+    def evaluate(self, ref, state):
+        """Return value of the BDD `ref` at `state`.
+
+        @param ref: reference, for example `self.roots[name]`
+        @param state: `dict` that maps variables to values
+        """
+        nodes = self.nodes
+        bits = self._bits
+        c = 0
+        while ref > 1:
+            c ^= ref & 1
+            i, low, high = nodes[(ref >> 1) - 1]
+            var, k = bits[i]
+            if (int(state[var]) >> k) & 1:
+                ref = int(high)
+            else:
+                ref = int(low)
+        return (c ^ ref) == 0
+
+    def load_automaton(self, aut):
+        """Add the BDDs to `aut.bdd`, return other roots.
+
+        See `serialization.load_automaton`.
+        """
+        d = dict(self.header)
+        bits = d.pop('bits')
+        d.pop('n_nodes')
+        d['nodes'] = [
+            (bits[i], int(low), int(high))
+            for i, low, high in self.nodes]
+        return serialization.load_automaton(d, aut)
+
+
+def _bit_indices(header):
+    """Return `list` that maps bit indices to `(var, k)`."""
+    of_bit = dict()
+    for var, d in header['vars'].items():
+        if d['type'] == 'bool':
+            of_bit[var] = (var, 0)
+            continue
+        for k, bit in enumerate(d.get('bitnames', ())):
+            of_bit[bit] = (var, k)
+    # `None` for bits of undeclared variables
+    return [of_bit.get(bit) for bit in header['bits']]
@@ -111,3 +111,96 @@ def assert_isomorphic_bdds(old_bdd, new_bdd, umap):
         b = umap[abs(w)]
         assert abs(p) == a, (v, a, p)
         assert abs(q) == b, (w, b, q)
+
+
+def dump_nodes(roots):
+    """Return table of the nodes reachable from `roots`.
+
+    Node references are integers: `2 * i + c`, where `i`
+    is the index of the node in the table plus one (`0` is
+    the terminal TRUE), and `c = 1` for complemented edges.
+    So `0` references TRUE, and `1` references FALSE.
+
+    Each entry of the table is a triple `(var, low, high)`.
+    Children precede their parents in the table, so
+    `load_nodes` can add the nodes in table order.
+    The table does not depend on the variable order.
+
+    @param roots: iterable of nodes
+    @return: `(nodes, refs)`, where `nodes` is the
+        `list` of triples, and `refs` the `list`
+        of references to `roots`
+    """
+    nodes = list()
+    index = dict()
+    refs = [_dump_node(u, nodes, index) for u in roots]
+    return nodes, refs
+
+
+def _dump_node(u, nodes, index):
+    """Add the nodes reachable from `u` to `nodes`, return reference.
+
+    Iterative, in post-order, so the depth of the BDD
+    is not limited by the recursion limit.
+
+    @type index: `dict` that maps `int(node)` of
+        noncomplemented nodes to index in `nodes` plus one
+    """
+    true = u.bdd.true
+    stack = [_regular(u)]
+    while stack:
+        z = stack[-1]
+        if z == true or int(z) in index:
+            stack.pop()
+            continue
+        # children of the noncomplemented node
+        low, high = z.low, z.high
+        todo = [
+            c for c in (_regular(low), _regular(high))
+            if c != true and int(c) not in index]
+        if todo:
+            stack.extend(todo)
+            continue
+        stack.pop()
+        nodes.append((z.var, _ref(low, index), _ref(high, index)))
+        index[int(z)] = len(nodes)
+    return _ref(u, index)
+
+
+def _regular(u):
+    """Return the noncomplemented node of `u`."""
+    if u.negated:
+        return ~ u
+    return u
+
+
+def _ref(u, index):
+    """Return reference of `u`, with its node in `index`."""
+    if u == u.bdd.true:
+        return 0
+    if u == u.bdd.false:
+        return 1
+    return 2 * index[int(_regular(u))] + int(u.negated)
+
+
+def load_nodes(nodes, refs, bdd):
+    """Return `list` of nodes in `bdd` for `refs` into `nodes`.
+
+    Inverse of `dump_nodes`. The variables of `nodes`
+    should be declared in `bdd`, in any order.
+    """
+    made = [bdd.true]
+    for var, low, high in nodes:
+        p = _node_of_ref(low, made)
+        q = _node_of_ref(high, made)
+        g = bdd.var(var)
+        r = bdd.apply('ite', g, q, p)
+        made.append(r)
+    return [_node_of_ref(r, made) for r in refs]
+
+
+def _node_of_ref(r, made):
+    u = made[r // 2]
+    if r % 2:
+        u = ~ u
+    return u
@@ -0,0 +1,61 @@
+"""Simplification of BDDs with respect to care sets.
+
+Within a care set `care`, the value of `u` outside `care`
+does not matter. The restrict operator returns a BDD `r`
+that equals `u` within `care`, often with fewer nodes.
+The functions below use `r` only in ways that give the
+same result as `u`, so they change the size of operands,
+not the results.
+
+
+Reference
+=========
+
+Olivier Coudert, Jean Christophe Madre
+    "A unified framework for the formal verification
+     of sequential circuits"
+    ICCAD, 1990
+"""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+try:
+    from dd import cudd
+except ImportError:
+    cudd = None
+
+
+def simplify(u, care, aut):
+    """Return BDD that equals `u` within `care`.
+
+    The result is not larger than `u`.
+    If `u` is not a CUDD BDD, then return `u`.
+    """
+    if cudd is None or not isinstance(u, cudd.Function):
+        return u
+    if care == aut.true or care == aut.false:
+        return u
+    r = cudd.restrict(u, care)
+    if len(r) < len(u):
+        return r
+    return u
+
+
+def implication(care, u, aut):
+    """Return `care => u`, simplifying `u` within `care`."""
+    return ~ care | simplify(u, care, aut)
+
+
+def conjunction(care, u, aut):
+    r"""Return `care /\ u`, simplifying `u` within `care`."""
+    return care & simplify(u, care, aut)
+
+
+def simplify_actions(names, care, aut):
+    """Return `dict` of `aut.action[name]` simplified within `care`.
+
+    @param care: state predicate
+    """
+    return {
+        name: simplify(aut.action[name], care, aut)
+        for name in names}
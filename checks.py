@@ -0,0 +1,120 @@
+"""Self-checks of solvers, enabled by level.
+
+Each check is registered with a level:
+
+  - `CHEAP`: checks of supports, and comparisons with
+    constants, which take time linear in the BDD
+  - `FULL`: comparisons of sets computed by the solver,
+    for example monotonicity of fixpoint iterates
+  - `PARANOID`: checks that recompute a result
+    in another way, and so cost as much as the computation
+
+A check runs if its level is at most the current level,
+see `set_level`. The default level is `PARANOID`,
+and `OFF` when Python runs with `-O`. For example:
+
+```
+checks.verify(checks.FULL, 'trap decreasing', lambda: q <= qold)
+```
+
+The time spent in each check is accumulated in `timings`,
+and reported by `format_timings`.
+"""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import contextlib
+import time
+
+
+OFF = 0
+CHEAP = 1
+FULL = 2
+PARANOID = 3
+LEVELS = dict(off=OFF, cheap=CHEAP, full=FULL, paranoid=PARANOID)
+_level = PARANOID if __debug__ else OFF
+# check name -> [calls, seconds]
+timings = dict()
+
+
+def set_level(level):
+    """Set the current level, return the previous one.
+
+    @param level: `int` or key of `LEVELS`
+    """
+    global _level
+    new = LEVELS.get(level, level)
+    if new not in LEVELS.values():
+        raise ValueError(
+            'unknown check level: {lv!r}'.format(lv=level))
+    old = _level
+    _level = new
+    return old
+
+
+def get_level():
+    return _level
+
+
+def enabled(level):
+    """Return `True` if checks of `level` run."""
+    return level <= _level
+
+
+@contextlib.contextmanager
+def checking(level):
+    """Run the checks of `level` in this context."""
+    old = set_level(level)
+    try:
+        yield
+    finally:
+        set_level(old)
+
+
+def verify(level, name, check, message=None):
+    """Raise `AssertionError` if `check()` is false.
+
+    Calls `check` only if `level` is enabled.
+
+    @param check: callable that returns `bool`
+    @param message: callable that returns details
+        of the failure, or `None`
+    """
+    if level > _level:
+        return
+    start = time.perf_counter()
+    try:
+        ok = check()
+    finally:
+        t = timings.setdefault(name, [0, 0.0])
+        t[0] += 1
+        t[1] += time.perf_counter() - start
+    if ok:
+        return
+    if message is None:
+        raise AssertionError(name)
+    raise AssertionError('{n}: {m}'.format(n=name, m=message()))
+
+
+def reset_timings():
+    timings.clear()
+
+
+def total_time():
+    """Return seconds spent in checks."""
+    return sum(t for _, t in timings.values())
+
+
+def format_timings():
+    """Return table of calls and time of each check."""
+    row = '{name:40} {calls:>10} {t:>10}'
+    c = [row.format(name='check', calls='calls', t='time (s)')]
+    items = sorted(
+        timings.items(), key=lambda kv: kv[1][1], reverse=True)
+    for name, (calls, t) in items:
+        c.append(row.format(
+            name=name, calls=calls, t='{t:1.3f}'.format(t=t)))
+    c.append(row.format(
+        name='total', calls='',
+        t='{t:1.3f}'.format(t=total_time())))
+    return '\n'.join(c)
@@ -0,0 +1,317 @@
+"""Command-line driver for contract construction.
+
+Example:
+
+```
+python cli.py examples:landing_gear_example \
+    --phases closure unzip parametric \
+    --max-memory 8GB --stats-json stats.json \
+    --profile cprofile --profile-out run.prof
+```
+
+The options `--sys-player`, `--hidden`, and `--players`
+default to those in the `dict` `PINFO_OPTIONS` of the
+module of the spec, keyed by function name, if present,
+see `spec_options`.
+"""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import argparse
+import cProfile
+import importlib
+import importlib.util
+import inspect
+import logging
+import os
+import pstats
+
+import checks
+import contracts_pinfo as pinfo
+import phases as _phases
+import profiling
+import symbolic as sym
+
+
+log = logging.getLogger(__name__)
+DEFAULT_MODULE = 'examples'
+# options of `contracts_pinfo.main` that spec modules can give
+SPEC_OPTIONS = ('sys_player', 'hidden', 'players')
+SIZE_SUFFIXES = dict(K=2**10, M=2**20, G=2**30, T=2**40)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level)
+    f = load_spec(args.spec)
+    options = main_options(args, f)
+    aut = make_automaton(f, bdd_config(args))
+    checks.set_level(args.checks)
+    profiler = start_profiler(args)
+    recorder = _phases.Recorder(collect_garbage=args.gc)
+    try:
+        with _phases.recording(recorder):
+            pinfo.main(
+                aut,
+                phases=args.phases,
+                inv_pdf=args.inv_pdf,
+                reachable=args.reachable,
+                processes=args.processes,
+                engine=args.engine,
+                **options)
+    finally:
+        stop_profiler(profiler, args)
+    print(recorder.format_memory())
+    print(recorder.format_deltas())
+    if checks.timings:
+        print(checks.format_timings())
+    if args.stats_json is not None:
+        recorder.dump_json(args.stats_json)
+        print('wrote phase statistics to file "{f}"'.format(
+            f=args.stats_json))
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(
+        description='Construct contracts from a specification.')
+    p.add_argument(
+        'spec',
+        help=(
+            'function that returns the automaton, as '
+            '`module:function`, where `module` is a module name '
+            'or a path to a `.py` file. A bare `function` is '
+            'looked up in the module `{m}`.').format(
+                m=DEFAULT_MODULE))
+    p.add_argument(
+        '--phases', nargs='+', default=list(pinfo.PHASES),
+        choices=pinfo.PHASES,
+        help='phases to run (default: all)')
+    p.add_argument(
+        '--sys-player', default=None,
+        help=(
+            'player that the variables `--hidden` are hidden from '
+            '(default: from the spec module)'))
+    p.add_argument(
+        '--hidden', nargs='*', default=None,
+        help=(
+            'variables to hide in the phase "hiding" '
+            '(default: from the spec module)'))
+    p.add_argument(
+        '--players', nargs='+', default=None,
+        help=(
+            'players of the parametric analysis, '
+            'assumptions are generated for the first one '
+            '(default: from the spec module, otherwise '
+            '`--sys-player` followed by the other players)'))
+    p.add_argument(
+        '--reachable', action='store_true',
+        help='restrict the closure to reachable states')
+    p.add_argument(
+        '--processes', type=int, default=None,
+        help=(
+            'unzip in this many worker processes '
+            '(0 for the number of CPUs)'))
+    p.add_argument(
+        '--engine', choices=['auto', 'bdd', 'explicit'], default='auto',
+        help=(
+            'engine of the closure, `auto` uses the explicit '
+            'engine for few states and edges'))
+    level = {v: k for k, v in checks.LEVELS.items()}[checks.get_level()]
+    p.add_argument(
+        '--checks', choices=list(checks.LEVELS), default=level,
+        help=(
+            'level of self-checks (default: `%(default)s`, '
+            'which is `paranoid`, or `off` with `python -O`)'))
+    p.add_argument(
+        '--inv-pdf', default=None,
+        help='dump the BDD of the invariant to this PDF file')
+    # CUDD
+    p.add_argument(
+        '--max-memory', type=parse_size, default=None,
+        help='CUDD memory limit, for example `4GB`')
+    p.add_argument(
+        '--max-cache-hard', type=parse_size, default=None,
+        help='CUDD hard limit of cache entries, for example `32M`')
+    p.add_argument(
+        '--reordering', dest='reordering', action='store_true',
+        default=None, help='enable dynamic variable reordering')
+    p.add_argument(
+        '--no-reordering', dest='reordering', action='store_false',
+        help='disable dynamic variable reordering')
+    p.add_argument(
+        '--no-gc', dest='gc', action='store_false',
+        help='do not collect garbage at the end of each phase')
+    # output
+    p.add_argument(
+        '--stats-json', default=None,
+        help='write timing and BDD statistics per phase to this file')
+    p.add_argument(
+        '--profile', choices=['cprofile', 'sample', 'ops'], default=None,
+        help=(
+            'profile the run: with cProfile, by sampling stacks, '
+            'or by timing BDD operations per call site'))
+    p.add_argument(
+        '--profile-out', default=None,
+        help=(
+            'file for profiling results (default: `run.prof` '
+            'for cProfile, `run.folded` for sampling, `run_ops.json` '
+            'for operations, with folded stacks in `run_ops.folded`)'))
+    p.add_argument(
+        '--sample-interval', type=float, default=0.005,
+        help='seconds between samples, for `--profile sample`')
+    p.add_argument(
+        '--log-level', default='WARNING',
+        help='level of the root logger')
+    return p.parse_args(argv)
+
+
+def parse_size(s):
+    """Return number from `str` like `"4GB"`, `"32M"`, or `"1024"`.
+
+    Suffixes are binary: `K` is 2**10.
+    """
+    t = s.strip().upper()
+    if t.endswith('B'):
+        t = t[:-1]
+    if t and t[-1] in SIZE_SUFFIXES:
+        factor = SIZE_SUFFIXES[t[-1]]
+        t = t[:-1]
+    else:
+        factor = 1
+    try:
+        x = float(t)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'not a size: "{s}"'.format(s=s))
+    return int(x * factor)
+
+
+def load_spec(spec):
+    """Return function named by `spec`.
+
+    @param spec: `"module:function"` or `"function"`
+    """
+    if ':' in spec:
+        module_name, name = spec.rsplit(':', 1)
+    else:
+        module_name, name = DEFAULT_MODULE, spec
+    if module_name.endswith('.py'):
+        module = _import_file(module_name)
+    else:
+        module = importlib.import_module(module_name)
+    f = getattr(module, name, None)
+    if f is None:
+        raise ValueError('no function "{f}" in module "{m}"'.format(
+            f=name, m=module_name))
+    return f
+
+
+def spec_options(f):
+    """Return `dict` of options of `contracts_pinfo.main` for `f`.
+
+    The options are the item of `f.__name__` in the `dict`
+    `PINFO_OPTIONS` of the module of the function `f`, if any.
+    """
+    options = f.__globals__.get('PINFO_OPTIONS', dict())
+    return dict(options.get(f.__name__, dict()))
+
+
+def main_options(args, f):
+    """Return options of `contracts_pinfo.main` from `args`.
+
+    Options not given in `args` are taken from `spec_options(f)`.
+    Raise `ValueError` if the system player or the hidden
+    variables are not given either way.
+    """
+    options = spec_options(f)
+    for k in SPEC_OPTIONS:
+        v = getattr(args, k)
+        if v is not None:
+            options[k] = v
+    if 'sys_player' not in options:
+        raise ValueError((
+            'spec "{s}" gives no system player, '
+            'pass `--sys-player`').format(s=args.spec))
+    if 'hidden' not in options:
+        if 'hiding' in args.phases:
+            raise ValueError((
+                'spec "{s}" gives no variables to hide, '
+                'pass `--hidden`').format(s=args.spec))
+        options['hidden'] = list()
+    return options
+
+
+def make_automaton(f, bdd_config):
+    """Return automaton `f()`, with CUDD parameters `bdd_config`.
+
+    If `f` has a parameter `bdd_config`, then the parameters
+    are passed to `f`, so that they apply while `f` builds the
+    automaton. Otherwise, they are set after `f` returns.
+    """
+    if 'bdd_config' in inspect.signature(f).parameters:
+        return f(bdd_config=bdd_config)
+    aut = f()
+    if bdd_config:
+        aut.bdd.configure(**bdd_config)
+    return aut
+
+
+def _import_file(path):
+    """Return module loaded from file `path`."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def bdd_config(args):
+    """Return `dict` of CUDD parameters given in `args`."""
+    config = dict(
+        max_memory=args.max_memory,
+        max_cache_hard=args.max_cache_hard,
+        reordering=args.reordering)
+    return {k: v for k, v in config.items() if v is not None}
+
+
+def start_profiler(args):
+    if args.profile == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+    elif args.profile == 'sample':
+        profiler = profiling.Sampler(interval=args.sample_interval)
+        profiler.start()
+    elif args.profile == 'ops':
+        profiler = profiling.OperationProfiler([sym.Automaton])
+        profiler.start()
+    else:
+        profiler = None
+    return profiler
+
+
+def stop_profiler(profiler, args):
+    if profiler is None:
+        return
+    if args.profile == 'cprofile':
+        profiler.disable()
+        fname = args.profile_out or 'run.prof'
+        profiler.dump_stats(fname)
+        stats = pstats.Stats(profiler)
+        stats.sort_stats('cumulative').print_stats(20)
+    elif args.profile == 'ops':
+        profiler.stop()
+        fname = args.profile_out or 'run_ops.json'
+        profiler.dump_json(fname)
+        folded = os.path.splitext(fname)[0] + '.folded'
+        profiler.dump_folded(folded)
+        print(profiler.format_stats())
+        print('wrote folded stacks to file "{f}"'.format(f=folded))
+    else:
+        profiler.stop()
+        fname = args.profile_out or 'run.folded'
+        profiler.dump_folded(fname)
+    print('wrote profile to file "{f}"'.format(f=fname))
+
+
+if __name__ == '__main__':
+    main()
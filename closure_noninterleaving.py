@@ -4,11 +4,11 @@
 #
 import copy
 
-import ballpark
-import humanize
 from omega.logic import syntax as stx
 from omega.symbolic import bdd as scope
 
+import care as _care
+import checks
 import fixpoint_noninterleaving
 import symbolic as sym
 import utils
@@ -17,7 +17,7 @@ import utils
 TURN = utils.TURN
 
 
-def unzip(inv, players, aut):
+def unzip(inv, players, aut, processes=None, reorder=True):
     """Return new automaton with an action for each player.
 
     The action of player `k` is:
@@ -31,16 +31,26 @@ def unzip(inv, players, aut):
 
     Caution: Actions of keys in `aut.players` that are not in
     `players` are omitted from the returned `new_aut.players`.
+
+    @param processes: if not `None`, then compute the action
+        of each player in a worker process, with its own
+        BDD manager, see `parallel.map_tasks`
+        (`0` means the number of CPUs)
+    @param reorder: if `True`, then each worker process
+        reorders its manager before the projection
     """
     assert scope.is_state_predicate(inv), aut.support(inv)
     assembly_next = preserve_invariant(inv, players, aut)
     new_aut = copy.copy(aut)
+    if processes is not None and len(players) > 1:
+        actions = _parallel_unzip(
+            assembly_next, players, aut, processes, reorder)
+    else:
+        actions = {
+            player: project_action(assembly_next, player, players, aut)
+            for player in players}
     for player in players:
-        others = set(players)
-        others.remove(player)
-        env_vars = aut.vars_of_players(others)
-        env_vars_p = aut.prime_vars(env_vars)
-        sys_next = aut.exist(env_vars_p, assembly_next)
+        sys_next = actions[player]
         assert sym.is_action_of_player(sys_next, player, aut)
         new_aut.action[player] = sys_next
     assert set(new_aut.action) == set(players), (
@@ -48,6 +58,54 @@ def unzip(inv, players, aut):
     return new_aut
 
 
+def project_action(assembly_next, player, players, aut):
+    r"""Return `\E env_vars':  AssemblyNext` for `player`."""
+    others = set(players)
+    others.remove(player)
+    env_vars = aut.vars_of_players(others)
+    env_vars_p = aut.prime_vars(env_vars)
+    return aut.exist(env_vars_p, assembly_next)
+
+
+def _parallel_unzip(assembly_next, players, aut, processes, reorder):
+    """Return `dict` of player actions, projected in parallel.
+
+    `AssemblyNext` is serialized once, and loaded by
+    each worker process into its own manager.
+    """
+    import parallel
+    import serialization
+    roots = dict(assembly_next=assembly_next)
+    tasks = [(player, list(players), reorder) for player in players]
+    results = parallel.map_tasks(
+        _unzip_task, tasks, aut, roots, processes or None)
+    actions = dict()
+    for player, data in zip(players, results):
+        d = serialization.load_bdds(data, aut.bdd)
+        actions[player] = d['action']
+    return actions
+
+
+def _unzip_task(aut, roots, task):
+    """Return the projection of `AssemblyNext` for one player."""
+    import serialization
+    player, players, reorder = task
+    if reorder:
+        _reorder(aut.bdd)
+    u = project_action(roots['assembly_next'], player, players, aut)
+    return serialization.dump_bdds(dict(action=u))
+
+
+def _reorder(bdd):
+    """Reorder `bdd` by sifting, if it is a CUDD manager."""
+    try:
+        from dd import cudd
+    except ImportError:
+        return
+    if isinstance(bdd, cudd.BDD):
+        cudd.reorder(bdd)
+
+
 def hide_vars_from_sys(vrs, inv, sys_player, aut):
     """Return new `sys_player` action, after hiding `vrs`.
 
@@ -57,9 +115,7 @@ def hide_vars_from_sys(vrs, inv, sys_player, aut):
     completed.
     """
     turn_type = aut.vars[TURN]['type']
-    turn_p = stx.prime(TURN)
     assert turn_type == 'int', turn_type
-    turn_dom = aut.vars[TURN]['dom']
     # extract full-info actions from assembly action
     action = sym.conj_actions_of(aut.players, aut)
     inv_p = aut.replace_with_primed(
@@ -76,10 +132,10 @@ def hide_vars_from_sys(vrs, inv, sys_player, aut):
     extracted_env_next = aut.exist(sys_vars_p, assembly_next)
     # decompile `SysStep`
     k = aut.players[sys_player]
-    kp = increment_turn(k, turn_dom)
-    u = aut.let({TURN: k}, extracted_sys_next)
-    inv_proj = aut.let({TURN: k}, inv)
-    v = aut.let({turn_p: kp}, inv_p)
+    kp = aut.next_turn(k)
+    u = aut.cofactor_turn(extracted_sys_next, turn=k)
+    inv_proj = aut.cofactor_turn(inv, turn=k)
+    v = aut.cofactor_turn(inv_p, next_turn=kp)
     inv_p_proj = aut.exist(env_vars_p, v)
     care = inv_proj & inv_p_proj
     s = sym.dumps_expr(u, aut, care=care)
@@ -87,13 +143,13 @@ def hide_vars_from_sys(vrs, inv, sys_player, aut):
     print(s)
     # hide variables from `SysNext`
     sys_next = extracted_sys_next
-    u = sys_next | ~ inv
+    u = _care.implication(inv, sys_next, aut)
     u = aut.forall(vrs, u)
     inv_h = aut.exist(vrs, inv)
     simpler_sys_next = u & inv_h
     # hide variables from `EnvNext`
     env_next = extracted_env_next
-    u = env_next & inv
+    u = _care.conjunction(inv, env_next, aut)
     vrs_p = aut.prime_vars(vrs)
     qvars = set(vrs).union(vrs_p)
     simpler_env_next = aut.exist(qvars, u)
@@ -103,12 +159,12 @@ def hide_vars_from_sys(vrs, inv, sys_player, aut):
     print(s)
     # decompile `SimplerSysNext`
     k = aut.players[sys_player]
-    u = aut.let({TURN: k}, simpler_sys_next)
+    u = aut.cofactor_turn(simpler_sys_next, turn=k)
     inv_h_p = aut.replace_with_primed(
         aut.vars_of_all_players, inv_h)
     inv_h_p = aut.exist(env_vars_p, inv_h_p)
     assert stx.prime(TURN) not in aut.support(inv_h_p)
-    inv_h_proj = aut.let({TURN: k}, inv_h)
+    inv_h_proj = aut.cofactor_turn(inv_h, turn=k)
     care = inv_h_proj & inv_h_p
     s = sym.dumps_expr(u, aut, care=inv_h, use_types=True)
     print('SimplerSysNext ==')
@@ -123,31 +179,20 @@ def hide_vars_from_sys(vrs, inv, sys_player, aut):
         if k is None:
             print('Scheduler skipped (plays concurrently)')
             continue
-        inv_h_proj = aut.let({TURN: k}, inv_h)
+        inv_h_proj = aut.cofactor_turn(inv_h, turn=k)
         s = sym.dumps_expr(inv_h_proj, aut, use_types=True)
         print('InvH{player} == '.format(player=player))
         print(s)
         # use (known) scheduler action as care set
-        kp = increment_turn(k, turn_dom)
-        scheduler_action = {TURN: k, turn_p: kp}
-        u = aut.let(scheduler_action, simpler_env_next)
-        inv_h_p_proj = aut.let({turn_p: kp}, inv_h_p)
+        kp = aut.next_turn(k)
+        u = aut.cofactor_turn(simpler_env_next, turn=k, next_turn=kp)
+        inv_h_p_proj = aut.cofactor_turn(inv_h_p, next_turn=kp)
         care = inv_h_proj & inv_h_p_proj
         s = sym.dumps_expr(u, aut, care=inv_h, use_types=True)
         print('Simpler{player}Next == '.format(player=player))
         print(s)
 
 
-def increment_turn(k, dom):
-    a, b = dom
-    assert a <= k and k <= b, (a, b, k)
-    if k + 1 > b:
-        kp = a
-    else:
-        kp = k + 1
-    return kp
-
-
 def enabled(action, aut):
     """Return `ENABLED action`."""
     support = aut.support(action)
@@ -166,60 +211,136 @@ def preserve_invariant(inv, players, aut):
     """
     assert scope.is_state_predicate(inv), aut.support(inv)
     action = sym.conj_actions_of(players, aut)
-    assert scope.is_proper_action(action), aut.support(action)
+    checks.verify(
+        checks.CHEAP, 'assembly action proper',
+        lambda: scope.is_proper_action(action),
+        lambda: aut.support(action))
     inv_p = aut.replace_with_primed(
         aut.vars_of_all_players, inv)
-    assert sym.is_primed_state_predicate(inv_p, aut), aut.support(inv_p)
+    checks.verify(
+        checks.CHEAP, 'primed invariant',
+        lambda: sym.is_primed_state_predicate(inv_p, aut),
+        lambda: aut.support(inv_p))
     assembly_next = inv & inv_p & action
-    assert scope.is_proper_action(assembly_next), aut.support(assembly_next)
+    checks.verify(
+        checks.CHEAP, 'invariant assembly action proper',
+        lambda: scope.is_proper_action(assembly_next),
+        lambda: aut.support(assembly_next))
     return assembly_next
 
 
-def closure(players, aut):
-    """Return cooperatively winning set."""
-    z = aut.true
+def closure(players, aut, start=None, engine='auto'):
+    """Return cooperatively winning set.
+
+    @param start: if not `None`, then compute the closure
+        within this set of states, which should be closed
+        under successors, for example `reachable_states(aut)`.
+        The iterates are then smaller BDDs.
+    @param engine: `"bdd"`, `"explicit"`, or `"auto"` to
+        use the explicit engine if the states and edges
+        are few (`explicit.is_small`)
+    """
+    import explicit
+    if engine != 'explicit' and getattr(aut, 'symmetry', None):
+        import symmetry
+        return symmetry.closure(
+            players, aut, closure_for_one_player, start=start)
+    relation = None
+    if engine == 'auto' and explicit.is_small(aut):
+        relation = explicit.noninterleaving_relation(aut)
+    if explicit.use_explicit(engine, aut, relation=relation):
+        game = explicit.noninterleaving_game(aut, relation=relation)
+        return explicit.closure_bdd(players, aut, game, start=start)
+    z = aut.true if start is None else start
     zold = None
     while z != zold:
         zold = z
         for p in players:
-            z &= closure_for_one_player(zold, p, aut)
+            z &= closure_for_one_player(zold, p, aut, within=start)
     return z
 
 
-def closure_for_one_player(z, player, aut):
-    """Closure that accounts for recurrence goals of `player`."""
+def closure_for_one_player(z, player, aut, within=None):
+    """Closure that accounts for recurrence goals of `player`.
+
+    @param within: see `ancestors`
+    """
     zold = None
     while z != zold:
         zold = z
         z_pre = fixpoint_noninterleaving.preimage(zold, aut)
         for goal in aut.win[player]['[]<>']:
             target = z_pre & goal
-            z &= ancestors(target, aut)
+            z &= ancestors(target, aut, within=within)
     return z
 
 
-def ancestors(target, aut):
-    """States from where `target` is cooperatively reachable."""
+def ancestors(target, aut, rings=None, within=None):
+    """States from where `target` is cooperatively reachable.
+
+    @param rings: see `least_fixpoint`
+    @param within: if not `None`, then only states in
+        `within`, which should be closed under successors
+    """
     operator = fixpoint_noninterleaving.preimage
-    return least_fixpoint(operator, target, aut)
+    if within is not None:
+        pre = operator
+        target &= within
 
+        def operator(u, aut):
+            return pre(u, aut) & within
+    return least_fixpoint(operator, target, aut, rings=rings)
 
-def least_fixpoint(operator, target, aut):
+
+def reachable_states(aut, init=None, image=None):
+    """Return states reachable from `init`.
+
+    Frontier iteration: only the states found in the
+    previous iteration are used to compute successors.
+
+    @param init: if `None`, then the conjunction of the
+        initial conditions of `aut.players`
+    @param image: function with signature `(u, aut)`,
+        by default `fixpoint_noninterleaving.image`
+    """
+    if init is None:
+        init = sym.conj_init_of(aut.players, aut)
+    if image is None:
+        image = fixpoint_noninterleaving.image
+    reached = init
+    frontier = init
+    while frontier != aut.false:
+        post = image(frontier, aut)
+        frontier = post & ~ reached
+        reached |= frontier
+    return reached
+
+
+def least_fixpoint(operator, target, aut, rings=None):
     """Least fixpoint of `operator`, starting from `target`.
 
     Viewed equivalently, least fixpoint of `operator | target`,
     starting from FALSE.
+
+    @param rings: if a `list`, then append to it the
+        states added at each iteration (onion rings),
+        starting with `target`
     """
     y = target
     yold = None
+    if rings is not None:
+        rings.append(target)
     while y != yold:
         yold = y
         y |= operator(y, aut)
+        if rings is not None and y != yold:
+            rings.append(y & ~ yold)
     return y
 
 
 def print_state_space_statistics(inv, aut):
     """Print number of states that satisfy state predicate `inv`."""
+    import ballpark
     care_vars = aut.vars_of_all_players
     u = aut.exist([TURN], inv)
     n = aut.count(inv, care_vars=care_vars)
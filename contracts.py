@@ -11,7 +11,14 @@ from omega.automata import TransitionSystem
 from omega.symbolic.logicizer import graph_to_logic
 from omega.symbolic import bdd as scope
 from omega.symbolic import enumeration as enum
+
+import closure_noninterleaving as _closure
+import explicit
+import fixpoint_interleaving as fx
+import parallel
+import serialization
 import symbolic as sym
+import witness
 
 
 logger = logging.getLogger(__name__)
@@ -260,14 +267,31 @@ def dummy_example():
     make_assumptions(aut)
 
 
-def make_assumptions(original_aut):
+def make_assumptions(original_aut, processes=None, reachable=False):
+    """Construct nested specifications for each player.
+
+    @param processes: if not `None`, then construct
+        the specifications in this many worker processes,
+        see `nested_specs`
+    @param reachable: if `True`, then restrict the closure
+        to states reachable from the initial conditions
+    """
     aut = copy.copy(original_aut)
-    z = closure(aut)
+    start = None
+    if reachable:
+        init = sym.conj_init_of(aut.players, aut)
+        start = _closure.reachable_states(aut, init=init, image=fx.image)
+    z = closure(aut, start=start)
     # print('Cooperative winning set:')
     # enum.print_nodes(z, aut.vars, aut.bdd)
+    if z == aut.bdd.false:
+        trace = witness.witness_for_empty_closure(
+            aut, image=fx.image, preimage=fx.preimage)
+        print('shortest trace to where a goal is lost:')
+        print(witness.format_trace(trace))
     assert z != aut.bdd.false, 'unsatisfiable'
     require_closure(z, aut)
-    specs = nested_specs(z, aut)
+    specs = nested_specs(z, aut, processes=processes)
     pprint.pprint(specs)
     bdd = aut.bdd
     #
@@ -296,7 +320,19 @@ def make_assumptions(original_aut):
             enum.print_nodes(u, aut.vars, bdd)
 
 
-def nested_specs(closure, aut):
+def nested_specs(closure, aut, processes=None):
+    """Return nested specifications for each player.
+
+    If `processes` is `None`, then compute sequentially.
+    Otherwise, compute the game stack of each pair of
+    player and recurrence goal in a separate task, using
+    `processes` worker processes (`0` means as many as CPUs).
+    Each worker loads `aut` and `closure` into its own
+    BDD manager, and the stacks are transferred back to
+    `aut.bdd`.
+    """
+    if processes is not None:
+        return _parallel_nested_specs(closure, aut, processes)
     log.info('nested specs')
     specs = dict()
     for p in aut.players:
@@ -305,6 +341,69 @@ def nested_specs(closure, aut):
     return specs
 
 
+def _parallel_nested_specs(closure, aut, processes):
+    """Return nested specifications, computed in parallel."""
+    log.info('nested specs, in parallel')
+    tasks = list()
+    specs = dict()
+    for p in aut.players:
+        specs[p] = list()
+        if '[]<>' not in aut.win[p]:
+            continue
+        n = len(aut.win[p]['[]<>'])
+        tasks.extend((p, i) for i in range(n))
+    if not processes:
+        processes = None
+    roots = dict(closure=closure)
+    results = parallel.map_tasks(
+        _nested_spec_task, tasks, aut, roots, processes)
+    for (p, i), data in zip(tasks, results):
+        stack = _load_stack(data, aut)
+        specs[p].append(stack)
+    return specs
+
+
+def _nested_spec_task(aut, roots, task):
+    """Return game stack for recurrence goal `i` of `player`."""
+    player, i = task
+    closure = roots['closure']
+    goal = aut.win[player]['[]<>'][i]
+    goal &= closure
+    uncovered = closure & ~ goal
+    stack = list()
+    game_stack(goal, player, uncovered, stack, aut, closure)
+    return _dump_stack(stack)
+
+
+def _dump_stack(stack):
+    """Return picklable description of game `stack`."""
+    games = list()
+    roots = dict()
+    for k, (player, cur_goal, goal, assumptions) in enumerate(stack):
+        roots[(k, 'cur_goal')] = cur_goal
+        roots[(k, 'goal')] = goal
+        others = list()
+        for j, (other, trap) in enumerate(assumptions):
+            roots[(k, 'assumption', j)] = trap
+            others.append(other)
+        games.append((player, others))
+    return dict(games=games, bdds=serialization.dump_bdds(roots))
+
+
+def _load_stack(data, aut):
+    """Return game stack in `aut.bdd`, from `data`."""
+    nodes = serialization.load_bdds(data['bdds'], aut.bdd)
+    stack = list()
+    for k, (player, others) in enumerate(data['games']):
+        cur_goal = nodes[(k, 'cur_goal')]
+        goal = nodes[(k, 'goal')]
+        assumptions = {
+            (other, nodes[(k, 'assumption', j)])
+            for j, other in enumerate(others)}
+        stack.append((player, cur_goal, goal, assumptions))
+    return stack
+
+
 def nested_spec_for_one_player(closure, player, aut):
     log.info('nested specs for player {p}"'.format(p=player))
     spec = list()
@@ -338,7 +437,7 @@ def game_stack(goal, player, uncovered,
             if other == player:
                 continue
             attr, trap = unconditional_assumption(
-                cur_goal, player, other, aut)
+                cur_goal, player, [other], aut)
             # assert
             u = ~ cur_goal | attr
             assert u == aut.true, u
@@ -368,7 +467,7 @@ def game_stack(goal, player, uncovered,
     for next_player in aut.players:
         if next_player == player:
             continue
-        cox = sym.ue_preimage(cur_goal, next_player, aut)
+        cox = fx.ue_preimage(cur_goal, [next_player], aut)
         cox &= closure
         if (cox & ~ cur_goal) != aut.false:
             break
@@ -377,9 +476,9 @@ def game_stack(goal, player, uncovered,
 
 
 def unconditional_assumption(goal, player, others, aut):
-    a = sym.attractor(goal, [player], aut)
-    b = sym.attractor(a, others, aut)
-    c = sym._trap(b, [player], aut, unless=a)
+    a = fx.attractor(goal, [player], aut)
+    b = fx.attractor(a, others, aut)
+    c = fx.trap(b, [player], aut, unless=a)
     r = ~ a
     r &= b
     r &= c
@@ -388,21 +487,26 @@ def unconditional_assumption(goal, player, others, aut):
 
 def _unconditional_assumption_single(goal, player, other, aut):
     assert player in aut.players, (player, aut.players)
-    a = sym.attractor(goal, [player], aut)
-    b = sym.attractor(a, [other], aut)
-    c = sym._trap(b, [player], aut, unless=a)
+    a = fx.attractor(goal, [player], aut)
+    b = fx.attractor(a, [other], aut)
+    c = fx.trap(b, [player], aut, unless=a)
     r = ~ a
     r &= b
     r &= c
     return a, r
 
 
-def closure(aut):
+def closure(aut, start=None, engine='auto'):
     """Return cooperatively winning set.
 
     This is the non-restrictive safety assumption
     with the minimal number of edges.
 
+    @param start: if not `None`, then compute the closure
+        within this set, which should be closed under
+        successors, for example the reachable states
+    @param engine: see `closure_noninterleaving.closure`
+
 
     Reference
     =========
@@ -417,7 +521,14 @@ def closure(aut):
     """
     # TODO: show that correctness follows from the
     # chaotic iteration theorem of Cousot^2
-    z = aut.true
+    vrs = explicit.interleaving_vars(aut)
+    relation = None
+    if engine == 'auto' and explicit.is_small(aut, vrs=vrs):
+        relation = explicit.interleaving_relation(aut)
+    if explicit.use_explicit(engine, aut, vrs=vrs, relation=relation):
+        game = explicit.interleaving_game(aut, relation=relation)
+        return explicit.closure_bdd(aut.players, aut, game, start=start)
+    z = aut.true if start is None else start
     zold = None
     while z != zold:
         zold = z
@@ -438,13 +549,13 @@ def closure_for_one_player(z, player, aut):
 
 
 def ancestors(z, goal, aut):
-    z_pre = sym.preimage(z, aut)
+    z_pre = fx.preimage(z, aut)
     target = z_pre & goal
     y = aut.false
     yold = None
     while y != yold:
         yold = y
-        y_pre = sym.preimage(y, aut)
+        y_pre = fx.preimage(y, aut)
         y |= y_pre | target
     return y
 
@@ -452,15 +563,15 @@ def ancestors(z, goal, aut):
 def require_closure(z, aut):
     """Apply closure to both players."""
     n = len(aut.players)
-    xy = aut.all_player_vars
+    xy = aut.vars_of_all_players
     vrs = xy | {sym.TURN}
     assert scope.support_issubset(z, vrs, aut)
     for p, i in aut.players.items():
         xi = set(aut.varlist[p])
         ip = (i + 1) % n
-        zi = aut.let({sym.TURN: i}, z)
+        zi = aut.cofactor_turn(z, turn=i)
         u = aut.replace_with_primed(xi, z)
-        zi_next = aut.let({sym.TURN: ip}, u)
+        zi_next = aut.cofactor_turn(u, turn=ip)
         stay = zi & zi_next
         aut.action[p] &= stay
         # assert
@@ -489,7 +600,7 @@ def game_stack_shallow(
             continue
         other = aut.turns[j]
         attr, trap = unconditional_assumption(
-            cur_goal, player, other, aut)
+            cur_goal, player, [other], aut)
         # assert
         u = attr | ~ cur_goal
         assert u == aut.true, u
@@ -513,7 +624,7 @@ def game_stack_shallow(
     #            stack, aut, closure)
     #
     # outer fixpoint reached ?
-    cox_goal = sym.ue_preimage(goal, player, aut)
+    cox_goal = fx.ue_preimage(goal, [player], aut)
     new_goal = cox_goal & cur_goal
     if new_goal == goal:
         # print('new_goal:')
@@ -8,17 +8,19 @@ import logging
 import math
 import pprint
 
-from dd import autoref
 from dd import cudd
 from omega.logic import syntax as stx
 from omega.symbolic import bdd as scope
 from omega.symbolic import bdd as sym_bdd
 
 import bdd as _bdd
+import care as _care
+import checks
 import closure_noninterleaving as _closure
 import cpre_noninterleaving as cpre
 import fixpoint_noninterleaving as fx
 import masks as _masks
+import phases as _phases
 import symbolic as sym
 from symbolic import print_expr, dumps_expr
 import utils
@@ -27,6 +29,11 @@ import utils
 log = logging.getLogger(__name__)
 LOG = 100
 TURN = utils.TURN
+# default CUDD parameters of new `Automaton` instances,
+# override them with the argument `bdd_config`
+BDD_CONFIG = dict(
+    max_memory=2 * cudd.GB,
+    max_cache_hard=2**25)
 
 
 def parametric_predicate(pred, aut):
@@ -72,8 +79,10 @@ def observable(target, within, inv, aut):
     u &= aut.exist(aut.hr, inv_r & aut.selector)
     # check support
     vrs = aut.vars_of_all_players | aut.masks
-    assert scope.support_issubset(u, vrs, aut), (
-        aut.support(u) - vrs)
+    checks.verify(
+        checks.CHEAP, 'observable support',
+        lambda: scope.support_issubset(u, vrs, aut),
+        lambda: aut.support(u) - vrs)
     return u
 
 
@@ -124,58 +133,123 @@ def maybe(target, within, aut):
     return aut.exist(aut.hr, u)
 
 
-def main(aut):
-    """Decompose specification into a contract."""
-    inv = _closure.closure(aut.players, aut)
+PHASES = ('closure', 'hiding', 'unzip', 'parametric', 'maximization')
+# phase -> phases that it needs
+_NEEDS = dict(
+    closure=set(),
+    hiding={'closure'},
+    unzip={'closure'},
+    parametric={'closure', 'unzip'},
+    maximization={'closure', 'unzip', 'parametric'})
+
+
+def main(aut, sys_player, hidden, players=None,
+         phases=PHASES, inv_pdf='inv_bdd.pdf',
+         reachable=False, processes=None, engine='auto'):
+    """Decompose specification into a contract.
+
+    The options of the examples are in `examples.PINFO_OPTIONS`,
+    for example:
+
+    ```
+    main(aut, **examples.PINFO_OPTIONS['landing_gear_example'])
+    ```
+
+    @param sys_player: the phase "hiding" hides the
+        variables `hidden` from this player
+    @param players: players of the parametric analysis,
+        assumptions are generated for the first one.
+        If `None`, then `sys_player`, followed by the
+        other players that have a turn, sorted by name.
+    @param phases: names of phases to run, from `PHASES`
+    @param inv_pdf: dump the BDD of `Inv` to this file,
+        if not `None`
+    @param reachable: if `True`, then restrict the closure,
+        and so all later phases, to the states reachable
+        from the initial conditions
+    @param processes: if not `None`, then unzip in this many
+        worker processes, see `closure_noninterleaving.unzip`
+    @param engine: of the closure, see
+        `closure_noninterleaving.closure`
+    @return: `dict` of results, keyed by phase
+    """
+    check_phases(phases)
+    if players is None:
+        others = sorted(
+            p for p, k in aut.players.items()
+            if k is not None and p != sys_player)
+        players = [sys_player] + others
+    results = dict()
+    start = None
+    if reachable:
+        with _phases.phase('reachable', aut.bdd):
+            start = _closure.reachable_states(aut)
+        results['reachable'] = start
+    with _phases.phase('closure', aut.bdd):
+        inv = _closure.closure(
+            aut.players, aut, start=start, engine=engine)
+    results['closure'] = inv
     assert not (aut.support(inv) & aut.masks)
     assert_type_invariant_implies_type_hints(inv, aut)
-    fname = 'inv_bdd.pdf'
-    dump_bdd_using_autoref(inv, fname)
+    if inv_pdf is not None:
+        dump_bdd_using_autoref(inv, inv_pdf)
     _closure.print_state_space_statistics(inv, aut)
     s = dumps_expr(inv, aut, use_types=True)
     print('\nshared invariant Inv:\n')
     print(s)
     # fname = 'Invariant.tla'
     # utils.dump_as_tla(s, fname)
-    #
-    # for charging station example
-    # sys_player = 'station'
-    # vrs = ['pos_x', 'pos_y']  # hide these variables
-    #
-    # for landing gear example
-    sys_player = 'autopilot'
-    vrs = ['door']
-    _closure.hide_vars_from_sys(vrs, inv, sys_player, aut)
-    #
-    # for charging station example
-    # sys_player = 'robot'
-    # players = ['robot', 'station']
-    #
-    # for autopilot example
-    sys_player = 'autopilot'
-    players = ['autopilot', 'gear_module', 'door_module']
-    #
+    if 'hiding' in phases:
+        with _phases.phase('hiding', aut.bdd):
+            _closure.hide_vars_from_sys(hidden, inv, sys_player, aut)
     aut.global_inv = inv  # global full-info invariant
-    aut_unzipped = _closure.unzip(inv, aut.players, aut)
-    # configure mask parameters
-    initial_phase = 0
-    phase = '{i}_0'.format(i=initial_phase)
-    _masks.add_masks_and_hidden_vars(aut_unzipped, phase=phase)
-    aut_unzipped.observe(sys_player, [sys_player])
-    # require initial condition
-    param_inv = parametric_predicate(inv, aut_unzipped)
-    param_z = outer_fixpoint(players, aut_unzipped)
-    z = param_z[initial_phase]
-    u = z | ~ param_inv
-    qvars = aut.vars_of_all_players
-    u = aut_unzipped.forall(qvars, u)
+    if 'unzip' in phases:
+        with _phases.phase('unzip', aut.bdd):
+            aut_unzipped = _closure.unzip(
+                inv, aut.players, aut, processes=processes)
+            # configure mask parameters
+            initial_phase = 0
+            phase = '{i}_0'.format(i=initial_phase)
+            _masks.add_masks_and_hidden_vars(aut_unzipped, phase=phase)
+            aut_unzipped.observe(players[0], [players[0]])
+        results['unzip'] = aut_unzipped
+    if 'parametric' in phases:
+        with _phases.phase('parametric', aut.bdd):
+            # require initial condition
+            param_inv = parametric_predicate(inv, aut_unzipped)
+            param_z = outer_fixpoint(players, aut_unzipped)
+            z = param_z[initial_phase]
+            u = z | ~ param_inv
+            qvars = aut.vars_of_all_players
+            u = aut_unzipped.forall(qvars, u)
+        results['parametric'] = u
+    if 'maximization' in phases:
+        with _phases.phase('maximization', aut.bdd):
+            values = maximum_sum(u, aut_unzipped)
+        results['maximization'] = values
     # BDD stats
     stats = aut.bdd.statistics()
     s = utils.format_stats(stats)
     print(s)
+    return results
+
+
+def check_phases(phases):
+    """Raise `ValueError` if `phases` are not runnable."""
+    unknown = set(phases).difference(PHASES)
+    if unknown:
+        raise ValueError('unknown phases: {u}'.format(u=unknown))
+    for name in phases:
+        missing = _NEEDS[name].difference(phases)
+        if missing:
+            raise ValueError((
+                'phase "{name}" needs the phases: {m}').format(
+                    name=name, m=missing))
 
 
 def dump_bdd_using_autoref(u, fname):
+    # imported here, to keep imports of this module fast
+    from dd import autoref
     # copy from `dd.cudd` to `dd.autoref`
     b = autoref.BDD()
     cudd_bdd = u.bdd
@@ -256,10 +330,14 @@ def outer_fixpoint(players, aut):
     z = [aut.true] * n_goals
     zold = [None] * n_goals
     # effectively the greatest fixpoint Z
+    k = 0
     while z != zold:
         zold = z
-        z = iterate_recurrence_goals(z, players, aut)
+        name = 'pass {k}'.format(k=k)
+        with _phases.phase(name, aut.bdd):
+            z = iterate_recurrence_goals(z, players, aut)
         assert all(u <= v for u, v in zip(z, zold))
+        k += 1
     return z
 
 
@@ -280,7 +358,10 @@ def iterate_recurrence_goals(z, players, aut):
         ij = (i, 0)
         i_next = (i + 1) % n_goals
         z_next = z[i_next]
-        y = single_recurrence_goal(goal, z_next, within, players, ij, aut)
+        name = 'goal {i}'.format(i=i)
+        with _phases.phase(name, aut.bdd):
+            y = single_recurrence_goal(
+                goal, z_next, within, players, ij, aut)
         z_new[i] &= y
     return z_new
 
@@ -311,15 +392,12 @@ def single_recurrence_goal(target, z_next, within, players, ij, aut):
     yold = None
     # iterate over assumption generation,
     # which is effectively the least fixpoint Y
-    trap = aut.true
-    etas = list()
     while y != yold:
         # print('Y iteration')
         yold = y
         # can others help as a team ?
         attr, trap, eta_team = make_pinfo_assumption(
             y, vis_z, within, player, team, aut)
-        etas.append(eta_team)
         within_new = inv & trap
         z_next_new = aut.true
         ij_new = (i, j + 1)
@@ -334,7 +412,7 @@ def single_recurrence_goal(target, z_next, within, players, ij, aut):
     # \A vars:  (Inv /\ ~ Target)  =>  Y
     aut.observe(player, [player])
     proj_inv = maybe(inv, inv, aut)
-    u = y | ~ proj_inv
+    u = _care.implication(proj_inv, y, aut)
     qvars = aut.vars_of_all_players
     u = aut.forall(qvars, u)
     print('Maybe(Inv) => Y')
@@ -381,15 +459,14 @@ def make_pinfo_assumption(
         # check equivalent expression
         # this equivalence holds because `basin` has as support
         # only variables visible to the team
-        out_2 = ~ basin & inv
-        out_2 = maybe(out_2, inv, team_aut)
-        assert out_2 == out
+        checks.verify(
+            checks.PARANOID, 'escapes equivalent',
+            lambda: maybe(~ basin & inv, inv, team_aut) == out)
         #
         holes = basin & cpre.step(out, team_aut)
         escape = out & fx.image(holes & inv, team_aut)  # assembly step
         escape = out & maybe(escape, inv, team_aut)
         escape &= ~ converged  # keep converged ones unchanged
-        old_basin = basin
         basin |= escape
         # recompute
         eta_player, eta_team = persistence_guarantee(
@@ -397,15 +474,23 @@ def make_pinfo_assumption(
         non_empty = non_empty_slices(eta_player, aut)
         converged |= non_empty
         # assert
-        non_full = non_empty_slices(~ eta_player, aut)
         assert non_empty != aut.true, 'disconnected comm too ??'
-        assert non_full == aut.true
-        assert scope.support_issubset(converged, aut.masks, aut)
+        checks.verify(
+            checks.PARANOID, 'trap not full',
+            lambda: non_empty_slices(~ eta_player, aut) == aut.true)
+        checks.verify(
+            checks.CHEAP, 'converged support',
+            lambda: scope.support_issubset(converged, aut.masks, aut))
         assert converged == aut.false or eta_player != aut.false
         assert converged != aut.true, 'all architectures converged'
-    assert goal <= attr
-    assert eta_player & goal == aut.false
-    assert eta_player & attr == aut.false
+    checks.verify(
+        checks.FULL, 'goal in attractor', lambda: goal <= attr)
+    checks.verify(
+        checks.FULL, 'trap disjoint from goal',
+        lambda: eta_player & goal == aut.false)
+    checks.verify(
+        checks.FULL, 'trap disjoint from attractor',
+        lambda: eta_player & attr == aut.false)
     print('trap')
     print_slice(eta_player, aut)
     print('eta_team')
@@ -426,7 +511,9 @@ def persistence_guarantee(
     b_team = basin & cpre.attractor(goal_team, team_aut)
     eta_team = b_team & ~ goal_team
     # trap by player
-    assert eta_team <= basin  # => obs_basin unnecessary
+    # => obs_basin unnecessary
+    checks.verify(
+        checks.FULL, 'team trap in basin', lambda: eta_team <= basin)
     stay = observable(eta_team, inv, inv, aut)
     unless = attr
     trap = cpre.trap(stay, unless, aut)
@@ -612,7 +699,12 @@ def connectivity_to_masks(comm, j):
 class Automaton(sym.Automaton):
     """Subclass to copy attributes relevant to hiding."""
 
-    def __init__(self):
+    def __init__(self, bdd_config=None):
+        """Initialize, configuring CUDD.
+
+        @param bdd_config: `dict` of CUDD parameters that
+            override those in `BDD_CONFIG`
+        """
         super().__init__()
         self.global_inv = None  # full info invariant
         self.inv = None  # InvH
@@ -629,9 +721,14 @@ class Automaton(sym.Automaton):
         self.hr = set()
         self.mask_to_subproblem = dict()
         self.type_invariant = None
-        self.bdd.configure(
-            max_memory=2 * cudd.GB,
-            max_cache_hard=2**25)
+        # state predicate outside which `cpre.step` is FALSE
+        self.action_care = None
+        # (key, sys, env), see `cpre.care_actions`
+        self._care_actions = None
+        config = dict(BDD_CONFIG)
+        if bdd_config is not None:
+            config.update(bdd_config)
+        self.bdd.configure(**config)
 
     def __copy__(self):
         new = super().__copy__()
@@ -651,6 +748,8 @@ class Automaton(sym.Automaton):
         # global indexing of masks
         new.mask_to_subproblem = self.mask_to_subproblem
         new.type_invariant = self.type_invariant
+        new.action_care = self.action_care
+        new._care_actions = self._care_actions
         return new
 
     def observe(self, player, visible):
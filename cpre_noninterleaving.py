@@ -4,7 +4,10 @@
 #
 from omega.symbolic import bdd as scope
 
+import care as _care
+import checks
 import symbolic as sym
+import symmetry
 import utils
 
 
@@ -21,6 +24,7 @@ def group_as_env_sys(team, aut):
     aut.varlist['env'] = env_vars
     aut.varlist['sys_p'] = aut.prime_vars(sys_vars)
     aut.varlist['env_p'] = aut.prime_vars(env_vars)
+    aut.action_care = None
 
 
 def parametrize_actions(aut):
@@ -84,6 +88,9 @@ def parametrize_actions(aut):
     param_env_next = aut.exist(h | r, u)
     aut.action['sys'] = param_sys_next
     aut.action['env'] = param_env_next
+    # `ParamSysNext` is FALSE outside `ParamInv`,
+    # so `step` is too
+    aut.action_care = param_inv
 
 
 def trap(stay, escape, aut):
@@ -97,33 +104,181 @@ def trap(stay, escape, aut):
         q &= step(q, aut)
         q &= stay
         q |= escape
-        assert q <= qold
-    assert q <= (stay | escape)
+        checks.verify(
+            checks.FULL, 'trap decreasing', lambda: q <= qold)
+    checks.verify(
+        checks.FULL, 'trap within stay or escape',
+        lambda: q <= (stay | escape))
     return q
 
 
-def attractor(target, aut):
-    """Least fixpoint."""
+def attractor(target, aut, rings=None):
+    """Least fixpoint.
+
+    If the actions and `target` are symmetric, then iterate
+    over orbit representatives, see `symmetric_step`.
+
+    @param rings: if a `list`, then append to it the
+        states added at each iteration, starting with `target`
+    """
     assert scope.is_state_predicate(target)
+    if rings is None and _is_symmetric(target, aut):
+        reps = target & symmetry.canonical(aut)
+        q = symmetry.least_fixpoint(symmetric_step, reps, aut)
+        return symmetry.orbit(q, aut)
     qold = None
     q = target
+    if rings is not None:
+        rings.append(target)
     while q != qold:
         qold = q
         q |= step(q, aut)
-        assert q >= qold
+        checks.verify(
+            checks.FULL, 'attractor increasing', lambda: q >= qold)
+        if rings is not None and q != qold:
+            rings.append(q & ~ qold)
     assert q >= target
     return q
 
 
+def _is_symmetric(target, aut):
+    """Return `True` if `step` and `target` are symmetric.
+
+    Whether the actions are symmetric is stored in `aut`,
+    until the actions, the care set, or the groups change.
+    """
+    if not getattr(aut, 'symmetry', None):
+        return False
+    care = getattr(aut, 'action_care', None)
+    key = (
+        symmetry.groups_key(aut),
+        aut.action['env'], aut.action['sys'], care)
+    cached = getattr(aut, '_symmetric_step', None)
+    if cached is None or cached[0] != key:
+        cached = (key, _symmetric_actions(aut))
+        aut._symmetric_step = cached
+    return cached[1] and symmetry.is_symmetric(target, aut)
+
+
+def _symmetric_actions(aut):
+    """Return `True` if `symmetric_step` applies to the actions.
+
+    The actions and care set should be symmetric, each group
+    should be within the team or outside it, and `EnvNext`
+    should not depend on the next values of the team's groups.
+    """
+    us = [aut.action['env'], aut.action['sys']]
+    care = getattr(aut, 'action_care', None)
+    if care is not None:
+        us.append(care)
+    team = _team(aut)
+    if not symmetry.applies(us, aut, team=team):
+        return False
+    players = {p for pair in symmetry.team_generators(team, aut)
+               for p in pair}
+    sys_p = aut.prime_vars(aut.vars_of_players(players))
+    return not set(sys_p).intersection(aut.support(aut.action['env']))
+
+
+def _team(aut):
+    """Return players whose variables are the "sys" variables."""
+    sys_vars = set(aut.varlist['sys'])
+    return [
+        p for p in aut.players
+        if set(aut.varlist[p]).issubset(sys_vars)]
+
+
+def symmetric_step(target, aut):
+    """Return representatives of controllable predecessors.
+
+    Same as `step` applied to the orbits of `target`,
+    but with actions that map successors to representatives,
+    see `symmetric_actions`.
+
+    @param target: representatives
+    """
+    sys_next, env_next, care = symmetric_actions(aut)
+    vrs = aut.vars_of_all_players
+    u = aut.replace_with_primed(vrs, target)
+    # /\ \A env_vars':  SysNext
+    # /\ \A env_vars':  EnvNext => Target'
+    u |= ~ env_next
+    u = aut.forall(aut.varlist['env_p'], u)
+    u &= sys_next
+    u = aut.exist(aut.varlist['sys_p'], u)
+    u &= symmetry.canonical(aut)
+    if care is not None:
+        u &= care
+    return u
+
+
+def symmetric_actions(aut):
+    r"""Return "sys" and "env" actions for `symmetric_step`.
+
+    The actions are those of `care_actions`, with
+    `\A env_vars':  SysNext` in place of `SysNext`,
+    and the next values mapped to representatives,
+    for groups within the team in "sys", and for the
+    other groups in "env" (`symmetry.to_representatives`).
+    The results are stored, as in `care_actions`.
+    """
+    sys_next, env_next, care = care_actions(aut)
+    key = (symmetry.groups_key(aut), sys_next, env_next, care)
+    cached = getattr(aut, '_symmetric_actions', None)
+    if cached is None or cached[0] != key:
+        team = _team(aut)
+        sys_pairs = symmetry.team_generators(team, aut)
+        env_pairs = [
+            pair for pair in symmetry.generators(aut)
+            if pair not in sys_pairs]
+        u = aut.forall(aut.varlist['env_p'], sys_next)
+        sys_r = symmetry.to_representatives(u, sys_pairs, aut)
+        env_r = symmetry.to_representatives(env_next, env_pairs, aut)
+        cached = (key, sys_r, env_r)
+        aut._symmetric_actions = cached
+    _, sys_next, env_next = cached
+    return sys_next, env_next, care
+
+
 def step(target, aut):
-    """Return controllable predecessors."""
+    """Return controllable predecessors.
+
+    If `aut.action_care` is not `None`, then the actions
+    are simplified within it, see `care_actions`.
+    """
+    sys_next, env_next, care = care_actions(aut)
     vrs = aut.vars_of_all_players
     u = aut.replace_with_primed(vrs, target)
     # /\ SysNext
     # /\ EnvNext => Target'
-    u |= ~ aut.action['env']
-    u &= aut.action['sys']
+    u |= ~ env_next
+    u &= sys_next
     # \E sys_vars':  \A env_vars'
     u = aut.forall(aut.varlist['env_p'], u)
     u = aut.exist(aut.varlist['sys_p'], u)
+    if care is not None:
+        u &= care
     return u
+
+
+def care_actions(aut):
+    """Return "sys" and "env" actions, and the care set.
+
+    The actions are simplified within `aut.action_care`,
+    which should be a state predicate outside of which
+    `step` is FALSE. The simplified actions are stored,
+    until an action or the care set changes.
+    """
+    sys_next = aut.action['sys']
+    env_next = aut.action['env']
+    care = getattr(aut, 'action_care', None)
+    if care is None:
+        return sys_next, env_next, None
+    key = (sys_next, env_next, care)
+    cached = getattr(aut, '_care_actions', None)
+    if cached is None or cached[0] != key:
+        d = _care.simplify_actions(['sys', 'env'], care, aut)
+        cached = (key, d['sys'], d['env'])
+        aut._care_actions = cached
+    _, sys_next, env_next = cached
+    return sys_next, env_next, care
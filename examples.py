@@ -7,13 +7,28 @@ import contracts_pinfo as pinfo
 import utils
 
 
+log = logging.getLogger(__name__)
 TURN = utils.TURN
+# options of `contracts_pinfo.main` for each example
+PINFO_OPTIONS = dict(
+    landing_gear_example=dict(
+        sys_player='autopilot',
+        hidden=['door'],
+        players=['autopilot', 'gear_module', 'door_module']),
+    charging_station_example=dict(
+        sys_player='station',
+        hidden=['pos_x', 'pos_y'],
+        players=['robot', 'station']))
 
 
-def landing_gear_example():
-    """Example with three components."""
+def landing_gear_example(bdd_config=None):
+    """Example with three components.
+
+    @param bdd_config: `dict` of CUDD parameters,
+        see `contracts_pinfo.Automaton`
+    """
     log.info('---- landing gear example ----')
-    aut = pinfo.Automaton()
+    aut = pinfo.Automaton(bdd_config)
     # large
     # MAX_HEIGHT = 1000
     # MAX_SPEED = 400
@@ -158,10 +173,14 @@ def landing_gear_example():
     return aut
 
 
-def charging_station_example():
-    """Example with two components."""
+def charging_station_example(bdd_config=None):
+    """Example with two components.
+
+    @param bdd_config: `dict` of CUDD parameters,
+        see `contracts_pinfo.Automaton`
+    """
     log.info('---- charging station example ----')
-    aut = pinfo.Automaton()
+    aut = pinfo.Automaton(bdd_config)
     aut.players = dict(
         station=1,
         robot=2,
@@ -289,13 +308,14 @@ def charging_station_example():
     return aut
 
 
-if __name__ == '__main__':
+def configure_logging():
+    """Configure loggers of `dd`, `omega`, and this package."""
     handler = logging.StreamHandler()
     formatter = logging.Formatter('%(levelname)s\t%(message)s')
     handler.setFormatter(formatter)
     # `dd` logger
-    log = logging.getLogger('dd')
-    log.setLevel(logging.ERROR)
+    logger = logging.getLogger('dd')
+    logger.setLevel(logging.ERROR)
     # `omega` logger
     logger = logging.getLogger('omega')
     logger.setLevel(logging.WARNING)
@@ -308,6 +328,11 @@ if __name__ == '__main__':
     logger.setLevel(logging.INFO)
     # stream to stdout
     logger.addHandler(handler)
+
+
+if __name__ == '__main__':
+    configure_logging()
     aut = landing_gear_example()
+    pinfo.main(aut, **PINFO_OPTIONS['landing_gear_example'])
     # aut = charging_station_example()
-    pinfo.main(aut)
+    # pinfo.main(aut, **PINFO_OPTIONS['charging_station_example'])
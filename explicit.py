@@ -0,0 +1,366 @@
+"""Explicit-state engine for small state spaces.
+
+The type-correct states are numbered in mixed radix,
+one digit per variable, and predicates are boolean arrays
+indexed by state number. A transition relation is a pair
+of integer arrays (source, destination), one entry per edge.
+Predecessors are then computed with `numpy.bincount`,
+so each fixpoint iteration is a few vectorized operations,
+instead of BDD quantification.
+
+Use `is_small` to decide whether the explicit engine pays
+off, and `to_bdd`, `from_bdd` to convert results. Both the
+states and the edges are bounded, because the edges are
+enumerated from the BDD of the transition relation.
+"""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import numpy as np
+from omega.logic import syntax as stx
+
+import fixpoint_interleaving as fx
+import symbolic as sym
+
+
+TURN = sym.TURN
+# use the explicit engine up to this many type-correct states
+MAX_STATES = 2**14
+# and up to this many edges
+MAX_EDGES = 2**16
+# values of the parameter `engine` of closure functions
+ENGINES = ('auto', 'bdd', 'explicit')
+
+
+class Space(object):
+    """Type-correct states of variables `vrs`, numbered."""
+
+    def __init__(self, vrs, aut):
+        self.vars = sorted(vrs)
+        self.offsets = list()
+        self.radices = list()
+        for var in self.vars:
+            a, b = _domain(var, aut)
+            self.offsets.append(a)
+            self.radices.append(b - a + 1)
+        self.strides = np.cumprod(
+            [1] + self.radices[:-1], dtype=np.int64)
+        self.n = int(np.prod(self.radices, dtype=np.int64))
+        self._value_bdds = dict()
+
+    def encode(self, values):
+        """Return state numbers of rows of integer array `values`.
+
+        @param values: shape `(m, len(self.vars))`
+        """
+        digits = np.asarray(values, dtype=np.int64) - self.offsets
+        return digits.dot(self.strides)
+
+    def decode(self, index):
+        """Return integer array of values of states `index`."""
+        index = np.asarray(index, dtype=np.int64)[:, np.newaxis]
+        digits = (index // self.strides) % self.radices
+        return digits + self.offsets
+
+    def values_of(self, var):
+        """Return array of values of `var`, for all states."""
+        i = self.vars.index(var)
+        index = np.arange(self.n, dtype=np.int64)
+        digits = (index // self.strides[i]) % self.radices[i]
+        return digits + self.offsets[i]
+
+    def rows(self, assignments, vrs):
+        """Return integer array of `vrs` values in `assignments`."""
+        return np.array(
+            [[int(d[var]) for var in vrs] for d in assignments],
+            dtype=np.int64).reshape(-1, len(vrs))
+
+    def from_bdd(self, u, aut):
+        """Return boolean array of states that satisfy `u`."""
+        mask = np.zeros(self.n, dtype=bool)
+        types = _type_hints(self.vars, aut)
+        it = aut.pick_iter(u & types, care_vars=set(self.vars))
+        rows = self.rows(it, self.vars)
+        mask[self.encode(rows)] = True
+        return mask
+
+    def to_bdd(self, mask, aut):
+        """Return BDD of the states in boolean array `mask`."""
+        u = aut.false
+        for row in self.decode(np.flatnonzero(mask)):
+            v = aut.true
+            for var, value in zip(self.vars, row):
+                v &= self._value_bdd(var, int(value), aut)
+            u |= v
+        return u
+
+    def _value_bdd(self, var, value, aut):
+        key = (var, value)
+        u = self._value_bdds.get(key)
+        if u is None:
+            if aut.vars[var]['type'] == 'bool':
+                s = var if value else '~ {var}'.format(var=var)
+            else:
+                s = '{var} = {value}'.format(var=var, value=value)
+            u = aut.add_expr(s)
+            self._value_bdds[key] = u
+        return u
+
+    def edges(self, relation, aut):
+        """Return arrays `(src, dst)` of the steps in `relation`."""
+        vrs_p = aut.prime_vars(self.vars)
+        types = _type_hints(self.vars + vrs_p, aut)
+        u = relation & types
+        care = set(self.vars).union(vrs_p)
+        assignments = list(aut.pick_iter(u, care_vars=care))
+        src = self.encode(self.rows(assignments, self.vars))
+        dst = self.encode(self.rows(assignments, vrs_p))
+        return src, dst
+
+
+class Game(object):
+    """Transition relation as edge arrays over a `Space`.
+
+    @param moving: boolean array of states where some
+        player moves, by default all states
+    """
+
+    def __init__(self, space, src, dst, moving=None):
+        self.space = space
+        self.n = space.n
+        self.src = src
+        self.dst = dst
+        self.degree = np.bincount(src, minlength=self.n)
+        if moving is None:
+            moving = np.ones(self.n, dtype=bool)
+        self.moving = moving
+
+
+def _type_hints(vrs, aut):
+    """Return BDD of the type hints of `vrs`."""
+    s = aut.type_hint_for(vrs)
+    return aut.add_expr(s)
+
+
+def _domain(var, aut):
+    """Return `(min, max)` of the values of `var`."""
+    d = aut.vars[var]
+    if d['type'] == 'bool':
+        return 0, 1
+    a, b = d['dom']
+    return a, b
+
+
+def count_states(vrs, aut):
+    """Return number of type-correct states of `vrs`."""
+    n = 1
+    for var in vrs:
+        a, b = _domain(var, aut)
+        n *= b - a + 1
+    return n
+
+
+def count_edges(relation, vrs, aut):
+    """Return number of type-correct steps in `relation`."""
+    vrs = sorted(vrs)
+    vrs_p = aut.prime_vars(vrs)
+    u = relation & _type_hints(vrs + vrs_p, aut)
+    return aut.count(u, care_vars=set(vrs).union(vrs_p))
+
+
+def is_small(aut, vrs=None, relation=None,
+             max_states=None, max_edges=None):
+    """Return `True` if the type-correct states and edges are few.
+
+    @param vrs: state variables, by default
+        `aut.vars_of_all_players`
+    @param relation: BDD of transition relation, if `None`,
+        then the edges are not counted
+    @param max_states: by default `MAX_STATES`
+    @param max_edges: by default `MAX_EDGES`
+    """
+    if vrs is None:
+        vrs = aut.vars_of_all_players
+    if max_states is None:
+        max_states = MAX_STATES
+    if max_edges is None:
+        max_edges = MAX_EDGES
+    if count_states(vrs, aut) > max_states:
+        return False
+    if relation is None:
+        return True
+    return count_edges(relation, vrs, aut) <= max_edges
+
+
+def use_explicit(engine, aut, vrs=None, relation=None):
+    """Return `True` if a closure should use this engine.
+
+    @param engine: in `ENGINES`, where `"auto"` uses
+        the explicit engine if `is_small`
+    """
+    if engine not in ENGINES:
+        raise ValueError('unknown engine: "{e}"'.format(e=engine))
+    if engine == 'auto':
+        return is_small(aut, vrs=vrs, relation=relation)
+    return engine == 'explicit'
+
+
+def noninterleaving_relation(aut):
+    """Return conjoined actions of `aut.players`."""
+    return sym.conj_actions_of(aut.players, aut)
+
+
+def noninterleaving_game(aut, relation=None):
+    """Return `Game` of the conjoined actions of `aut.players`.
+
+    @param relation: `noninterleaving_relation(aut)`,
+        if computed already
+    """
+    space = Space(aut.vars_of_all_players, aut)
+    if relation is None:
+        relation = noninterleaving_relation(aut)
+    src, dst = space.edges(relation, aut)
+    return Game(space, src, dst)
+
+
+def interleaving_vars(aut):
+    """Return state variables of `interleaving_game`."""
+    vrs = set(aut.vars_of_all_players)
+    vrs.add(TURN)
+    return vrs
+
+
+def interleaving_game(aut, relation=None):
+    """Return `Game` where players move one turn at a time.
+
+    The states include `TURN`, which defines the player
+    that moves at each state, see `team_mask`.
+
+    @param relation: `interleaving_relation(aut)`,
+        if computed already
+    """
+    vrs = interleaving_vars(aut)
+    space = Space(vrs, aut)
+    if relation is None:
+        relation = interleaving_relation(aut)
+    src, dst = space.edges(relation, aut)
+    game = Game(space, src, dst)
+    game.moving = team_mask(aut.turns.values(), game, aut)
+    return game
+
+
+def interleaving_relation(aut):
+    """Return transition relation of `interleaving_game`."""
+    vrs = interleaving_vars(aut)
+    relation = aut.false
+    for s in fx.turn_slices(aut):
+        u = s.cube & s.action
+        e = '{var} = {k}'.format(var=stx.prime(TURN), k=s.next_turn)
+        u &= aut.add_expr(e)
+        # others remain unchanged
+        for var in vrs.difference(s.vars, [TURN]):
+            u &= _unchanged(var, aut)
+        relation |= u
+    return relation
+
+
+def _unchanged(var, aut):
+    if aut.vars[var]['type'] == 'bool':
+        s = "{var}' <=> {var}"
+    else:
+        s = "{var}' = {var}"
+    return aut.add_expr(s.format(var=var))
+
+
+def team_mask(team, game, aut):
+    """Return states where a player in `team` moves."""
+    turns = game.space.values_of(TURN)
+    team_turns = [k for k, p in aut.turns.items() if p in team]
+    return np.isin(turns, team_turns)
+
+
+def exist_preimage(mask, game):
+    """Return states with some successor in `mask`."""
+    hits = np.bincount(
+        game.src, weights=mask[game.dst], minlength=game.n)
+    return hits > 0
+
+
+def forall_preimage(mask, game):
+    """Return states where some player moves, to only `mask`.
+
+    States where no player moves (turns that no player has)
+    are excluded, as by `fixpoint_interleaving.ue_preimage`.
+    """
+    hits = np.bincount(
+        game.src, weights=mask[game.dst], minlength=game.n)
+    return (hits == game.degree) & game.moving
+
+
+def ue_preimage(mask, team, game):
+    """Return states where `team` can force `mask` in one step.
+
+    @param team: boolean array of states where the team moves
+    """
+    return np.where(
+        team,
+        exist_preimage(mask, game),
+        forall_preimage(mask, game))
+
+
+def least_fixpoint(operator, target):
+    """Return least fixpoint of `operator | target`."""
+    q = target.copy()
+    while True:
+        new = operator(q) & ~ q
+        if not new.any():
+            return q
+        q |= new
+
+
+def ancestors(target, game, within=None):
+    """Return states from where `target` is reachable."""
+    if within is None:
+        return least_fixpoint(
+            lambda q: exist_preimage(q, game), target)
+    return least_fixpoint(
+        lambda q: exist_preimage(q, game) & within,
+        target & within)
+
+
+def closure(goals, game, start=None):
+    """Return cooperatively winning set for recurrence `goals`.
+
+    Same fixpoint as `closure_noninterleaving.closure`.
+
+    @param goals: `list` of boolean arrays
+    @param start: boolean array closed under successors
+    """
+    if start is None:
+        z = np.ones(game.n, dtype=bool)
+    else:
+        z = start.copy()
+    while True:
+        zold = z
+        z_pre = exist_preimage(zold, game)
+        for goal in goals:
+            z = z & ancestors(z_pre & goal, game, within=start)
+        if np.array_equal(z, zold):
+            return z
+
+
+def closure_bdd(players, aut, game, start=None):
+    """Return BDD of the closure, computed explicitly.
+
+    @param game: `Game` of `aut`
+    @param start: BDD, see `closure_noninterleaving.closure`
+    """
+    space = game.space
+    goals = [
+        space.from_bdd(goal, aut)
+        for p in players
+        for goal in aut.win[p]['[]<>']]
+    if start is not None:
+        start = space.from_bdd(start, aut)
+    z = closure(goals, game, start=start)
+    return space.to_bdd(z, aut)
@@ -0,0 +1,303 @@
+"""Interleaving fixpoint operators.
+
+At turn `k`, only the player `aut.turns[k]` moves,
+and the variable `TURN` changes to the next turn.
+The actions, renaming maps, and turn predicates that
+each turn needs are computed once per automaton, and
+reused in all iterations of the fixpoints.
+
+The results of `attractor` and `trap` are stored per
+automaton, and reused as results or as starting points
+of later fixpoints, until an action changes. At most
+`MAX_STORED` results are kept for each team, the most
+recently used, and results that a new one makes redundant
+as a starting point are dropped.
+"""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import collections
+import weakref
+
+import symbolic as sym
+
+
+TURN = sym.TURN
+# automaton -> `_TurnSlices`
+_slices = weakref.WeakKeyDictionary()
+# fixpoints stored for each team and kind
+MAX_STORED = 2**6
+
+
+class _TurnSlice(object):
+    """What the operators need for the turn of one player."""
+
+    def __init__(self, turn, next_turn, player, aut):
+        self.turn = turn
+        self.next_turn = next_turn
+        self.player = player
+        vrs = aut.varlist[player]
+        vrs_p = aut.prime_vars(vrs)
+        # TURN = turn
+        s = '{var} = {k}'.format(var=TURN, k=turn)
+        self.cube = aut.add_expr(s)
+        # TURN = next_turn
+        s = '{var} = {k}'.format(var=TURN, k=next_turn)
+        self.next_cube = aut.add_expr(s)
+        self.prime = dict(zip(vrs, vrs_p))
+        self.unprime = dict(zip(vrs_p, vrs))
+        self.vars = list(vrs)
+        self.primed_vars = vrs_p
+        # Action|_{TURN = turn}
+        self.action = aut.cofactor_turn(aut.action[player], turn=turn)
+
+
+class _TurnSlices(object):
+    """Slices for all turns, for the actions in `key`.
+
+    Also stores fixpoints computed with these actions:
+
+      - `attractors`: `frozenset` of players ->
+            target -> (result, converged)
+      - `traps`: `frozenset` of players ->
+            (safe, unless) -> (result, converged)
+      - `rings`: `frozenset` of players ->
+            target -> `list` of attractor rings
+
+    where `converged` is `False` if the computation was
+    interrupted, in which case `result` is the last iterate.
+    Each store is an `OrderedDict`, least recently used first,
+    see `_store`.
+    """
+
+    def __init__(self, aut):
+        self.key = _actions_key(aut)
+        self.attractors = dict()
+        self.traps = dict()
+        self.rings = dict()
+        turns = sorted(aut.turns)
+        assert turns, 'no player has a turn'
+        self.slices = list()
+        for i, k in enumerate(turns):
+            kp = turns[(i + 1) % len(turns)]
+            player = aut.turns[k]
+            s = _TurnSlice(k, kp, player, aut)
+            self.slices.append(s)
+
+
+def turn_slices(aut):
+    """Return `list` of `_TurnSlice`, one for each turn.
+
+    The slices are recomputed if an action in
+    `aut.action` has changed since the last call.
+    """
+    return _turn_slices(aut).slices
+
+
+def _turn_slices(aut):
+    """Return `_TurnSlices` for the current actions of `aut`."""
+    t = _slices.get(aut)
+    if t is None or t.key != _actions_key(aut):
+        t = _TurnSlices(aut)
+        _slices[aut] = t
+    return t
+
+
+def clear_store(aut):
+    """Forget the fixpoints stored for `aut`."""
+    t = _slices.get(aut)
+    if t is None:
+        return
+    t.attractors = dict()
+    t.traps = dict()
+    t.rings = dict()
+
+
+def _actions_key(aut):
+    """Return `tuple` of the actions of players that have a turn."""
+    return tuple(
+        aut.action[p] for _, p in sorted(aut.turns.items()))
+
+
+def preimage(target, aut):
+    """Return predecessors of `target`."""
+    pre = aut.false
+    for s in turn_slices(aut):
+        u = aut.cofactor_turn(target, turn=s.next_turn, memoize=False)
+        u = aut.let(s.prime, u)
+        u &= s.action
+        u = aut.exist(s.primed_vars, u)
+        pre |= u & s.cube
+    return pre
+
+
+def image(source, aut):
+    """Return successors of `source`."""
+    post = aut.false
+    for s in turn_slices(aut):
+        u = aut.cofactor_turn(source, turn=s.turn, memoize=False)
+        u &= s.action
+        u = aut.exist(s.vars, u)
+        u = aut.let(s.unprime, u)
+        post |= u & s.next_cube
+    return post
+
+
+def ue_preimage(target, team, aut):
+    """Return states where `team` can force `target` in one step.
+
+    At the turn of a player in `team`, some move should
+    lead to `target`. At the turn of other players,
+    all moves should lead to `target`.
+
+    @param team: container of players
+    """
+    pre = aut.false
+    for s in turn_slices(aut):
+        u = aut.cofactor_turn(target, turn=s.next_turn, memoize=False)
+        u = aut.let(s.prime, u)
+        if s.player in team:
+            u &= s.action
+            u = aut.exist(s.primed_vars, u)
+        else:
+            u |= ~ s.action
+            u = aut.forall(s.primed_vars, u)
+        pre |= u & s.cube
+    return pre
+
+
+def attractor(target, team, aut, rings=None):
+    """Return states from where `team` can force `target`.
+
+    If the attractor of `target` for `team` was computed
+    before, then return it. Otherwise, start from the union
+    of `target` with the stored attractors of subsets of
+    `target`, which are contained in the result.
+
+    @param rings: if a `list`, then extend it with the
+        states added at each iteration, starting with
+        `target`. The rings are stored too.
+    """
+    team = frozenset(team)
+    if rings is not None:
+        return _attractor_rings(target, team, rings, aut)
+    store = _store(_turn_slices(aut).attractors, team)
+    q, converged = _get(store, target)
+    if converged:
+        return q
+    q = target
+    for other, (u, _) in store.items():
+        if other <= target:
+            q |= u
+    qold = None
+    converged = False
+    try:
+        while q != qold:
+            qold = q
+            q |= ue_preimage(q, team, aut)
+        converged = True
+    finally:
+        # subsumed: applies only where `target` does, and smaller
+        _put(store, target, (q, converged), lambda other, u: (
+            target <= other and u <= q))
+    return q
+
+
+def _store(stores, team):
+    """Return store of `team` in `stores`."""
+    store = stores.get(team)
+    if store is None:
+        store = collections.OrderedDict()
+        stores[team] = store
+    return store
+
+
+def _get(store, key):
+    """Return `(result, converged)` stored for `key`."""
+    r = store.get(key)
+    if r is None:
+        return None, False
+    store.move_to_end(key)
+    return r
+
+
+def _put(store, key, value, is_redundant):
+    """Store `value`, dropping redundant and old entries.
+
+    @param is_redundant: function of `(key, result)` of
+        an entry, which returns `True` if the new entry
+        is as good a starting point wherever it applies
+    """
+    redundant = [
+        k for k, (u, _) in store.items()
+        if k != key and is_redundant(k, u)]
+    for k in redundant:
+        del store[k]
+    store[key] = value
+    store.move_to_end(key)
+    while len(store) > MAX_STORED:
+        store.popitem(last=False)
+
+
+def _attractor_rings(target, team, rings, aut):
+    """Return attractor, and extend `rings` with its rings."""
+    slices = _turn_slices(aut)
+    store = _store(slices.rings, team)
+    attractors = _store(slices.attractors, team)
+    q, converged = _get(attractors, target)
+    if target in store and converged:
+        store.move_to_end(target)
+        rings.extend(store[target])
+        return q
+    # warm starts would lose the ring of each state
+    new = [target]
+    q = target
+    qold = None
+    while q != qold:
+        qold = q
+        q |= ue_preimage(q, team, aut)
+        if q != qold:
+            new.append(q & ~ qold)
+    store[target] = new
+    while len(store) > MAX_STORED:
+        store.popitem(last=False)
+    _put(attractors, target, (q, True), lambda other, u: (
+        target <= other and u <= q))
+    rings.extend(new)
+    return q
+
+
+def trap(safe, team, aut, unless=None):
+    """Return states where `team` can stay in `safe` or reach `unless`.
+
+    Greatest fixpoint, within `safe | unless`.
+
+    If the trap was computed before, then return it.
+    Otherwise, start from the intersection of the stored
+    traps for supersets of both `safe` and `unless`,
+    which contain the result.
+    """
+    if unless is None:
+        unless = aut.false
+    team = frozenset(team)
+    store = _store(_turn_slices(aut).traps, team)
+    key = (safe, unless)
+    q, converged = _get(store, key)
+    if converged:
+        return q
+    q = aut.true
+    for (other_safe, other_unless), (u, _) in store.items():
+        if safe <= other_safe and unless <= other_unless:
+            q &= u
+    qold = None
+    converged = False
+    try:
+        while q != qold:
+            qold = q
+            q = (safe & ue_preimage(q, team, aut)) | unless
+        converged = True
+    finally:
+        # subsumed: applies only where `key` does, and larger
+        _put(store, key, (q, converged), lambda other, u: (
+            other[0] <= safe and other[1] <= unless and q <= u))
+    return q
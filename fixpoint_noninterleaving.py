@@ -2,8 +2,18 @@
 import symbolic as sym
 
 
+TURN = sym.TURN
+
+
 def preimage(target, aut):
-    """Return predecessor states of `target`, conjoining player actions."""
+    """Return predecessor states of `target`, conjoining player actions.
+
+    If the actions move `TURN` in round-robin order,
+    then use `turn_preimage`.
+    """
+    table = aut.turn_actions()
+    if table is not None and TURN in aut.vars_of_all_players:
+        return turn_preimage(target, aut, table)
     action = sym.conj_actions_of(aut.players, aut)
     vrs = aut.vars_of_all_players
     qvars = aut.prime_vars(vrs)
@@ -22,3 +32,36 @@ def image(source, aut):
     u = aut.exist(qvars, u)
     u = aut.replace_with_unprimed(qvars, u)
     return u
+
+
+def turn_preimage(target, aut, table=None):
+    r"""Return predecessor states of `target`, one turn at a time.
+
+    Pre(Target) ==
+        \/ \E k \in Turns:
+            /\ TURN = k
+            /\ \E x', y':
+                /\ Action|_{TURN = k, TURN' = k + 1}
+                /\ Target'|_{TURN' = k + 1}
+
+    Each slice of `Action` is a fraction of the whole.
+
+    @param table: as returned by `aut.turn_actions()`
+    """
+    if table is None:
+        table = aut.turn_actions()
+    assert table is not None, 'actions are not round-robin'
+    vrs = aut.vars_of_all_players
+    assert TURN in vrs, vrs
+    qvars = aut.prime_vars(vrs)
+    primed_target = aut.replace_with_primed(vrs, target)
+    pre = aut.false
+    for k, action in table.items():
+        kp = aut.next_turn(k)
+        u = aut.cofactor_turn(
+            primed_target, next_turn=kp, memoize=False)
+        u &= action
+        u = aut.exist(qvars, u)
+        s = '{turn} = {k}'.format(turn=TURN, k=k)
+        pre |= u & aut.add_expr(s)
+    return pre
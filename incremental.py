@@ -0,0 +1,261 @@
+r"""Incremental closure and unzip after editing actions.
+
+A `Result` keeps the actions, closure, unzipped actions, and
+the least fixpoints computed for them. After some actions
+change, `run` compares each action with the previous one:
+
+  - If the actions only became stronger (restricted), then the
+    closure can only shrink. So the greatest fixpoint starts
+    from the previous closure, instead of TRUE. The previous
+    closure also bounds the ancestor computations, because
+    cooperative paths from the new closure remain in it.
+
+  - If the actions only became weaker (relaxed), then the
+    states that can reach a target can only increase. So each
+    least fixpoint starts from the previous ancestors of the
+    same target, or of subsets of it.
+
+  - Otherwise, the closure is computed from scratch.
+
+Edits of recurrence goals are classified similarly: adding
+goals can only shrink the closure, removing goals can only
+enlarge it, and ancestors do not depend on goals.
+
+The projection of `unzip` for a player is
+
+  Inv /\ Action(player) /\ \E env_vars':  Inv' /\ Others
+
+where `Others` is the conjunction of the actions of the other
+players. The quantified factor is the expensive part, and is
+stored by the invariant and the actions that it depends on.
+So after editing the action of one player, the factor of that
+player is reused, if the invariant is unchanged.
+"""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import copy
+import logging
+
+import fixpoint_noninterleaving
+import symbolic as sym
+
+
+log = logging.getLogger(__name__)
+SAME = 'same'
+RESTRICTED = 'restricted'
+RELAXED = 'relaxed'
+CHANGED = 'changed'
+
+
+class Result(object):
+    """Results of a run, to warm start the next one."""
+
+    def __init__(
+            self, actions, goals, closure, unzipped,
+            ancestors, projections):
+        self.actions = actions  # player -> action
+        self.goals = goals  # player -> `set` of recurrence goals
+        self.closure = closure
+        self.unzipped = unzipped  # automaton, or `None`
+        self.ancestors = ancestors  # target -> ancestors
+        # key of `_projection_factor` -> factor
+        self.projections = projections
+
+
+def classify(old, new, aut, old_goals=None, new_goals=None):
+    """Return `dict` that maps each player to the kind of edit.
+
+    @param old, new: `dict` that map players to actions
+    @param old_goals, new_goals: `dict` that map players to
+        `set` of recurrence goals, or `None` to ignore goals
+    """
+    kinds = dict()
+    for player, u in new.items():
+        v = old.get(player)
+        if v is None:
+            kinds[player] = CHANGED
+        elif u == v:
+            kinds[player] = SAME
+        elif u & ~ v == aut.false:
+            kinds[player] = RESTRICTED
+        elif v & ~ u == aut.false:
+            kinds[player] = RELAXED
+        else:
+            kinds[player] = CHANGED
+    if old_goals is None or new_goals is None:
+        return kinds
+    for player, goals in new_goals.items():
+        kind = _classify_goals(old_goals.get(player), goals)
+        kinds[player] = _combine(kinds[player], kind)
+    return kinds
+
+
+def _classify_goals(old, new):
+    """Return the kind of edit of goals, as an edit of the closure."""
+    if old is None:
+        return CHANGED
+    if new == old:
+        return SAME
+    # more goals, smaller closure
+    if new >= old:
+        return RESTRICTED
+    if new <= old:
+        return RELAXED
+    return CHANGED
+
+
+def _combine(kind, other):
+    if kind == SAME:
+        return other
+    if other == SAME or other == kind:
+        return kind
+    return CHANGED
+
+
+def run(aut, previous=None, unzip=True):
+    """Return `Result` of closure (and unzip) for `aut`.
+
+    @param previous: `Result` of a run on the same
+        declarations, with other actions, or `None`
+    @param unzip: if `True`, then also unzip the closure
+    """
+    players = list(aut.players)
+    actions = {p: aut.action[p] for p in players}
+    goals = {p: set(aut.win[p]['[]<>']) for p in players}
+    if previous is None:
+        kinds = {p: CHANGED for p in players}
+    else:
+        kinds = classify(
+            previous.actions, actions, aut,
+            previous.goals, goals)
+    edits = set(kinds.values())
+    log.info('edits: {k}'.format(k=kinds))
+    ancestors = dict()
+    if edits == {SAME}:
+        z = previous.closure
+        ancestors = previous.ancestors
+    elif edits <= {SAME, RESTRICTED}:
+        z = closure(
+            players, aut, ancestors, start=previous.closure)
+    elif edits <= {SAME, RELAXED}:
+        z = closure(
+            players, aut, ancestors, warm=previous.ancestors)
+    else:
+        z = closure(players, aut, ancestors)
+    old = dict() if previous is None else previous.projections
+    projections = dict()
+    unzipped = None
+    if unzip:
+        unzipped = _unzip(z, players, aut, old, projections)
+    return Result(actions, goals, z, unzipped, ancestors, projections)
+
+
+def closure(players, aut, memo, start=None, warm=None):
+    """Return cooperatively winning set, storing ancestors in `memo`.
+
+    Same fixpoint as `closure_noninterleaving.closure`.
+
+    @param memo: `dict` that maps targets to ancestors,
+        updated with those computed here
+    @param start: superset of the closure to start from,
+        also used to bound ancestors
+    @param warm: `dict` from targets to subsets of their
+        ancestors, to start least fixpoints from
+    """
+    z = aut.true if start is None else start
+    zold = None
+    while z != zold:
+        zold = z
+        for p in players:
+            z &= _closure_for_one_player(
+                zold, p, aut, memo, start, warm)
+    return z
+
+
+def _closure_for_one_player(z, player, aut, memo, within, warm):
+    zold = None
+    while z != zold:
+        zold = z
+        z_pre = fixpoint_noninterleaving.preimage(zold, aut)
+        for goal in aut.win[player]['[]<>']:
+            target = z_pre & goal
+            z &= ancestors(target, aut, memo, within, warm)
+    return z
+
+
+def ancestors(target, aut, memo, within=None, warm=None):
+    """Return states from where `target` is cooperatively reachable.
+
+    @param memo, within, warm: see `closure`
+    """
+    if within is not None:
+        target &= within
+    y = memo.get(target)
+    if y is not None:
+        return y
+    y = target
+    if warm:
+        for other, u in warm.items():
+            if other <= target:
+                y |= u
+        if within is not None:
+            y &= within
+    yold = None
+    while y != yold:
+        yold = y
+        y |= fixpoint_noninterleaving.preimage(y, aut)
+        if within is not None:
+            y &= within
+    memo[target] = y
+    return y
+
+
+def _unzip(inv, players, aut, old, projections):
+    """Return unzipped automaton, reusing projections in `old`.
+
+    Same actions as `closure_noninterleaving.unzip`.
+    Adds to `projections` the factors used, so those that
+    depend on changed actions or invariant are dropped.
+    """
+    new_aut = copy.copy(aut)
+    for player in players:
+        key = _projection_key(inv, player, players, aut)
+        u = old.get(key)
+        if u is None:
+            u = _projection_factor(key, player, players, aut)
+        projections[key] = u
+        u &= inv
+        _, actions = key
+        if player not in dict(actions):
+            u &= aut.action[player]
+        assert sym.is_action_of_player(u, player, aut)
+        new_aut.action[player] = u
+    return new_aut
+
+
+def _projection_key(inv, player, players, aut):
+    """Return invariant and actions that the factor depends on.
+
+    These are the actions of the other players, and the action
+    of `player` if it constrains the primed variables of others.
+    """
+    depends = [p for p in players if p != player]
+    if not sym.is_action_of_player(aut.action[player], player, aut):
+        depends.append(player)
+    actions = tuple((p, aut.action[p]) for p in sorted(depends))
+    return (inv, actions)
+
+
+def _projection_factor(key, player, players, aut):
+    r"""Return `\E env_vars':  Inv' /\ Actions`, from `key`."""
+    inv, actions = key
+    others = set(players)
+    others.remove(player)
+    env_vars = aut.vars_of_players(others)
+    env_vars_p = aut.prime_vars(env_vars)
+    inv_p = aut.replace_with_primed(aut.vars_of_all_players, inv)
+    u = inv_p
+    for _, action in actions:
+        u &= action
+    return aut.exist(env_vars_p, u)
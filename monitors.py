@@ -0,0 +1,134 @@
+"""Compile state predicates to standalone Python monitors.
+
+The BDDs of the predicates are dumped as one shared node
+table, see `bdd.dump_nodes`, and written to a Python module
+together with a small interpreter. The module imports
+nothing, so components can check their assumptions
+without `dd` or `omega`. Evaluating a predicate follows
+one path of the BDD, so it takes a number of steps at most
+the number of bits of the variables.
+
+For example:
+
+```
+monitors.dump(
+    dict(eta_player=eta_player, inv_h=inv_h),
+    aut, 'contract_monitors.py')
+```
+
+and then, in the component:
+
+```
+import contract_monitors
+contract_monitors.evaluate('inv_h', dict(x=1, y=True))
+```
+"""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import importlib.util
+import pprint
+
+import bdd as _bdd
+
+
+TEMPLATE = '''\
+"""Monitors generated by `contract_maker`, do not edit.
+
+Predicates: {names}
+"""
+# variable -> type, and domain for integers
+VARS = {vrs}
+# (variable, bit index, low reference, high reference)
+# a reference is `2 * i + c`, where `i - 1` is the index of
+# a node in `NODES`, and `c = 1` for complemented edges,
+# so `0` references TRUE, and `1` references FALSE
+NODES = {nodes}
+# predicate name -> reference
+ROOTS = {roots}
+
+
+def evaluate(name, state):
+    """Return value of predicate `name` at `state`.
+
+    @param state: `dict` that maps variables to values
+    """
+    r = ROOTS[name]
+    c = 0
+    while r > 1:
+        c ^= r & 1
+        var, k, low, high = NODES[(r >> 1) - 1]
+        if (int(state[var]) >> k) & 1:
+            r = high
+        else:
+            r = low
+    return (c ^ r) == 0
+
+
+def evaluate_batch(name, states):
+    """Return `list` of values of predicate `name` at `states`."""
+    return [evaluate(name, state) for state in states]
+
+
+def evaluate_all(state):
+    """Return `dict` of values of all predicates at `state`."""
+    return {{name: evaluate(name, state) for name in ROOTS}}
+'''
+
+
+def compile_monitors(predicates, aut):
+    """Return source code of module that evaluates `predicates`.
+
+    @param predicates: `dict` that maps names to BDDs
+    """
+    names = sorted(predicates)
+    roots = [predicates[k] for k in names]
+    nodes, refs = _bdd.dump_nodes(roots)
+    vrs = set()
+    for u in roots:
+        vrs.update(aut.support(u))
+    bits = bit_indices(vrs, aut)
+    table = tuple(
+        bits[var] + (low, high)
+        for var, low, high in nodes)
+    types = {var: _type_of(var, aut) for var in sorted(vrs)}
+    return TEMPLATE.format(
+        names=', '.join(names),
+        vrs=pprint.pformat(types),
+        nodes=pprint.pformat(table),
+        roots=pprint.pformat(dict(zip(names, refs))))
+
+
+def _type_of(var, aut):
+    d = aut.vars[var]
+    if d['type'] == 'bool':
+        return ('bool',)
+    return ('int', tuple(d['dom']))
+
+
+def bit_indices(vrs, aut):
+    """Return `dict` that maps BDD bits to `(variable, index)`."""
+    bits = dict()
+    for var in vrs:
+        d = aut.vars[var]
+        if d['type'] == 'bool':
+            bits[var] = (var, 0)
+            continue
+        for k, bit in enumerate(d['bitnames']):
+            bits[bit] = (var, k)
+    return bits
+
+
+def dump(predicates, aut, fname):
+    """Write monitor module for `predicates` to file `fname`."""
+    s = compile_monitors(predicates, aut)
+    with open(fname, 'w') as f:
+        f.write(s)
+
+
+def load(fname):
+    """Return monitor module from file `fname`."""
+    spec = importlib.util.spec_from_file_location('monitors', fname)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
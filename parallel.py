@@ -0,0 +1,52 @@
+"""Run tasks on an automaton in worker processes.
+
+Each worker process loads the automaton once, into its own
+BDD manager, and then runs the tasks that it receives.
+"""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import concurrent.futures
+
+import serialization
+
+
+# `(aut, roots)` in worker processes
+_worker = None
+
+
+def map_tasks(f, tasks, aut, roots=None, processes=None):
+    """Return `list` of results of `f(aut, roots, task)`.
+
+    Each call happens in a worker process, with an automaton
+    loaded from `aut` and `roots` (see `serialization`).
+    The function `f` should be defined at the top level of
+    a module, and return picklable results. So `f` should
+    convert BDDs that it returns using
+    `serialization.dump_bdds`.
+
+    @param tasks: iterable of picklable arguments
+    @param processes: number of worker processes,
+        if `None`, then the number of CPUs
+    """
+    data = serialization.dump_automaton(aut, roots)
+    cls = type(aut)
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_initialize,
+            initargs=(data, cls)) as pool:
+        futures = [pool.submit(_call, f, task) for task in tasks]
+        return [x.result() for x in futures]
+
+
+def _initialize(data, cls):
+    """Load the automaton of this worker process."""
+    global _worker
+    aut = cls()
+    roots = serialization.load_automaton(data, aut)
+    _worker = (aut, roots)
+
+
+def _call(f, task):
+    aut, roots = _worker
+    return f(aut, roots, task)
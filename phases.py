@@ -0,0 +1,382 @@
+"""Timing and BDD statistics of named phases of a run."""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import contextlib
+import gc
+import json
+import logging
+import os
+import sys
+import threading
+import time
+try:
+    import resource
+except ImportError:  # not on Unix
+    resource = None
+
+
+log = logging.getLogger(__name__)
+# the recorder that `phase` reports to, if any
+_recorder = None
+# statistics that CUDD accumulates, so their differences
+# between the start and end of a phase are meaningful
+CUMULATIVE = (
+    'cache_lookups', 'cache_hits', 'cache_insertions',
+    'cache_collisions', 'cache_deletions',
+    'n_reorderings', 'reordering_time')
+# statistics that describe the current or peak state
+LEVELS = ('n_nodes', 'peak_nodes', 'peak_live_nodes', 'mem')
+# seconds between samples of memory use during phases
+SAMPLE_INTERVAL = 0.01
+
+
+class Recorder(object):
+    """Record the duration and BDD statistics of phases.
+
+    Each record is a `dict` with keys:
+
+      - `"name"`: names of enclosing phases, joined by `/`
+      - `"time"`: wall-clock duration, in seconds
+      - `"stats"`: `bdd.statistics()` when the phase ended
+      - `"delta"`: differences of the statistics `CUMULATIVE`
+        and `LEVELS` between the end and start of the phase,
+        and `"cache_hit_rate"` during the phase, see `delta`
+      - `"memory"`: memory use of this phase, a `dict` with
+        keys `"rss_start"`, `"rss_end"`, `"rss_peak"` (current
+        resident memory at the start and end of the phase,
+        and the most sampled during it, in bytes), and
+        `"nodes_start"`, `"nodes_end"`, `"nodes_peak"`
+        (live BDD nodes, likewise). Values are `None`
+        if unknown. The peak RSS is sampled by a thread,
+        every `sample_interval` seconds, which runs between
+        BDD operations (these hold the GIL). The peak nodes
+        are the peak that CUDD reports, if it increased
+        during the phase, otherwise they are sampled only
+        if `sample_nodes`.
+      - `"max_rss"`: peak resident memory of the process
+        until the phase ended, in bytes (`None` if unknown)
+
+    Records are appended to `self.records` in the order
+    that phases end, so nested phases precede their parent.
+
+    @param collect_garbage: if `True`, then collect garbage
+        at the end of each phase, see `collect_garbage`.
+    @param callback: if not `None`, then called with
+        each record, when the phase ends
+    @param sample_interval: seconds between samples
+        of memory use, or `None` to not sample
+    @param sample_nodes: if `True`, then also sample the
+        live nodes, which takes time linear in the size
+        of the unique table of CUDD
+    """
+
+    def __init__(self, collect_garbage=False, callback=None,
+                 sample_interval=SAMPLE_INTERVAL, sample_nodes=False):
+        self.records = list()
+        self.collect_garbage = collect_garbage
+        self.callback = callback
+        self.sample_interval = sample_interval
+        self.sample_nodes = sample_nodes
+        self._stack = list()
+        # peaks of the open phases, `[rss, nodes]` each
+        self._peaks = list()
+        self._sampler = None
+
+    @contextlib.contextmanager
+    def phase(self, name, bdd):
+        """Record phase `name` that uses the manager `bdd`."""
+        self._stack.append(name)
+        path = '/'.join(self._stack)
+        log.info('---- phase: {p} ----'.format(p=path))
+        stats_start = statistics(bdd)
+        rss_start = current_rss()
+        nodes_start = stats_start.get('n_nodes')
+        if nodes_start is None:
+            nodes_start = live_nodes(bdd)
+        peak = [rss_start, nodes_start]
+        self._peaks.append(peak)
+        self._start_sampler(bdd)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self._stack.pop()
+            self._peaks.pop()
+            if not self._stack:
+                self._stop_sampler()
+        if self.collect_garbage:
+            collect_garbage(bdd)
+        stats = statistics(bdd)
+        rss_end = current_rss()
+        nodes_end = stats.get('n_nodes')
+        if nodes_end is None:
+            nodes_end = live_nodes(bdd)
+        nodes_peak = _max(peak[1], nodes_end)
+        nodes_peak = _max(nodes_peak, new_peak(stats_start, stats))
+        memory = dict(
+            rss_start=rss_start,
+            rss_end=rss_end,
+            rss_peak=_max(peak[0], rss_end),
+            nodes_start=nodes_start,
+            nodes_end=nodes_end,
+            nodes_peak=nodes_peak)
+        record = dict(
+            name=path,
+            time=duration,
+            stats=stats,
+            delta=delta(stats_start, stats),
+            memory=memory,
+            max_rss=max_rss())
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+        log.info('==== phase: {p} ({t:1.3} sec) ===='.format(
+            p=path, t=duration))
+
+    def _start_sampler(self, bdd):
+        if self._sampler is not None or not self.sample_interval:
+            return
+        self._sampler = _Sampler(
+            self._peaks, bdd, self.sample_interval, self.sample_nodes)
+        self._sampler.start()
+
+    def _stop_sampler(self):
+        if self._sampler is None:
+            return
+        self._sampler.stop()
+        self._sampler = None
+
+    def format_memory(self):
+        """Return table of memory use during each phase.
+
+        The RSS and live nodes at the start of each phase,
+        and their peaks during the phase.
+        """
+        row = (
+            '{name:40} {t:>10} {rss:>10} {peak:>10} '
+            '{nodes:>10} {live:>10}')
+        c = [row.format(
+            name='phase', t='time (s)', rss='RSS start',
+            peak='RSS peak', nodes='nodes', live='peak nodes')]
+        for d in self.records:
+            m = d['memory']
+            s = row.format(
+                name=d['name'],
+                t='{t:1.3f}'.format(t=d['time']),
+                rss=_format_bytes(m['rss_start']),
+                peak=_format_bytes(m['rss_peak']),
+                nodes=_format_count(m['nodes_start']),
+                live=_format_count(m['nodes_peak']))
+            c.append(s)
+        return '\n'.join(c)
+
+    def format_deltas(self):
+        """Return table of statistics changes during each phase."""
+        row = (
+            '{name:40} {lookups:>12} {rate:>8} {reorder:>8} '
+            '{rtime:>10} {peak:>12}')
+        c = [row.format(
+            name='phase', lookups='cache looks', rate='hit rate',
+            reorder='reorder', rtime='reorder (s)', peak='+peak nodes')]
+        for d in self.records:
+            dt = d['delta']
+            rate = dt.get('cache_hit_rate')
+            rtime = dt.get('reordering_time')
+            s = row.format(
+                name=d['name'],
+                lookups=dt.get('cache_lookups', ''),
+                rate='' if rate is None else '{r:1.3f}'.format(r=rate),
+                reorder=dt.get('n_reorderings', ''),
+                rtime='' if rtime is None else '{t:1.3f}'.format(t=rtime),
+                peak=dt.get('peak_nodes', ''))
+            c.append(s)
+        return '\n'.join(c)
+
+    def dump_json(self, fname):
+        """Write `self.records` to file `fname` as JSON."""
+        d = dict(phases=self.records)
+        with open(fname, 'w') as f:
+            json.dump(d, f, indent=4)
+
+
+@contextlib.contextmanager
+def recording(recorder):
+    """Report the phases that run in this context to `recorder`."""
+    global _recorder
+    old = _recorder
+    _recorder = recorder
+    try:
+        yield recorder
+    finally:
+        _recorder = old
+
+
+@contextlib.contextmanager
+def phase(name, bdd):
+    """Delimit phase `name`, for the current recorder.
+
+    Does nothing outside of `recording`.
+    """
+    if _recorder is None:
+        yield
+        return
+    with _recorder.phase(name, bdd):
+        yield
+
+
+def statistics(bdd):
+    """Return `bdd.statistics()` as a `dict`.
+
+    Managers without statistics (pure Python ones)
+    yield an empty `dict`.
+    """
+    f = getattr(bdd, 'statistics', None)
+    if f is None:
+        return dict()
+    return dict(f())
+
+
+def delta(start, end):
+    """Return `dict` of differences of statistics `end - start`.
+
+    Includes the keys in `CUMULATIVE` and `LEVELS` that
+    both `start` and `end` contain, and `"cache_hit_rate"`,
+    the fraction of cache lookups during the phase that
+    were hits (`None` if no lookups).
+    """
+    d = {
+        k: end[k] - start[k]
+        for k in CUMULATIVE + LEVELS
+        if k in start and k in end}
+    lookups = d.get('cache_lookups')
+    if lookups:
+        d['cache_hit_rate'] = d['cache_hits'] / lookups
+    else:
+        d['cache_hit_rate'] = None
+    return d
+
+
+class _Sampler(threading.Thread):
+    """Update the peaks of memory use of open phases."""
+
+    def __init__(self, peaks, bdd, interval, sample_nodes):
+        super().__init__(daemon=True)
+        self.peaks = peaks
+        self.bdd = bdd
+        self.interval = interval
+        self.sample_nodes = sample_nodes
+        self._stop_event = threading.Event()
+
+    def run(self):
+        nodes = None
+        while not self._stop_event.wait(self.interval):
+            rss = current_rss()
+            if self.sample_nodes:
+                nodes = live_nodes(self.bdd)
+            for peak in list(self.peaks):
+                peak[0] = _max(peak[0], rss)
+                peak[1] = _max(peak[1], nodes)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _max(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return max(a, b)
+
+
+def collect_garbage(bdd):
+    """Release unreachable nodes of `bdd`.
+
+    Collects Python garbage, so that BDD references held
+    only by unreachable Python objects are released.
+    Then managers with a method `collect_garbage`
+    (`dd.bdd.BDD`) remove the unreferenced nodes.
+    CUDD removes the dead nodes by itself, when its
+    tables fill, so has no such method.
+    """
+    gc.collect()
+    f = getattr(bdd, 'collect_garbage', None)
+    if f is not None:
+        f()
+
+
+def current_rss():
+    """Return resident memory of this process, in bytes.
+
+    Return `None` if unknown (only Linux is supported).
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE')
+
+
+def live_nodes(bdd):
+    """Return number of live nodes of `bdd`, or `None`.
+
+    For CUDD, this is the statistic `"n_nodes"`, because
+    `len(bdd)` counts the referenced nodes, by traversing
+    the unique table.
+    """
+    n = statistics(bdd).get('n_nodes')
+    if n is not None:
+        return n
+    try:
+        return len(bdd)
+    except TypeError:
+        return None
+
+
+def new_peak(start, end):
+    """Return peak live nodes between statistics, or `None`.
+
+    CUDD reports the peak live nodes since the manager was
+    created, so this is the peak between `start` and `end`
+    only if it increased. Otherwise return `None`.
+    """
+    k = 'peak_live_nodes'
+    if k not in start or k not in end:
+        return None
+    if end[k] > start[k]:
+        return end[k]
+    return None
+
+
+def max_rss():
+    """Return peak resident memory of this process, in bytes.
+
+    Return `None` if unknown.
+    """
+    if resource is None:
+        return None
+    n = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    if sys.platform != 'darwin':
+        n *= 2**10
+    return n
+
+
+def _format_count(n):
+    if n is None:
+        return ''
+    return str(n)
+
+
+def _format_bytes(n):
+    if n is None:
+        return ''
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 2**10:
+            return '{n:1.1f} {u}'.format(n=n, u=unit)
+        n /= 2**10
+    return '{n:1.1f} TB'.format(n=n)
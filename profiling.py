@@ -0,0 +1,366 @@
+"""Profiling of contract construction runs."""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import collections
+import dis
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+
+# methods of `symbolic.Automaton` that `OperationProfiler` wraps
+METHODS = (
+    'exist', 'forall', 'let', 'add_expr', 'to_expr',
+    'replace_with_primed', 'replace_with_unprimed')
+
+
+class Sampler(object):
+    """Sample the call stack of a thread at fixed intervals.
+
+    Stacks are counted in the folded format that flame graph
+    tools read: one line per stack, with frames from outermost
+    to innermost, joined by `;`, followed by the count.
+
+    Samples are taken by a daemon thread, which runs only
+    when the sampled thread releases the GIL. So a long CUDD
+    call, which holds the GIL, yields a single sample, taken
+    where the thread next releases the GIL, usually shortly
+    after the call returns. To account for the time of the
+    call, each sample is weighted by the time since the
+    previous sample, so the counts are in microseconds.
+    """
+
+    def __init__(self, interval=0.005, thread_id=None):
+        if thread_id is None:
+            thread_id = threading.get_ident()
+        self.interval = interval
+        self.thread_id = thread_id
+        self.counts = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        assert self._thread is None, 'already started'
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            weight = int((now - last) * 10**6)
+            last = now
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.counts[folded_stack(frame)] += weight
+
+    def dump_folded(self, fname):
+        """Write microseconds per stack to file `fname`."""
+        with open(fname, 'w') as f:
+            for stack, n in self.counts.most_common():
+                f.write('{s} {n}\n'.format(s=stack, n=n))
+
+
+def folded_stack(frame):
+    """Return `str` of frames from outermost to `frame`."""
+    c = list()
+    while frame is not None:
+        c.append(frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(c))
+
+
+def frame_name(frame):
+    """Return `str` that identifies the line of `frame`."""
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return '{m}.{f}:{n}'.format(
+        m=module, f=code.co_name, n=frame.f_lineno)
+
+
+class OperationProfiler(object):
+    """Count and time BDD operations per call site.
+
+    The methods `METHODS` of the given classes are wrapped,
+    recording for each call the calling line, the time, and
+    the number of nodes of the result. The operators `&`, `|`,
+    `~` of BDDs are implemented in C, so they cannot be wrapped.
+    Instead, if `operators` is `True`, then the opcodes executed
+    in the modules of this directory are traced, and each
+    operator is timed until the next opcode of the same frame.
+    An operator is counted only if an operand is a BDD node.
+    The operands are found from the instructions that load
+    them, so only operands that are variables are checked,
+    for example in `u & v`, but not in `f(u) & v.attr`.
+    Tracing slows down the run, so compare the times of
+    operators with each other, not with those of methods.
+
+    Results are aggregated by `(operation, call site)`,
+    with the inclusive time of each call, and by call stack,
+    for flame graphs (`dump_folded`), with the self time of
+    each call: nested wrapped calls (for example `let`
+    inside `replace_with_primed`) are subtracted.
+    """
+
+    def __init__(self, classes, operators=True):
+        self.classes = classes
+        self.operators = operators
+        # (operation, site) -> [calls, seconds, nodes]
+        self.stats = collections.defaultdict(lambda: [0, 0.0, 0])
+        # folded stack -> microseconds
+        self.stacks = collections.Counter()
+        self._originals = list()
+        self._pending = dict()
+        # code -> offset -> (operator, operand loads)
+        self._operators_of = dict()
+        # time of nested wrapped calls, one entry per active call
+        self._nested = list()
+        self._wrapper_code = None
+        self._directory = os.path.dirname(os.path.abspath(__file__))
+
+    def start(self):
+        assert not self._originals, 'already started'
+        for cls in self.classes:
+            for name in METHODS:
+                f = getattr(cls, name, None)
+                if f is None:
+                    continue
+                self._originals.append((cls, name, cls.__dict__.get(name)))
+                setattr(cls, name, self._wrap(name, f))
+        if self.operators:
+            sys.settrace(self._trace)
+
+    def stop(self):
+        if self.operators:
+            sys.settrace(None)
+        for cls, name, f in reversed(self._originals):
+            if f is None:
+                delattr(cls, name)
+            else:
+                setattr(cls, name, f)
+        self._originals = list()
+
+    def _wrap(self, name, f):
+        profiler = self
+
+        @functools.wraps(f)
+        def wrapper(*args, **kw):
+            profiler._nested.append(0.0)
+            t0 = time.perf_counter()
+            try:
+                r = f(*args, **kw)
+            finally:
+                t = time.perf_counter() - t0
+                nested = profiler._nested.pop()
+                if profiler._nested:
+                    profiler._nested[-1] += t
+            caller = sys._getframe(1)
+            profiler.record(
+                name, frame_name(caller), profiler._stack(caller),
+                t, _node_count(r), self_seconds=t - nested)
+            return r
+        self._wrapper_code = wrapper.__code__
+        return wrapper
+
+    def _stack(self, frame):
+        """Return folded stack, naming wrappers by operation."""
+        c = list()
+        while frame is not None:
+            if frame.f_code is self._wrapper_code:
+                c.append(frame.f_locals['name'])
+            else:
+                c.append(frame_name(frame))
+            frame = frame.f_back
+        return ';'.join(reversed(c))
+
+    def record(self, operation, site, stack, seconds, nodes,
+               self_seconds=None):
+        """Add a call of `operation` at `site`.
+
+        @param site: as returned by `frame_name`
+        @param stack: as returned by `folded_stack`
+        @param self_seconds: time not spent in nested
+            wrapped calls, by default `seconds`
+        """
+        if self_seconds is None:
+            self_seconds = seconds
+        stat = self.stats[(operation, site)]
+        stat[0] += 1
+        stat[1] += seconds
+        stat[2] += nodes
+        stack = '{s};{op}'.format(s=stack, op=operation)
+        self.stacks[stack] += int(self_seconds * 10**6)
+
+    def _trace(self, frame, event, arg):
+        """Trace opcodes of frames of code in this directory."""
+        fname = os.path.abspath(frame.f_code.co_filename)
+        if os.path.dirname(fname) != self._directory:
+            return None
+        if fname == os.path.abspath(__file__):
+            return None
+        frame.f_trace_opcodes = True
+        return self._trace_opcode
+
+    def _trace_opcode(self, frame, event, arg):
+        pending = self._pending.pop(frame, None)
+        if pending is not None:
+            operation, site, stack, t0 = pending
+            t = time.perf_counter() - t0
+            self.record(operation, site, stack, t, 0)
+            if self._nested:
+                # inside a wrapped call
+                self._nested[-1] += t
+        if event != 'opcode':
+            return self._trace_opcode
+        operators = self._operators_of.get(frame.f_code)
+        if operators is None:
+            operators = _operators_in(frame.f_code)
+            self._operators_of[frame.f_code] = operators
+        r = operators.get(frame.f_lasti)
+        if r is None:
+            return self._trace_opcode
+        operation, loads = r
+        if not any(_is_bdd(_load(load, frame)) for load in loads):
+            return self._trace_opcode
+        site = frame_name(frame)
+        stack = self._stack(frame)
+        self._pending[frame] = (
+            operation, site, stack, time.perf_counter())
+        return self._trace_opcode
+
+    def format_stats(self, n=30):
+        """Return `str` table of the `n` most expensive entries."""
+        rows = sorted(
+            self.stats.items(), key=lambda kv: kv[1][1], reverse=True)
+        lines = ['{t:>10} {c:>8} {nodes:>12}  operation  site'.format(
+            t='time [s]', c='calls', nodes='nodes')]
+        for (operation, site), (calls, t, nodes) in rows[:n]:
+            lines.append(
+                '{t:10.3f} {c:8} {nodes:12}  {op}  {site}'.format(
+                    t=t, c=calls, nodes=nodes, op=operation, site=site))
+        return '\n'.join(lines)
+
+    def dump_json(self, fname):
+        """Write aggregated statistics to file `fname`."""
+        records = [
+            dict(operation=operation, site=site,
+                 calls=calls, time=t, nodes=nodes)
+            for (operation, site), (calls, t, nodes)
+            in self.stats.items()]
+        records.sort(key=lambda d: d['time'], reverse=True)
+        with open(fname, 'w') as f:
+            json.dump(records, f, indent=4)
+
+    def dump_folded(self, fname):
+        """Write microseconds of self time per stack to `fname`."""
+        with open(fname, 'w') as f:
+            for stack, n in self.stacks.most_common():
+                f.write('{s} {n}\n'.format(s=stack, n=n))
+
+
+def _operator_opcodes():
+    """Return `dict` that maps `(opcode, arg)` to operator names.
+
+    `arg` is `None` for opcodes that do not need an argument.
+    """
+    ops = dict()
+    names = dict(
+        BINARY_AND='&', INPLACE_AND='&',
+        BINARY_OR='|', INPLACE_OR='|',
+        UNARY_INVERT='~')
+    for name, op in names.items():
+        if name in dis.opmap:
+            ops[(dis.opmap[name], None)] = op
+    # Python >= 3.11
+    if 'BINARY_OP' in dis.opmap:
+        nb = dict(
+            NB_AND='&', NB_INPLACE_AND='&',
+            NB_OR='|', NB_INPLACE_OR='|')
+        for i, (name, _) in enumerate(dis._nb_ops):
+            if name in nb:
+                ops[(dis.opmap['BINARY_OP'], i)] = nb[name]
+    return ops
+
+
+_OPERATORS = _operator_opcodes()
+# instructions that push a variable, and where to find it
+_LOADS = dict(
+    LOAD_FAST='local', LOAD_FAST_CHECK='local',
+    LOAD_FAST_BORROW='local', LOAD_DEREF='local',
+    LOAD_GLOBAL='global', LOAD_NAME='global')
+_MISSING = object()
+
+
+def _operators_in(code):
+    """Return `dict` of operators in `code`, keyed by offset.
+
+    Each value is `(operator, loads)`, where `loads` are the
+    `(kind, name)` of the operands that the preceding
+    instructions load from variables.
+    """
+    ops = dict()
+    instructions = [
+        i for i in dis.get_instructions(code)
+        if i.opname != 'CACHE']
+    for k, ins in enumerate(instructions):
+        if ins.opname == 'BINARY_OP':
+            key = (ins.opcode, ins.arg)
+        else:
+            key = (ins.opcode, None)
+        operation = _OPERATORS.get(key)
+        if operation is None:
+            continue
+        n = 1 if operation == '~' else 2
+        ops[ins.offset] = (
+            operation, _operand_loads(instructions[:k], n))
+    return ops
+
+
+def _operand_loads(previous, n):
+    """Return loads of the last `n` operands, if variables."""
+    loads = list()
+    for ins in reversed(previous):
+        if len(loads) >= n:
+            break
+        if ins.opname in ('LOAD_FAST_LOAD_FAST',
+                          'LOAD_FAST_BORROW_LOAD_FAST_BORROW'):
+            loads.extend(('local', name) for name in ins.argval)
+            break
+        kind = _LOADS.get(ins.opname)
+        if kind is None:
+            break
+        loads.append((kind, ins.argval))
+    return loads[:n]
+
+
+def _load(load, frame):
+    """Return value of variable `load` in `frame`."""
+    kind, name = load
+    if kind == 'local':
+        return frame.f_locals.get(name, _MISSING)
+    if name in frame.f_globals:
+        return frame.f_globals[name]
+    return _MISSING
+
+
+def _is_bdd(u):
+    return hasattr(u, 'bdd') and hasattr(u, '__len__')
+
+
+def _node_count(r):
+    """Return number of nodes of BDD `r`, `0` if not a BDD."""
+    if hasattr(r, 'bdd') and hasattr(r, '__len__'):
+        return len(r)
+    return 0
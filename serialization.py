@@ -0,0 +1,151 @@
+"""Transfer automata between BDD managers and processes.
+
+An automaton is described by a `dict` of plain Python
+values (strings, numbers, lists, `dict`s), so it can be
+pickled, or written as JSON. The BDDs are stored as one
+node table, shared by all roots (see `bdd.dump_nodes`).
+"""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import copy
+
+import bdd as _bdd
+
+
+VERSION = 1
+
+
+def dump_automaton(aut, roots=None):
+    """Return `dict` that describes `aut`.
+
+    The `dict` contains the declarations, the variable
+    order, the players and their variables, and the BDDs
+    of `aut.init`, `aut.action`, `aut.win`, and `roots`.
+
+    @param roots: `dict` that maps names to BDD nodes
+        of other predicates to store with `aut`
+    """
+    if roots is None:
+        roots = dict()
+    bdd = aut.bdd
+    # collect nodes, remembering where each one belongs
+    us = list()
+    init = {k: _add(u, us) for k, u in aut.init.items()}
+    action = {k: _add(u, us) for k, u in aut.action.items()}
+    win = {
+        k: {s: [_add(u, us) for u in t] for s, t in d.items()}
+        for k, d in aut.win.items()}
+    extra = {k: _add(u, us) for k, u in roots.items()}
+    table, refs = _bdd.dump_nodes(us)
+    d = dict(
+        version=VERSION,
+        vars=copy.deepcopy(aut.vars),
+        levels={var: bdd.level_of_var(var) for var in bdd.vars},
+        players=dict(aut.players),
+        varlist={k: list(v) for k, v in aut.varlist.items()},
+        nodes=table,
+        init=_refs(init, refs),
+        action=_refs(action, refs),
+        win={
+            k: {s: [refs[i] for i in t] for s, t in v.items()}
+            for k, v in win.items()},
+        roots=_refs(extra, refs))
+    return d
+
+
+def _add(u, us):
+    """Append `u` to `us`, and return its index."""
+    us.append(u)
+    return len(us) - 1
+
+
+def _refs(d, refs):
+    return {k: refs[i] for k, i in d.items()}
+
+
+def load_automaton(d, aut):
+    """Populate `aut` from `dict` `d`, and return other roots.
+
+    Inverse of `dump_automaton`. The automaton `aut` should
+    be new, with its own BDD manager. Variables are added to
+    `aut.bdd` in the order given by `d['levels']`.
+
+    @type aut: `symbolic.Automaton`
+    @return: `dict` that maps names of other roots to nodes
+    """
+    version = d['version']
+    if version != VERSION:
+        raise ValueError(
+            'unknown version: {v}'.format(v=version))
+    bdd = aut.bdd
+    levels = d['levels']
+    for var in sorted(levels, key=levels.get):
+        bdd.add_var(var)
+    aut.vars = _tuple_doms(d['vars'])
+    aut.players = dict(d['players'])
+    aut.varlist = {k: list(v) for k, v in d['varlist'].items()}
+    # BDDs
+    names = list()
+    refs = list()
+    for attr in ('init', 'action', 'roots'):
+        for k, r in d[attr].items():
+            names.append((attr, k))
+            refs.append(r)
+    for k, v in d['win'].items():
+        for s, t in v.items():
+            for i, r in enumerate(t):
+                names.append(('win', k, s, i))
+                refs.append(r)
+    nodes = _bdd.load_nodes(d['nodes'], refs, bdd)
+    aut.init = dict()
+    aut.action = dict()
+    aut.win = {
+        k: {s: [None] * len(t) for s, t in v.items()}
+        for k, v in d['win'].items()}
+    roots = dict()
+    for name, u in zip(names, nodes):
+        attr = name[0]
+        if attr == 'init':
+            aut.init[name[1]] = u
+        elif attr == 'action':
+            aut.action[name[1]] = u
+        elif attr == 'roots':
+            roots[name[1]] = u
+        else:
+            _, k, s, i = name
+            aut.win[k][s][i] = u
+    return roots
+
+
+def _tuple_doms(vrs):
+    """Return declarations with `dom` as `tuple`, after JSON."""
+    r = dict()
+    for var, d in vrs.items():
+        d = copy.deepcopy(d)
+        if 'dom' in d:
+            d['dom'] = tuple(d['dom'])
+        r[var] = d
+    return r
+
+
+def dump_bdds(roots):
+    """Return `dict` that describes the BDDs in `dict` `roots`.
+
+    Use this to transfer results between managers that
+    declare the same variables.
+    """
+    names = list(roots)
+    nodes, refs = _bdd.dump_nodes(roots[k] for k in names)
+    return dict(nodes=nodes, roots=dict(zip(names, refs)))
+
+
+def load_bdds(d, bdd):
+    """Return `dict` of nodes in `bdd`, from `d`.
+
+    Inverse of `dump_bdds`.
+    """
+    names = list(d['roots'])
+    refs = [d['roots'][k] for k in names]
+    nodes = _bdd.load_nodes(d['nodes'], refs, bdd)
+    return dict(zip(names, nodes))
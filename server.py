@@ -0,0 +1,396 @@
+"""Local job server for contract construction.
+
+Clients connect over TCP, and send one JSON object per line:
+
+```
+{"id": "a", "spec": "examples:landing_gear_example",
+ "options": {"sys_player": "autopilot", "hidden": ["door"],
+             "phases": ["closure", "hiding"]}}
+```
+
+where instead of `"spec"`, a job can contain `"automaton"`,
+as returned by `serialization.dump_automaton`. The `"options"`
+are keyword arguments of `contracts_pinfo.main`. For a `"spec"`,
+they default to those of `cli.spec_options`.
+
+Only modules in `SPEC_MODULES` (or given with `--spec-module`)
+can be named in `"spec"`. The `"id"` of a job is optional,
+and should differ from the ids of the client's unfinished
+jobs. Lines longer than `MAX_LINE` close the connection.
+
+Jobs are queued, and run by long-lived worker processes,
+which import the solver modules and build the parsers
+once, when they start. Workers that exit are replaced.
+For each job, the server sends back JSON lines with the
+same `"id"`:
+
+  - `{"event": "phase", "record": ...}` when a phase ends,
+    see `phases.Recorder`
+  - `{"event": "done", "results": ...}` with a summary of the
+    results, see `summarize`
+  - `{"event": "error", "message": ...}` if the job failed
+
+Start with `python server.py --port 8765 --workers 4`.
+"""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import argparse
+import asyncio
+import collections
+import json
+import logging
+import multiprocessing
+import traceback
+
+
+log = logging.getLogger(__name__)
+HOST = '127.0.0.1'
+PORT = 8765
+# longest line that a client can send, in bytes
+MAX_LINE = 2**28
+# seconds between checks that workers are alive
+POLL = 0.5
+# modules that `"spec"` can name
+SPEC_MODULES = ('examples',)
+# `main` options that clients may set
+OPTIONS = (
+    'sys_player', 'hidden', 'players', 'phases',
+    'reachable', 'processes', 'engine')
+
+
+class Server(object):
+    """Queue jobs from clients, and dispatch them to workers.
+
+    Each job is assigned a key by the server, and the events
+    of the job are sent back to the connection that sent it,
+    with the `"id"` given by the client. Worker processes that
+    exit during a job are replaced, and the job fails.
+    """
+
+    def __init__(
+            self, workers=None, bdd_config=None,
+            spec_modules=SPEC_MODULES, max_line=MAX_LINE):
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        self.bdd_config = bdd_config
+        self.spec_modules = set(spec_modules)
+        self.max_line = max_line
+        self.events = multiprocessing.Queue()
+        self.workers = [self._start_worker(i) for i in range(workers)]
+        # jobs not yet sent to a worker
+        self._pending = collections.deque()
+        # job key -> (writer, id of job given by client)
+        self._jobs = dict()
+        self._n_jobs = 0
+        self._closing = False
+
+    def _start_worker(self, index):
+        """Return new `_Worker`, after starting its process.
+
+        Workers are not daemonic, so that they can start
+        processes of their own, see `contracts_pinfo.main`.
+        """
+        jobs = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=_worker_loop,
+            args=(index, jobs, self.events, self.bdd_config))
+        process.start()
+        return _Worker(process, jobs)
+
+    async def serve(self, host=HOST, port=PORT):
+        loop = asyncio.get_event_loop()
+        relay = loop.create_task(self._relay_events())
+        watch = loop.create_task(self._watch_workers())
+        server = await asyncio.start_server(
+            self._handle_client, host, port, limit=self.max_line)
+        log.info('serving on {h}:{p}'.format(h=host, p=port))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._closing = True
+            watch.cancel()
+            self.events.put(None)
+            await relay
+            self._stop_workers()
+
+    def _stop_workers(self, timeout=5):
+        for w in self.workers:
+            w.jobs.put(None)
+        for w in self.workers:
+            w.process.join(timeout)
+            if w.process.is_alive():
+                w.process.terminate()
+                w.process.join()
+
+    async def _handle_client(self, reader, writer):
+        """Read jobs from a client, one JSON object per line."""
+        # ids of this client's jobs -> job keys
+        ids = dict()
+        while True:
+            try:
+                line = await reader.readline()
+            except (ValueError, asyncio.LimitOverrunError):
+                # the rest of the line cannot be told apart
+                # from the next line, so close the connection
+                _write(writer, dict(
+                    event='error',
+                    message='line longer than {n} bytes'.format(
+                        n=self.max_line)))
+                await writer.drain()
+                break
+            if not line:
+                break
+            try:
+                job = json.loads(line)
+                self._check_job(job)
+            except ValueError as e:
+                _write(writer, dict(event='error', message=str(e)))
+                await writer.drain()
+                continue
+            self._n_jobs += 1
+            key = self._n_jobs
+            job_id = job.get('id', key)
+            if job_id in ids:
+                _write(writer, dict(
+                    event='error',
+                    message='a job with id {i} is running'.format(
+                        i=job_id)))
+                await writer.drain()
+                continue
+            ids[job_id] = key
+            self._jobs[key] = (writer, job_id, ids)
+            job['key'] = key
+            self._pending.append(job)
+            self._dispatch()
+            _write(writer, dict(id=job_id, event='queued'))
+            await writer.drain()
+        writer.close()
+
+    def _check_job(self, job):
+        """Raise `ValueError` if `job` is malformed."""
+        if not isinstance(job, dict):
+            raise ValueError('a job should be a JSON object')
+        if not isinstance(job.get('id', 0), (str, int)):
+            raise ValueError('"id" should be a string or integer')
+        if ('spec' in job) == ('automaton' in job):
+            raise ValueError(
+                'a job should have either "spec" or "automaton"')
+        unknown = set(job.get('options', dict())).difference(OPTIONS)
+        if unknown:
+            raise ValueError(
+                'unknown options: {u}'.format(u=sorted(unknown)))
+        if 'spec' in job:
+            module = _spec_module(job['spec'])
+            if module not in self.spec_modules:
+                raise ValueError(
+                    'spec module "{m}" is not served'.format(m=module))
+
+    def _dispatch(self):
+        """Send pending jobs to idle workers."""
+        for w in self.workers:
+            if not self._pending:
+                return
+            if w.key is not None:
+                continue
+            job = self._pending.popleft()
+            w.key = job['key']
+            w.jobs.put(job)
+
+    async def _relay_events(self):
+        """Send events from workers to the clients of jobs."""
+        loop = asyncio.get_event_loop()
+        while True:
+            event = await loop.run_in_executor(None, self.events.get)
+            if event is None:
+                return
+            worker = event.pop('worker')
+            if event['event'] in ('done', 'error'):
+                w = self.workers[worker]
+                if w.key == event['key']:
+                    w.key = None
+                self._dispatch()
+            await self._send(event)
+
+    async def _send(self, event):
+        """Send `event` to the client of its job.
+
+        Events of finished jobs are dropped.
+        """
+        key = event.pop('key')
+        if key not in self._jobs:
+            return
+        writer, job_id, ids = self._jobs[key]
+        if event['event'] in ('done', 'error'):
+            self._jobs.pop(key)
+            ids.pop(job_id, None)
+        if writer.is_closing():
+            return
+        event['id'] = job_id
+        _write(writer, event)
+        await writer.drain()
+
+    async def _watch_workers(self):
+        """Replace workers that exit, failing their jobs."""
+        while not self._closing:
+            await asyncio.sleep(POLL)
+            for i, w in enumerate(self.workers):
+                code = w.process.exitcode
+                if code is None:
+                    continue
+                log.warning('worker {i} exited with code {c}'.format(
+                    i=i, c=code))
+                self.workers[i] = self._start_worker(i)
+                if w.key is None:
+                    continue
+                await self._send(dict(
+                    key=w.key, event='error',
+                    message='worker exited with code {c}'.format(
+                        c=code)))
+            self._dispatch()
+
+
+class _Worker(object):
+    """Worker process, its job queue, and the key of its job."""
+
+    def __init__(self, process, jobs):
+        self.process = process
+        self.jobs = jobs
+        self.key = None
+
+
+def _write(writer, d):
+    writer.write(json.dumps(d).encode('utf-8') + b'\n')
+
+
+def _spec_module(spec):
+    """Return name of module of `spec`, see `cli.load_spec`."""
+    if not isinstance(spec, str):
+        raise ValueError('"spec" should be a string')
+    if ':' not in spec:
+        return 'examples'  # `cli.DEFAULT_MODULE`
+    return spec.rsplit(':', 1)[0]
+
+
+def _worker_loop(index, jobs, events, bdd_config):
+    """Run jobs until receiving `None`.
+
+    If the warm up fails, then report the failure for each job.
+    """
+    try:
+        _warm_up()
+        failure = None
+    except Exception:
+        failure = traceback.format_exc()
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        key = job['key']
+        if failure is not None:
+            events.put(dict(
+                key=key, worker=index, event='error', message=failure))
+            continue
+        try:
+            results = run_job(job, events, index, bdd_config)
+            events.put(dict(
+                key=key, worker=index, event='done', results=results))
+        except Exception:
+            events.put(dict(
+                key=key, worker=index, event='error',
+                message=traceback.format_exc()))
+
+
+def _warm_up():
+    """Import solvers and build parsers."""
+    import importlib
+    import symbolic as sym
+    importlib.import_module('contracts_pinfo')
+    sym.meta_parser()
+
+
+def run_job(job, events, worker, bdd_config=None):
+    """Run `contracts_pinfo.main` for `job`, return summary.
+
+    @param bdd_config: `dict` of CUDD parameters of the automaton
+    """
+    import cli
+    import contracts_pinfo as pinfo
+    import phases as _phases
+    import serialization
+    key = job['key']
+    if 'spec' in job:
+        f = cli.load_spec(job['spec'])
+        aut = cli.make_automaton(f, bdd_config)
+        options = cli.spec_options(f)
+    else:
+        aut = pinfo.Automaton(bdd_config)
+        serialization.load_automaton(job['automaton'], aut)
+        options = dict()
+    options.update(job.get('options', dict()))
+    options.setdefault('inv_pdf', None)
+
+    def send(record):
+        events.put(dict(
+            key=key, worker=worker, event='phase', record=record))
+
+    recorder = _phases.Recorder(callback=send)
+    with _phases.recording(recorder):
+        results = pinfo.main(aut, **options)
+    return summarize(results, aut)
+
+
+def summarize(results, aut):
+    """Return JSON-serializable summary of the results of `main`.
+
+    BDDs are summarized by their number of nodes,
+    and automata by their players.
+    """
+    d = dict()
+    for k, v in results.items():
+        if hasattr(v, 'bdd') and hasattr(v, '__len__'):
+            d[k] = dict(nodes=len(v))
+        elif hasattr(v, 'players'):
+            d[k] = dict(players=sorted(v.players))
+        else:
+            d[k] = v
+    return d
+
+
+def main(argv=None):
+    import cli
+    p = argparse.ArgumentParser(
+        description='Serve contract construction jobs.')
+    p.add_argument('--host', default=HOST)
+    p.add_argument('--port', type=int, default=PORT)
+    p.add_argument(
+        '--workers', type=int, default=None,
+        help='number of worker processes (default: CPUs)')
+    p.add_argument(
+        '--max-memory', type=cli.parse_size, default=None,
+        help='CUDD memory limit of each worker, for example `4GB`')
+    p.add_argument(
+        '--max-cache-hard', type=cli.parse_size, default=None,
+        help='CUDD hard limit of cache entries, for example `32M`')
+    p.add_argument(
+        '--spec-module', nargs='+', default=list(SPEC_MODULES),
+        help='modules that jobs can name in "spec" (default: examples)')
+    p.add_argument(
+        '--max-line', type=cli.parse_size, default=MAX_LINE,
+        help='longest job that a client can send, for example `1GB`')
+    p.add_argument('--log-level', default='INFO')
+    args = p.parse_args(argv)
+    logging.basicConfig(level=args.log_level)
+    config = dict(
+        max_memory=args.max_memory,
+        max_cache_hard=args.max_cache_hard)
+    config = {k: v for k, v in config.items() if v is not None}
+    server = Server(
+        workers=args.workers, bdd_config=config,
+        spec_modules=args.spec_module, max_line=args.max_line)
+    asyncio.run(server.serve(host=args.host, port=args.port))
+
+
+if __name__ == '__main__':
+    main()
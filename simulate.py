@@ -0,0 +1,397 @@
+"""Batched random simulation of actions.
+
+Many executions (walkers) advance together, one step at
+a time, as rows of an integer array of variable values.
+At each step, each walker samples a successor of its
+state uniformly at random, one bit at a time, from the BDD
+of the relation restricted to that state, using counts of
+satisfying assignments. So the successors are never
+enumerated, see `Simulator`.
+
+State predicates (invariant, goals) are evaluated for all
+walkers at once, by interpreting the BDD nodes as arrays,
+see `Evaluator`.
+"""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import collections
+
+import numpy as np
+
+import bdd as _bdd
+import symbolic as sym
+
+
+# number of states whose successors are cached
+CACHE_SIZE = 2**12
+
+
+class Evaluator(object):
+    """Evaluate BDDs over batches of states.
+
+    The BDDs are dumped as a node table, see `bdd.dump_nodes`,
+    which is evaluated bottom up for all states at once.
+    """
+
+    def __init__(self, roots, vrs, aut):
+        """Dump `roots`, with support in `vrs`.
+
+        @param roots: `list` of BDDs
+        @param vrs: `list` of variables, the columns of states
+        """
+        self.nodes, self.refs = _bdd.dump_nodes(roots)
+        self.bits = bit_columns(vrs, aut)
+
+    def __call__(self, values):
+        """Return `list` of boolean arrays, one for each root.
+
+        @param values: integer array of shape `(m, len(vrs))`
+        """
+        values = np.asarray(values)
+        m = len(values)
+        table = np.empty((len(self.nodes) + 1, m), dtype=bool)
+        table[0] = True
+        for i, (var, low, high) in enumerate(self.nodes, 1):
+            column, k = self.bits[var]
+            b = (values[:, column] >> k) & 1
+            table[i] = np.where(
+                b.astype(bool),
+                _ref(high, table),
+                _ref(low, table))
+        return [_ref(r, table) for r in self.refs]
+
+
+def _ref(r, table):
+    u = table[r // 2]
+    if r % 2:
+        u = ~ u
+    return u
+
+
+def bit_columns(vrs, aut):
+    """Return `dict` that maps each BDD bit to column and bit index.
+
+    Integer values are represented in two's complement,
+    so the bit `k` of `value` is `(value >> k) & 1`.
+    """
+    bits = dict()
+    for column, var in enumerate(vrs):
+        d = aut.vars[var]
+        if d['type'] == 'bool':
+            bits[var] = (column, 0)
+            continue
+        for k, bit in enumerate(d['bitnames']):
+            bits[bit] = (column, k)
+    return bits
+
+
+class Simulator(object):
+    """Random executions of the conjunction of `actions`.
+
+    For each current state, the successors are the BDD over
+    primed bits that `let` yields from the relation. Each node
+    of that BDD stores the number of assignments to the primed
+    bits below it (`_Successors`), so each walker samples one
+    successor uniformly, bit by bit, without enumerating them.
+    The walkers of all states are sampled together.
+    The BDDs of the most recently visited states are cached,
+    up to `cache_size` states.
+    """
+
+    def __init__(self, actions, aut, vrs=None, seed=None,
+                 cache_size=CACHE_SIZE):
+        """Simulate `actions`.
+
+        @param actions: `dict` that maps players to actions,
+            for example `unzip(...).action`
+        @param vrs: state variables, by default
+            `aut.vars_of_all_players`
+        """
+        if vrs is None:
+            vrs = aut.vars_of_all_players
+        self.aut = aut
+        self.vars = sorted(vrs)
+        self.primed_vars = aut.prime_vars(self.vars)
+        self.relation = aut.true
+        for u in actions.values():
+            self.relation &= u
+        # type-correct successors only
+        types = aut.add_expr(aut.type_hint_for(self.primed_vars))
+        self.relation &= types
+        self.bits = list()
+        for var in self.primed_vars:
+            d = aut.vars[var]
+            if d['type'] == 'bool':
+                self.bits.append(var)
+            else:
+                self.bits.extend(d['bitnames'])
+        self.random = np.random.default_rng(seed)
+        self.cache_size = cache_size
+        # state `tuple` -> `_Successors`, least recent first
+        self.successors = collections.OrderedDict()
+
+    def initial_states(self, init, n, limit=10**5):
+        """Return `n` states sampled from at most `limit` in `init`."""
+        types = self.aut.add_expr(self.aut.type_hint_for(self.vars))
+        it = self.aut.pick_iter(init & types, care_vars=set(self.vars))
+        rows = list()
+        for d in it:
+            rows.append([int(d[var]) for var in self.vars])
+            if len(rows) >= limit:
+                break
+        assert rows, 'no initial states'
+        rows = np.array(rows, dtype=np.int64)
+        index = self.random.integers(len(rows), size=n)
+        return rows[index]
+
+    def bit_positions(self):
+        """Return `dict` that maps primed bits to positions.
+
+        Positions follow the current variable order.
+        """
+        bdd = self.aut.bdd
+        bits = sorted(self.bits, key=bdd.level_of_var)
+        return {bit: i for i, bit in enumerate(bits)}
+
+    def successors_of(self, state, position):
+        """Return `_Successors` of `state`.
+
+        @param position: `self.bit_positions()`
+        """
+        key = tuple(int(x) for x in state)
+        r = self.successors.get(key)
+        if r is not None and r.position == position:
+            self.successors.move_to_end(key)
+            return r
+        aut = self.aut
+        values = {
+            var: _value(var, x, aut)
+            for var, x in zip(self.vars, key)}
+        u = aut.let(values, self.relation)
+        r = _Successors(u, position)
+        self.successors[key] = r
+        while len(self.successors) > self.cache_size:
+            self.successors.popitem(last=False)
+        return r
+
+    def step(self, states):
+        """Return successors of `states`, and mask of dead ends.
+
+        Walkers at dead ends remain where they are.
+        """
+        position = self.bit_positions()
+        unique, inverse = np.unique(
+            states, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        tables = [self.successors_of(s, position) for s in unique]
+        pos, low, high, count, roots = _concatenate(tables)
+        ref = roots[inverse]
+        n = len(position)
+        dead = _ref_count(ref, 0, pos, count, n) == 0
+        m = len(states)
+        bits = np.zeros((m, n), dtype=np.int64)
+        for t in range(n):
+            j = ref >> 1
+            at = pos[j] == t
+            c = ref & 1
+            lo = low[j] ^ c
+            hi = high[j] ^ c
+            n_lo = _ref_count(lo, t + 1, pos, count, n)
+            n_hi = _ref_count(hi, t + 1, pos, count, n)
+            total = np.maximum(n_lo + n_hi, 1.0)
+            # bits below the node are free
+            p = np.where(at, n_hi / total, 0.5)
+            b = self.random.random(m) < p
+            ref = np.where(at, np.where(b, hi, lo), ref)
+            bits[:, t] = b
+        new = states.copy()
+        values = self._decode(bits, position)
+        alive = ~ dead
+        new[alive] = values[alive]
+        return new, dead
+
+    def _decode(self, bits, position):
+        """Return integer array of values from sampled `bits`."""
+        aut = self.aut
+        values = np.zeros((len(bits), len(self.vars)), dtype=np.int64)
+        for column, var in enumerate(self.primed_vars):
+            d = aut.vars[var]
+            if d['type'] == 'bool':
+                values[:, column] = bits[:, position[var]]
+                continue
+            names = d['bitnames']
+            for k, bit in enumerate(names):
+                values[:, column] |= bits[:, position[bit]] << k
+            if d.get('signed', False):
+                width = len(names)
+                msb = 1 << (width - 1)
+                x = values[:, column]
+                values[:, column] = np.where(
+                    x & msb, x - (1 << width), x)
+        return values
+
+
+class _Successors(object):
+    """BDD over primed bits, with counts of assignments.
+
+    Nodes are numbered as in `bdd.dump_nodes`. For each node,
+    `pos` is the position of its bit (`n` for the terminal),
+    and `count` the number of assignments to the bits at
+    positions from `pos` to `n`, that satisfy the node.
+    """
+
+    def __init__(self, u, position):
+        self.position = position
+        n = len(position)
+        nodes, (self.root,) = _bdd.dump_nodes([u])
+        k = len(nodes) + 1
+        self.pos = np.full(k, n, dtype=np.int64)
+        self.low = np.zeros(k, dtype=np.int64)
+        self.high = np.zeros(k, dtype=np.int64)
+        self.count = np.ones(k, dtype=np.float64)
+        for i, (bit, low, high) in enumerate(nodes, 1):
+            t = position[bit]
+            self.pos[i] = t
+            self.low[i] = low
+            self.high[i] = high
+            self.count[i] = (
+                _ref_count(low, t + 1, self.pos, self.count, n) +
+                _ref_count(high, t + 1, self.pos, self.count, n))
+
+
+def _concatenate(tables):
+    """Return node arrays of `tables`, and their roots.
+
+    The terminal is shared, so references are shifted
+    by the offset of each table, except for the terminal.
+    """
+    pos = [tables[0].pos[:1]]
+    low = [np.zeros(1, dtype=np.int64)]
+    high = [np.zeros(1, dtype=np.int64)]
+    count = [np.ones(1)]
+    roots = list()
+    offset = 0
+    for t in tables:
+        pos.append(t.pos[1:])
+        low.append(_shift(t.low[1:], offset))
+        high.append(_shift(t.high[1:], offset))
+        count.append(t.count[1:])
+        roots.append(_shift(np.array([t.root]), offset)[0])
+        offset += len(t.pos) - 1
+    return (
+        np.concatenate(pos), np.concatenate(low),
+        np.concatenate(high), np.concatenate(count),
+        np.array(roots, dtype=np.int64))
+
+
+def _shift(refs, offset):
+    """Return `refs` to nodes moved by `offset`."""
+    return np.where(refs > 1, refs + 2 * offset, refs)
+
+
+def _ref_count(ref, t, pos, count, n):
+    """Return number of assignments to bits from `t` that satisfy `ref`.
+
+    Works for integer and array `ref`.
+    """
+    j = ref >> 1
+    c = count[j]
+    free = n - pos[j]
+    c = np.where(ref & 1, 2.0 ** free - c, c)
+    # bits from `t` until the node are free
+    return c * 2.0 ** (pos[j] - t)
+
+
+def _value(var, x, aut):
+    if aut.vars[var]['type'] == 'bool':
+        return bool(x)
+    return x
+
+
+def simulate(
+        actions, aut, init=None, inv=None, goals=None,
+        walkers=1000, steps=100, seed=None):
+    """Run random executions, return `dict` report.
+
+    @param actions: `dict` of actions, as for `Simulator`
+    @param init: initial condition, by default the
+        conjunction of `aut.init` of `aut.players`
+    @param inv: state predicate checked at each step
+    @param goals: `dict` that maps names to state predicates,
+        the visits to which are counted
+    @return: `dict` with keys:
+        - `"vars"`: `list` of state variables
+        - `"violations"`: number of walkers that left `inv`
+        - `"first_violation"`: step of the first violation,
+          or `None`
+        - `"violating_state"`: values of `vars` at the first
+          violation, or `None`
+        - `"dead_ends"`: number of walkers that reached a dead end
+        - `"visits"`: goal name -> total number of visits
+        - `"walkers_visiting"`: goal name -> number of walkers
+          that visited the goal at least once
+    """
+    sim = Simulator(actions, aut, seed=seed)
+    if init is None:
+        init = sym.conj_init_of(aut.players, aut)
+    if inv is None:
+        inv = aut.true
+    if goals is None:
+        goals = dict()
+    names = sorted(goals)
+    evaluator = Evaluator(
+        [inv] + [goals[k] for k in names], sim.vars, aut)
+    states = sim.initial_states(init, walkers)
+    violated = np.zeros(walkers, dtype=bool)
+    dead = np.zeros(walkers, dtype=bool)
+    visits = np.zeros((len(names), walkers), dtype=np.int64)
+    first = None
+    violating_state = None
+    for t in range(steps + 1):
+        ok, *reached = evaluator(states)
+        bad = ~ ok & ~ violated
+        if first is None and bad.any():
+            first = t
+            row = states[np.flatnonzero(bad)[0]]
+            violating_state = dict(zip(sim.vars, row.tolist()))
+        violated |= ~ ok
+        for i, u in enumerate(reached):
+            visits[i] += u
+        if t == steps:
+            break
+        states, d = sim.step(states)
+        dead |= d
+    return dict(
+        vars=sim.vars,
+        violations=int(violated.sum()),
+        first_violation=first,
+        violating_state=violating_state,
+        dead_ends=int(dead.sum()),
+        visits={
+            k: int(visits[i].sum()) for i, k in enumerate(names)},
+        walkers_visiting={
+            k: int((visits[i] > 0).sum()) for i, k in enumerate(names)})
+
+
+def goals_of(aut):
+    """Return `dict` of recurrence goals, named by player and index."""
+    return {
+        '{p}_{i}'.format(p=p, i=i): u
+        for p in aut.players
+        for i, u in enumerate(aut.win[p].get('[]<>', list()))}
+
+
+def print_report(report):
+    """Print the result of `simulate`."""
+    print('walkers that violated the invariant: {n}'.format(
+        n=report['violations']))
+    if report['first_violation'] is not None:
+        print('first violation at step {t}: {s}'.format(
+            t=report['first_violation'], s=report['violating_state']))
+    print('walkers that reached a dead end: {n}'.format(
+        n=report['dead_ends']))
+    for k in sorted(report['visits']):
+        print('goal {k}: {n} visits, by {m} walkers'.format(
+            k=k, n=report['visits'][k],
+            m=report['walkers_visiting'][k]))
@@ -0,0 +1,95 @@
+"""Memoryless strategies from attractor rings.
+
+The attractor of a target is computed once, keeping the
+states added at each iteration (ring differences).
+From a state in ring `k > 0`, the strategy moves to rings
+`< k`, so the target is reached within `k` steps.
+The strategy relation is then simplified outside the
+attractor, where its value does not matter.
+"""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import care as _care
+import cpre_noninterleaving as cpre
+import fixpoint_interleaving as fx
+import symbolic as sym
+
+
+TURN = sym.TURN
+
+
+def noninterleaving(target, aut):
+    """Return attractor, rings, and strategy for reaching `target`.
+
+    Uses `aut.action['sys']` and `aut.action['env']`,
+    see `cpre_noninterleaving.group_as_env_sys`.
+
+    The strategy is a relation over unprimed variables and
+    primed "sys" variables. It is meaningful only within
+    the attractor.
+
+    @return: `(attractor, rings, strategy)`
+    """
+    rings = list()
+    basin = cpre.attractor(target, aut, rings=rings)
+    sys_next = aut.action['sys']
+    env_next = aut.action['env']
+    vrs = aut.vars_of_all_players
+    lower = rings[0]
+    # at the target, any move
+    u = rings[0] & sys_next
+    for ring in rings[1:]:
+        # /\ SysNext
+        # /\ \A env_vars':  EnvNext => Lower'
+        v = aut.replace_with_primed(vrs, lower)
+        v |= ~ env_next
+        v = aut.forall(aut.varlist['env_p'], v)
+        v &= sys_next
+        u |= ring & v
+        lower |= ring
+    strategy = minimize(u, basin, aut)
+    return basin, rings, strategy
+
+
+def interleaving(target, team, aut):
+    """Return attractor, rings, and strategy of each player in `team`.
+
+    Uses `fixpoint_interleaving.attractor`, so the rings
+    are stored with the other fixpoints of `aut`.
+    At the turn of each player in `team`, the strategy
+    relates states to the primed variables of that player.
+
+    @return: `(attractor, rings, strategies)` where
+        `strategies` maps each player to a relation
+    """
+    rings = list()
+    basin = fx.attractor(target, team, aut, rings=rings)
+    strategies = {p: aut.false for p in team}
+    for s in fx.turn_slices(aut):
+        if s.player not in team:
+            continue
+        lower = rings[0]
+        u = rings[0] & s.action
+        for ring in rings[1:]:
+            v = aut.cofactor_turn(lower, turn=s.next_turn, memoize=False)
+            v = aut.let(s.prime, v)
+            u |= ring & s.action & v
+            lower |= ring
+        strategies[s.player] |= u & s.cube
+    strategies = {
+        p: minimize(u, basin, aut)
+        for p, u in strategies.items()}
+    return basin, rings, strategies
+
+
+def minimize(u, care, aut):
+    """Return a smaller BDD that equals `u` within `care`."""
+    return _care.simplify(u, care, aut)
+
+
+def print_sizes(strategies):
+    """Print number of nodes of each strategy."""
+    for player, u in sorted(strategies.items()):
+        print('strategy of "{p}": {n} nodes'.format(
+            p=player, n=len(u)))
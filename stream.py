@@ -0,0 +1,141 @@
+"""Streaming enumeration of BDD models.
+
+`cubes` walks the BDD depth first, and yields one cube
+(path to TRUE) at a time, using memory proportional to
+the number of variables. `assignments` expands cubes to
+integer-valued assignments, and yields them in batches,
+as NumPy structured arrays of fixed size. So the memory
+does not depend on the number of models, and `dump_npy`
+can write millions of states to disk, in chunks.
+"""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import numpy as np
+
+
+BATCH_SIZE = 2**16
+
+
+def cubes(u):
+    """Yield cubes of `u`, as `dict` that maps bits to `bool`.
+
+    Bits absent from a cube can take either value.
+    The cubes are disjoint.
+    """
+    bdd = u.bdd
+    path = list()
+    # (node, complemented, length of path, bit, value)
+    stack = [(u, False, 0, None, None)]
+    while stack:
+        v, neg, n, bit, value = stack.pop()
+        del path[n:]
+        if bit is not None:
+            path.append((bit, value))
+        if v.negated:
+            v = ~ v
+            neg = not neg
+        if v == bdd.true:
+            if not neg:
+                yield dict(path)
+            continue
+        # children of the regular node
+        n = len(path)
+        stack.append((v.high, neg, n, v.var, True))
+        stack.append((v.low, neg, n, v.var, False))
+
+
+def assignments(u, vrs, aut, batch_size=BATCH_SIZE):
+    """Yield assignments that satisfy `u`, in batches.
+
+    Each batch is a NumPy structured array with one field
+    for each variable in `vrs`, of at most `batch_size` rows.
+    Only type-correct values are yielded.
+
+    @param vrs: variables, should include the support of `u`
+    """
+    vrs = sorted(vrs)
+    support = aut.support(u)
+    assert support.issubset(vrs), (support, vrs)
+    dtype = np.dtype([(var, _dtype(var, aut)) for var in vrs])
+    buffer = np.empty(batch_size, dtype=dtype)
+    n = 0
+    for cube in cubes(u):
+        for rows in _expand(cube, vrs, aut, batch_size):
+            k = 0
+            while k < len(rows):
+                m = min(batch_size - n, len(rows) - k)
+                buffer[n:n + m] = rows[k:k + m]
+                n += m
+                k += m
+                if n == batch_size:
+                    yield buffer.copy()
+                    n = 0
+    if n:
+        yield buffer[:n].copy()
+
+
+def _dtype(var, aut):
+    if aut.vars[var]['type'] == 'bool':
+        return np.bool_
+    return np.int64
+
+
+def _expand(cube, vrs, aut, batch_size):
+    """Yield structured arrays of the assignments in `cube`.
+
+    The assignments are the product of the values that
+    each variable can take in `cube`.
+    """
+    values = [_values_in_cube(var, cube, aut) for var in vrs]
+    radices = [len(v) for v in values]
+    total = int(np.prod(radices, dtype=np.int64))
+    strides = np.cumprod([1] + radices[:-1], dtype=np.int64)
+    dtype = np.dtype([(var, _dtype(var, aut)) for var in vrs])
+    for start in range(0, total, batch_size):
+        index = np.arange(
+            start, min(start + batch_size, total), dtype=np.int64)
+        rows = np.empty(len(index), dtype=dtype)
+        for var, v, stride, radix in zip(
+                vrs, values, strides, radices):
+            rows[var] = v[(index // stride) % radix]
+        yield rows
+
+
+def _values_in_cube(var, cube, aut):
+    """Return array of type-correct values of `var` in `cube`."""
+    d = aut.vars[var]
+    if d['type'] == 'bool':
+        if var in cube:
+            return np.array([cube[var]], dtype=np.bool_)
+        return np.array([False, True], dtype=np.bool_)
+    bits = d['bitnames']
+    width = len(bits)
+    # all bit patterns, then fix those in the cube
+    patterns = np.arange(2**width, dtype=np.int64)
+    mask = np.ones(len(patterns), dtype=bool)
+    for k, bit in enumerate(bits):
+        if bit in cube:
+            mask &= ((patterns >> k) & 1) == int(cube[bit])
+    patterns = patterns[mask]
+    # two's complement
+    if d.get('signed', False):
+        msb = 1 << (width - 1)
+        patterns = np.where(
+            patterns & msb, patterns - (1 << width), patterns)
+    a, b = d['dom']
+    return patterns[(a <= patterns) & (patterns <= b)]
+
+
+def dump_npy(u, vrs, aut, prefix, batch_size=BATCH_SIZE):
+    """Write assignments of `u` to files `{prefix}_{k}.npy`.
+
+    One file for each batch, numbered from 0.
+    Return the number of files written.
+    """
+    k = 0
+    for k, batch in enumerate(
+            assignments(u, vrs, aut, batch_size=batch_size), 1):
+        fname = '{prefix}_{k:05}.npy'.format(prefix=prefix, k=k - 1)
+        np.save(fname, batch)
+    return k
@@ -3,20 +3,25 @@
 # Copyright 2015-2017 by California Institute of Technology
 # All rights reserved. Licensed under BSD-3.
 #
+import collections
 import copy
 import pprint
 
-from dd import bdd as _bdd
 from omega.logic.ast import Nodes as _Nodes
 from omega.logic import bitvector as bv
-from omega.logic import lexyacc
 from omega.logic import syntax as stx
 from omega.symbolic import bdd as sym_bdd
-from omega.symbolic import enumeration as enum
 from omega.symbolic import fol as _fol
 from omega.symbolic import symbolic as _sym
 
 
+TURN = '_i'  # variable that represents whose turn it is
+# cofactors remembered by `Automaton.cofactor_turn`
+TURN_COFACTORS = 2**10
+# formulas remembered by `Automaton.add_expr`
+EXPR_CACHE = 2**10
+
+
 class Automaton(_fol.Context):
     """Multi-player game.
 
@@ -113,6 +118,8 @@ class Automaton(_fol.Context):
         # purely metasyntactic replacements
         # for example, tuples of quantified vars
         self.meta = dict()  # meta-identifier name -> `str`
+        # groups of interchangeable players, see `symmetry.declare`
+        self.symmetry = list()
         # game-solving attributes
         # To be used by solvers. Write spec itself in TLA.
         self.init_expr = dict()  # player name -> op name
@@ -122,9 +129,13 @@ class Automaton(_fol.Context):
         self.init = dict()
         self.action = dict()
         self.win = dict()
+        # (normalized expr, with_ops) -> bdd, least recent first,
+        # valid for the current declarations and definitions
+        self._expr_cache = collections.OrderedDict()
+        # `_TurnCofactors`, see `cofactor_turn`
+        self._turn_cofactors = None
         # auto-populated
         self._players = None
-        self._turns = None  # inverse of `self.players`
 
     def __copy__(self):
         other = type(self)()
@@ -136,18 +147,30 @@ class Automaton(_fol.Context):
         other.op = copy.deepcopy(self.op)
         other.op_bdd = copy.copy(self.op_bdd)
         other.meta = copy.deepcopy(self.meta)
+        other.symmetry = copy.deepcopy(self.symmetry)
+        other._expr_cache = collections.OrderedDict(self._expr_cache)
+        # cofactors do not depend on the automaton,
+        # and the slices are checked against the actions
+        other._turn_cofactors = self._turn_cofactors
         # strings
         other.init_expr = copy.copy(self.init_expr)
         other.action_expr = copy.copy(self.action_expr)
         other.win_expr = {
             k: copy.copy(v)
             for k, v in self.win_expr.items()}
-        # BDD nodes
+        # BDD nodes (operators not yet converted stay pending,
+        # and are converted by `other`)
         other.init = copy.copy(self.init)
         other.action = copy.copy(self.action)
-        other.win = {
-            k: copy.copy(v)
-            for k, v in self.win.items()}
+        other.win = copy.copy(self.win)
+        if isinstance(other.init, _LazyMap):
+            other.init.rebind(other._to_bdd)
+        if isinstance(other.action, _LazyMap):
+            other.action.rebind(other._to_bdd)
+        if isinstance(other.win, _LazyMap):
+            other.win.rebind(other._win_to_bdd)
+        for k, v in _converted_items(other.win):
+            other.win[k] = copy.copy(v)
         return other
 
     def __str__(self):
@@ -197,6 +220,56 @@ class Automaton(_fol.Context):
         if flexible:
             vrs = _sym.add_primed_too(vrs)
         super(Automaton, self).add_vars(vrs)
+        self.clear_expr_cache()
+
+    def define(self, e):
+        """Register operator definitions in `e`.
+
+        Clears the cache of `add_expr`, because the definitions
+        can change the meaning of formulas that use them.
+        """
+        r = super(Automaton, self).define(e)
+        self.clear_expr_cache()
+        return r
+
+    def add_expr(self, e, with_ops=False):
+        """Return BDD for formula `e`, reusing previous results.
+
+        Results are cached by the formula text and `with_ops`.
+        Texts that differ only in indentation, blank lines, or
+        the length of runs of spaces share the entry, see
+        `_normalize_expr`. The cache is cleared whenever variables
+        are declared or operators defined, so a cached BDD always
+        corresponds to the current declarations. It keeps the
+        most recently used `EXPR_CACHE` results, so that
+        the nodes of other results can be collected.
+        """
+        key = (_normalize_expr(e), with_ops)
+        cache = self._expr_cache
+        u = cache.get(key)
+        if u is not None:
+            cache.move_to_end(key)
+            return u
+        u = super(Automaton, self).add_expr(e, with_ops=with_ops)
+        cache[key] = u
+        while len(cache) > EXPR_CACHE:
+            cache.popitem(last=False)
+        return u
+
+    def clear_expr_cache(self):
+        """Forget BDDs cached by `add_expr`."""
+        self._expr_cache = collections.OrderedDict()
+
+    @property
+    def turns(self):
+        """`dict` that maps each turn to a player.
+
+        Players with turn `None` (that move in every step)
+        are omitted.
+        """
+        return {
+            k: p for p, k in self.players.items()
+            if k is not None}
 
     @property
     def vars_of_all_players(self):
@@ -313,6 +386,108 @@ class Automaton(_fol.Context):
             r.append(type_inv_primed)
         return stx.conj(r)
 
+    def next_turn(self, k):
+        """Return the turn after turn `k`, in round-robin order."""
+        return increment_turn(k, self.vars[TURN]['dom'])
+
+    def cofactor_turn(self, u, turn=None, next_turn=None, memoize=True):
+        """Return `u` with `TURN = turn` and `TURN' = next_turn`.
+
+        Omit `turn` (`next_turn`) to substitute only for the
+        primed (unprimed) `TURN`.
+
+        The results are remembered in one table, shared by
+        all callers, which keeps the most recent
+        `TURN_COFACTORS` results, and is emptied when an
+        action in `self.action` changes.
+
+        @param memoize: if `True`, then remember the result.
+            Pass `False` for fixpoint iterates, which are
+            cofactored once.
+        """
+        table = self._turn_table() if memoize else None
+        key = (u, turn, next_turn)
+        if table is not None:
+            r = table.get(key)
+            if r is not None:
+                return r
+        let = dict()
+        if turn is not None:
+            let[TURN] = turn
+        if next_turn is not None:
+            let[stx.prime(TURN)] = next_turn
+        assert let, 'give `turn` or `next_turn`'
+        r = self.let(let, u)
+        if table is not None:
+            table.put(key, r)
+        return r
+
+    def _turn_table(self):
+        """Return `_TurnCofactors` for the current actions."""
+        key = self._actions_key()
+        t = self._turn_cofactors
+        if t is None or t.key != key:
+            t = _TurnCofactors(key)
+            self._turn_cofactors = t
+        return t
+
+    def _actions_key(self):
+        """Return `tuple` of the actions, in order of players."""
+        return tuple(self.action[p] for p in sorted(self.players))
+
+    def clear_turn_cofactors(self):
+        """Forget the results of `cofactor_turn` and `turn_actions`."""
+        self._turn_cofactors = None
+
+    def turn_actions(self):
+        r"""Return slices of the actions of all players per turn.
+
+        For each value `k` of `TURN`, the slice is
+
+            Action|_{TURN = k, TURN' = k + 1}
+
+        where `Action` is the conjunction of the actions of
+        all players, and `k + 1` wraps around (`next_turn`).
+        The slices are stored in the table of `cofactor_turn`,
+        so are recomputed only after an action in
+        `self.action` changes.
+
+        @return: `dict` that maps each turn to its slice,
+            or `None` if `TURN` is not declared, or `Action`
+            allows a step from turn `k` to a turn other than
+            `k + 1`, or from a value of `TURN` outside its
+            domain (then the slices do not partition `Action`)
+        """
+        if TURN not in self.vars:
+            return None
+        t = self._turn_table()
+        if t.has_slices:
+            return t.slices
+        action = conj_actions_of(self.players, self)
+        a, b = self.vars[TURN]['dom']
+        s = '({a} <= {t}) /\\ ({t} <= {b})'.format(a=a, b=b, t=TURN)
+        if (action & ~ self.add_expr(s)) != self.false:
+            table = None
+        else:
+            table = self._slice_by_turn(action, a, b)
+        t.slices = table
+        t.has_slices = True
+        return table
+
+    def _slice_by_turn(self, action, a, b):
+        """Return slices of `action` for turns `a..b`, or `None`."""
+        table = dict()
+        for k in range(a, b + 1):
+            kp = self.next_turn(k)
+            u = self.cofactor_turn(action, turn=k)
+            others = (
+                self.cofactor_turn(u, next_turn=j, memoize=False)
+                for j in range(a, b + 1) if j != kp)
+            if any(v != self.false for v in others):
+                return None
+            table[k] = self.cofactor_turn(u, next_turn=kp)
+        return table
+
     def map_expr_to_bdd(self):
         """Use `expr_to_bdd` to map attribute `op` to `op_bdd`."""
         raise DeprecationWarning(
@@ -321,23 +496,39 @@ class Automaton(_fol.Context):
             k: self.add_expr(v)
             for k, v in self.op.items()}
 
-    def build(self):
+    def build(self, lazy=True):
         """Populate `init, action, win` with BDD nodes.
 
         By mapping operators from `init_expr`, `action_expr`,
         and `win_expr` to BDD nodes using `self.op_bdd`.
+
+        If `lazy`, then each operator is converted to a BDD
+        when first accessed, so operators that an analysis
+        never reads are never parsed. Identical expressions
+        (see `_normalize_expr`) are converted once by
+        `add_expr`, and share the resulting BDD node.
+
+        @param lazy: if `False`, then convert all operators now
         """
-        self.init = {
-            k: self._to_bdd(v)
-            for k, v in self.init_expr.items()}
-        self.action = {
-            k: self._to_bdd(v)
-            for k, v in self.action_expr.items()}
+        self.init = _LazyMap(self._to_bdd)
+        self.action = _LazyMap(self._to_bdd)
+        self.win = _LazyMap(self._win_to_bdd)
+        for k, v in self.init_expr.items():
+            self.init.defer(k, v)
+        for k, v in self.action_expr.items():
+            self.action.defer(k, v)
         for k, v in self.win_expr.items():
-            d = dict()
-            for s, t in v.items():
-                d[s] = [self._to_bdd(e) for e in t]
-            self.win[k] = d
+            self.win.defer(k, v)
+        if lazy:
+            return
+        for d in (self.init, self.action, self.win):
+            d.convert_all()
+
+    def _win_to_bdd(self, d):
+        """Return `dict` of BDD lists for `dict` of expression lists."""
+        return {
+            s: [self._to_bdd(e) for e in t]
+            for s, t in d.items()}
 
     def _to_bdd(self, e):
         """Return BDD via either `add_expr` or `op_bdd`."""
@@ -366,6 +557,153 @@ class Automaton(_fol.Context):
                     assert sym_bdd.is_state_predicate(u)
 
 
+class _Pending(object):
+    """Expression not yet converted to a BDD."""
+
+    __slots__ = ('expr',)
+
+    def __init__(self, expr):
+        self.expr = expr
+
+    def __repr__(self):
+        return '_Pending({e!r})'.format(e=self.expr)
+
+
+class _LazyMap(dict):
+    """`dict` whose values are converted on first access.
+
+    Values added with `defer` are stored as `_Pending`.
+    Reading such a key calls `convert` on the expression
+    and replaces the pending value with the result.
+    Assignment with `[]` stores values as given.
+
+    Methods that read values (`values`, `items`, `get`,
+    `pop`) convert them. So does `dict(m)`, because `__iter__`
+    is overridden, so `dict` reads values by key. `copy`
+    returns a `_LazyMap`, which keeps the pending values.
+    """
+
+    def __init__(self, convert):
+        super(_LazyMap, self).__init__()
+        self._convert = convert
+
+    def __getitem__(self, key):
+        value = super(_LazyMap, self).__getitem__(key)
+        if isinstance(value, _Pending):
+            value = self._convert(value.expr)
+            super(_LazyMap, self).__setitem__(key, value)
+        return value
+
+    def __iter__(self):
+        return iter(dict.keys(self))
+
+    def __copy__(self):
+        other = type(self)(self._convert)
+        for k, v in dict.items(self):
+            dict.__setitem__(other, k, v)
+        return other
+
+    def copy(self):
+        return self.__copy__()
+
+    def rebind(self, convert):
+        """Convert pending values with `convert` from now on."""
+        self._convert = convert
+
+    def defer(self, key, expr):
+        """Map `key` to `expr`, to be converted when read."""
+        super(_LazyMap, self).__setitem__(key, _Pending(expr))
+
+    def convert_all(self):
+        """Convert all pending values."""
+        for key in self:
+            self[key]
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def pop(self, key, *default):
+        if key not in self:
+            return super(_LazyMap, self).pop(key, *default)
+        value = self[key]
+        del self[key]
+        return value
+
+    def values(self):
+        return [self[k] for k in self]
+
+    def items(self):
+        return [(k, self[k]) for k in self]
+
+
+class _TurnCofactors(object):
+    """Results of `cofactor_turn` and `turn_actions`.
+
+    The slices are valid for the actions in `key`.
+    The cofactors depend only on their arguments, and
+    are kept for the most recently used `TURN_COFACTORS`.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        # (bdd, turn, next turn) -> bdd, least recent first
+        self.memo = collections.OrderedDict()
+        self.slices = None
+        self.has_slices = False
+
+    def get(self, key):
+        r = self.memo.get(key)
+        if r is not None:
+            self.memo.move_to_end(key)
+        return r
+
+    def put(self, key, u):
+        self.memo[key] = u
+        while len(self.memo) > TURN_COFACTORS:
+            self.memo.popitem(last=False)
+
+
+def _converted_items(d):
+    """Return items of `d` whose values are not `_Pending`."""
+    return [
+        (k, v) for k, v in dict.items(d)
+        if not isinstance(v, _Pending)]
+
+
+def _normalize_expr(e):
+    """Return `e` without redundant whitespace.
+
+    Each run of whitespace within a line becomes one space,
+    and leading and trailing whitespace and blank lines are
+    removed. Line breaks are kept, because comments in TLA+
+    extend to the end of the line. Whitespace between tokens
+    is not added or removed, so `x=1` and `x = 1` differ.
+    """
+    lines = (' '.join(line.split()) for line in e.splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def increment_turn(k, dom):
+    """Return turn after `k`, wrapping around in `dom`."""
+    a, b = dom
+    assert a <= k and k <= b, (a, b, k)
+    if k + 1 > b:
+        kp = a
+    else:
+        kp = k + 1
+    return kp
+
+
+def conj_init_of(players, aut):
+    """Return conjunction of initial conditions from `players`."""
+    init = aut.true
+    for p in players:
+        init &= aut.init.get(p, aut.true)
+    return init
+
+
 def conj_actions_of(players, aut):
     """Return conjunction of actions from `players`."""
     action = aut.true
@@ -449,8 +787,24 @@ class Nodes(_Nodes):
             return meta.get(var, var)
 
 
-# LTL parser for meta-replacements (preprocessor).
-parser = lexyacc.Parser(nodes=Nodes)
+# LTL parser for meta-replacements (preprocessor),
+# constructed by `meta_parser`
+_parser = None
+
+
+def meta_parser():
+    """Return LTL parser for meta-replacements.
+
+    The parser is constructed on first call and reused after
+    that, so importing this module does not build the parser.
+    Constructing the parser imports PLY and loads the parser
+    tables that `omega` stores with `lexyacc`.
+    """
+    global _parser
+    if _parser is None:
+        from omega.logic import lexyacc
+        _parser = lexyacc.Parser(nodes=Nodes)
+    return _parser
 
 
 def replace_meta(s, meta):
@@ -460,7 +814,7 @@ def replace_meta(s, meta):
     @param meta: replacements as `dict`
     """
     # a preprocessor
-    return parser.parse(s).flatten(meta=meta)
+    return meta_parser().parse(s).flatten(meta=meta)
 
 
 def pick(c):
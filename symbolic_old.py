@@ -3,6 +3,7 @@
 # All rights reserved. Licensed under BSD-3.
 #
 import copy
+import itertools
 import pprint
 from dd import bdd as _bdd
 from omega.symbolic import bdd as sym_bdd
@@ -11,6 +12,10 @@ from omega.symbolic import symbolic
 from omega.symbolic import enumeration as enum
 
 
+# versions of declarations, unique across automata
+_versions = itertools.count()
+
+
 def preimage(target, aut):
     """Predecessors with interleaving repr."""
     bdd = aut.bdd
@@ -153,6 +158,8 @@ class Automaton(object):
         self.win = dict()
         # aux
         self.bdd = _bdd.BDD()
+        # (formula, version of `vars`) -> bdd
+        self._expr_cache = dict()
 
     def __copy__(self):
         a = Automaton()
@@ -165,8 +172,30 @@ class Automaton(object):
         a.action = copy.deepcopy(self.action)
         a.win = copy.deepcopy(self.win)
         a.bdd = self.bdd
+        # same declarations
+        a._vars_version = self._vars_version
+        a._expr_cache = dict(self._expr_cache)
         return a
 
+    @property
+    def vars(self):
+        """`dict` of declarations.
+
+        Assign a new `dict`, or call `add_vars`, instead of
+        changing it in place, so that `add_expr` notices.
+        """
+        return self._vars
+
+    @vars.setter
+    def vars(self, vrs):
+        self._vars = vrs
+        self._vars_version = next(_versions)
+
+    def add_vars(self, vrs):
+        """Declare the variables in the `dict` `vrs`."""
+        self._vars.update(vrs)
+        self._vars_version = next(_versions)
+
     def __str__(self):
         c = list()
         s = 'Players: \n {p}'.format(p=self.players)
@@ -194,10 +223,21 @@ class Automaton(object):
         return aut
 
     def add_expr(self, e):
-        """Add first-order formula."""
+        """Add first-order formula.
+
+        Results are cached by `e` and the version of `vars`,
+        because the solvers add the same turn predicates in
+        every iteration. The version changes when `vars` is
+        assigned, or `add_vars` called.
+        """
+        key = (e, self._vars_version)
+        u = self._expr_cache.get(key)
+        if u is not None:
+            return u
         t = self.vars
         s = bv.bitblast(e, t)
         u = sym_bdd.add_expr(s, self.bdd)
+        self._expr_cache[key] = u
         return u
 
 
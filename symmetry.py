@@ -0,0 +1,409 @@
+"""Symmetry reduction for interchangeable players.
+
+A group of players is interchangeable if permuting their
+variables maps the conjoined actions to themselves, and the
+recurrence goals of each player to those of another player.
+Then the winning sets are symmetric: closed under permuting
+the players. A symmetric set is represented by its orbit
+representatives, the states where the players of each group
+are sorted (lexicographically, by the values of their
+variables, in the order listed in `aut.varlist`).
+
+Permutations are generated by swapping adjacent players,
+so an orbit is computed by repeating swaps until a fixpoint,
+which takes at most as many passes as the largest group has
+players, instead of enumerating factorially many permutations.
+
+Fixpoints iterate over representatives only. An action is
+mapped once to a relation from states to the representatives
+of their successors (`to_representatives`), by permuting
+its primed variables. Predecessors of a symmetric set are
+then computed from its representatives, without expanding
+orbits at each iteration.
+
+Symmetry is used by noninterleaving fixpoints only. With
+interleaving, the turns are a fixed round-robin order,
+which swapping two players changes.
+
+
+Reference
+=========
+
+E. Allen Emerson, A. Prasad Sistla
+    "Symmetry and model checking"
+    Formal Methods in System Design,
+    Vol.9, No.1--2, pp.105--131, 1996
+"""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+from omega.logic import syntax as stx
+
+import symbolic as sym
+
+
+def declare(aut, groups):
+    """Declare `groups` of interchangeable players of `aut`.
+
+    Raise `ValueError` if the players of a group have
+    different types of variables, or if swapping two
+    players changes the conjoined actions, or does not
+    map the goals of one player to those of the other,
+    or changes the action or goals of any other player.
+
+    @param groups: iterable of lists of players
+    """
+    groups = [list(g) for g in groups]
+    for group in groups:
+        _check_group(group, aut)
+    aut.symmetry = groups
+    # check invariance under generators
+    action = sym.conj_actions_of(aut.players, aut)
+    for p, q in generators(aut):
+        if swap(action, p, q, aut) != action:
+            raise ValueError((
+                'swapping players "{p}" and "{q}" '
+                'changes the actions').format(p=p, q=q))
+        if _swapped_goals(p, q, aut) != _goals(q, aut):
+            raise ValueError((
+                'swapping players "{p}" and "{q}" '
+                'does not map the goals of "{p}" '
+                'to the goals of "{q}"').format(p=p, q=q))
+        for r in aut.players:
+            if r in (p, q):
+                continue
+            _check_invariant(r, p, q, aut)
+
+
+def _check_invariant(r, p, q, aut):
+    """Raise `ValueError` if swapping `p, q` changes player `r`."""
+    u = aut.action[r]
+    if swap(u, p, q, aut) != u:
+        raise ValueError((
+            'swapping players "{p}" and "{q}" changes '
+            'the action of "{r}"').format(p=p, q=q, r=r))
+    for k, us in aut.win[r].items():
+        if {swap(u, p, q, aut) for u in us} != set(us):
+            raise ValueError((
+                'swapping players "{p}" and "{q}" changes '
+                'the goals "{k}" of "{r}"').format(p=p, q=q, r=r, k=k))
+
+
+def _check_group(group, aut):
+    """Raise `ValueError` if `group` has incompatible players."""
+    if len(group) < 2:
+        raise ValueError(
+            'group of fewer than two players: {g}'.format(g=group))
+    first = group[0]
+    types = [_var_type(var, aut) for var in aut.varlist[first]]
+    for player in group[1:]:
+        other = [_var_type(var, aut) for var in aut.varlist[player]]
+        if other != types:
+            raise ValueError((
+                'players "{p}" and "{q}" have variables '
+                'of different types').format(p=first, q=player))
+
+
+def _var_type(var, aut):
+    d = aut.vars[var]
+    return (d['type'], tuple(d.get('dom', ())))
+
+
+def _goals(player, aut):
+    return set(aut.win[player].get('[]<>', list()))
+
+
+def _swapped_goals(p, q, aut):
+    return {swap(u, p, q, aut) for u in _goals(p, aut)}
+
+
+def generators(aut):
+    """Yield pairs of adjacent players in `aut.symmetry`."""
+    for group in aut.symmetry:
+        for p, q in zip(group, group[1:]):
+            yield p, q
+
+
+def representative_players(players, aut):
+    """Return `players`, keeping the first player of each group."""
+    skip = set()
+    for group in aut.symmetry:
+        skip.update(group[1:])
+    return [p for p in players if p not in skip]
+
+
+def group_of(player, aut):
+    """Return the group that contains `player`, or `None`."""
+    for group in aut.symmetry:
+        if player in group:
+            return group
+    return None
+
+
+def swap(u, p, q, aut, primed_only=False):
+    """Return `u` after swapping the variables of players `p, q`.
+
+    Both unprimed and primed variables are swapped,
+    by simultaneous substitution.
+
+    @param primed_only: if `True`, then swap only
+        the primed variables
+    """
+    xp = list(aut.varlist[p])
+    xq = list(aut.varlist[q])
+    let = dict()
+    for a, b in zip(xp, xq):
+        if not primed_only:
+            let[a] = b
+            let[b] = a
+        if stx.prime(a) in aut.vars:
+            let[stx.prime(a)] = stx.prime(b)
+            let[stx.prime(b)] = stx.prime(a)
+    return aut.let(let, u)
+
+
+def orbit(u, aut, pairs=None, primed_only=False):
+    """Return states reachable from `u` by permuting players.
+
+    Each pass applies the swaps of adjacent players, so at
+    most as many passes as players in the largest group.
+
+    @param pairs: swaps that generate the permutations,
+        by default `generators(aut)`
+    @param primed_only: see `swap`
+    """
+    if pairs is None:
+        pairs = list(generators(aut))
+    q = u
+    qold = None
+    while q != qold:
+        qold = q
+        for p, r in pairs:
+            q |= swap(q, p, r, aut, primed_only=primed_only)
+    return q
+
+
+def kernel(u, aut):
+    """Return the largest symmetric subset of `u`."""
+    return ~ orbit(~ u, aut)
+
+
+def applies(us, aut, team=None):
+    """Return `True` if fixpoints of `us` can use symmetry.
+
+    That is, if `aut` declares groups, each BDD in `us` is
+    symmetric, and `team` contains all or none of the players
+    of each group.
+
+    @param us: BDDs that define the fixpoint operator and target
+    """
+    if not getattr(aut, 'symmetry', None):
+        return False
+    if team is not None:
+        team = set(team)
+        for group in aut.symmetry:
+            n = len(team.intersection(group))
+            if n not in (0, len(group)):
+                return False
+    return all(is_symmetric(u, aut) for u in us)
+
+
+def is_symmetric(u, aut):
+    """Return `True` if `u` is closed under permuting players."""
+    return all(
+        swap(u, p, q, aut) == u
+        for p, q in generators(aut))
+
+
+def canonical(aut, pairs=None):
+    """Return predicate of orbit representatives.
+
+    In each group, the variables of each player are
+    lexicographically smaller than or equal to those
+    of the next player.
+
+    @param pairs: see `orbit`
+    """
+    if pairs is None:
+        pairs = generators(aut)
+    c = list()
+    for p, q in pairs:
+        xp = list(aut.varlist[p])
+        xq = list(aut.varlist[q])
+        s = _lex_leq(xp, xq, aut)
+        c.append(s)
+    return aut.add_expr(stx.conj(c))
+
+
+def team_generators(team, aut):
+    """Return `list` of the generators of groups within `team`."""
+    team = set(team)
+    return [
+        (p, q) for p, q in generators(aut)
+        if p in team and q in team]
+
+
+def to_representatives(action, pairs, aut):
+    r"""Return relation from states to representatives of successors.
+
+    Only the primed variables of the players in `pairs`
+    are permuted:
+
+        \E pi:  /\ Action(x, pi(y'))
+                /\ Canonical(y')
+
+    For a set `X` symmetric under `pairs`, with
+    representatives `R`, the formula `\E y':  Action /\ X'`
+    is equivalent to `\E y':  Result /\ R'`, and
+    `\A y':  Action => X'` to `\A y':  Result => R'`.
+
+    @param pairs: see `orbit`
+    """
+    if not pairs:
+        return action
+    u = orbit(action, aut, pairs=pairs, primed_only=True)
+    c = canonical(aut, pairs=pairs)
+    c_p = aut.replace_with_primed(aut.vars_of_all_players, c)
+    return u & c_p
+
+
+def _lex_leq(xs, ys, aut):
+    """Return formula `xs <= ys`, lexicographically."""
+    if not xs:
+        return 'TRUE'
+    x, *xs = xs
+    y, *ys = ys
+    if aut.vars[x]['type'] == 'bool':
+        less = '(~ {x} /\\ {y})'.format(x=x, y=y)
+        equal = '({x} <=> {y})'.format(x=x, y=y)
+    else:
+        less = '({x} < {y})'.format(x=x, y=y)
+        equal = '({x} = {y})'.format(x=x, y=y)
+    rest = _lex_leq(xs, ys, aut)
+    return '({less} \\/ ({equal} /\\ {rest}))'.format(
+        less=less, equal=equal, rest=rest)
+
+
+def representatives(u, aut):
+    """Return orbit representatives of the states in `u`."""
+    return orbit(u, aut) & canonical(aut)
+
+
+def closure(players, aut, closure_for_one_player, start=None):
+    """Return cooperatively winning set, using symmetry.
+
+    The iterates are representatives. Players with
+    symmetric goals are analyzed on representatives
+    (`preimage`). For other players, only the first player
+    of each group is analyzed, on the orbit of the iterate.
+    The closure for the other players of the group follows
+    by permuting, so the intersection over the group is the
+    largest symmetric subset (`kernel`). This assumes that
+    the goals of each player outside the groups are mapped
+    to themselves as a set, so that the iterates are symmetric.
+
+    @param closure_for_one_player: function with the
+        signature of `closure_noninterleaving.closure_for_one_player`
+    @param start: symmetric set closed under successors,
+        see `closure_noninterleaving.closure`
+    """
+    for group in aut.symmetry:
+        assert set(group).issubset(players), (group, players)
+    reps = representative_players(players, aut)
+    symmetric = {
+        p for p in reps
+        if all(is_symmetric(g, aut) for g in _goals(p, aut))}
+    canon = canonical(aut)
+    within = None if start is None else start & canon
+    z = canon if within is None else within
+    zold = None
+    while z != zold:
+        zold = z
+        full = None
+        for p in reps:
+            if p in symmetric:
+                z &= _closure_for_one_player(zold, p, aut, within)
+                continue
+            if full is None:
+                full = orbit(zold, aut)
+            u = closure_for_one_player(full, p, aut, within=start)
+            if group_of(p, aut) is not None:
+                u = kernel(u, aut)
+            z &= u
+    return orbit(z, aut)
+
+
+def _closure_for_one_player(z, player, aut, within=None):
+    """Representatives of closure for symmetric goals of `player`.
+
+    @param z: representatives
+    @param within: representatives of states to remain in
+    """
+    zold = None
+    while z != zold:
+        zold = z
+        z_pre = preimage(zold, aut)
+        for goal in aut.win[player]['[]<>']:
+            target = z_pre & goal
+            if within is None:
+                z &= least_fixpoint(preimage, target, aut)
+                continue
+
+            def operator(u, aut):
+                return preimage(u, aut) & within
+            z &= least_fixpoint(operator, target & within, aut)
+    return z
+
+
+def preimage(target, aut):
+    """Return representatives of predecessors of the orbits of `target`.
+
+    @param target: representatives
+    """
+    action = _conj_action(aut)
+    vrs = aut.vars_of_all_players
+    u = aut.replace_with_primed(vrs, target)
+    u &= action
+    u = aut.exist(aut.prime_vars(vrs), u)
+    return u & canonical(aut)
+
+
+def _conj_action(aut):
+    """Return conjoined actions, mapped to representatives.
+
+    The result is stored in `aut`, until an action
+    or the groups change.
+    """
+    action = sym.conj_actions_of(aut.players, aut)
+    key = (groups_key(aut), action)
+    cached = getattr(aut, '_symmetric_action', None)
+    if cached is None or cached[0] != key:
+        pairs = list(generators(aut))
+        cached = (key, to_representatives(action, pairs, aut))
+        aut._symmetric_action = cached
+    return cached[1]
+
+
+def groups_key(aut):
+    """Return hashable value of `aut.symmetry`."""
+    return tuple(tuple(group) for group in aut.symmetry)
+
+
+def least_fixpoint(operator, target, aut):
+    """Least fixpoint of `operator | target`, on orbit representatives.
+
+    The fixpoint should be symmetric. Used by
+    `cpre_noninterleaving.attractor`.
+
+    @param operator: function with signature `(u, aut)`
+        that maps representatives to representatives,
+        for example `preimage`
+    @param target: representatives
+    @return: representatives
+    """
+    q = target
+    qold = None
+    while q != qold:
+        qold = q
+        q |= operator(q, aut)
+    return q
@@ -0,0 +1,70 @@
+"""Tests of binary contract artifacts."""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import itertools
+
+import pytest
+
+from explicit_test import small_automaton
+import artifact
+import symbolic as sym
+
+
+def states():
+    for x, y in itertools.product(range(5), range(3)):
+        yield dict(x=x, y=y)
+
+
+def steps():
+    for s, t in itertools.product(states(), states()):
+        yield dict(s, **{"x'": t['x'], "y'": t['y']})
+
+
+def value(u, state, aut):
+    return aut.let(state, u) == aut.true
+
+
+def test_dump_evaluate(tmp_path):
+    aut = small_automaton()
+    inv = aut.add_expr(r'x < 3 \/ y = 2')
+    fname = str(tmp_path / 'contract.bin')
+    artifact.dump(fname, aut, roots=dict(inv=inv))
+    with artifact.Artifact(fname) as a:
+        assert set(a.roots) == {'inv'}
+        ref = a.roots['inv']
+        for state in states():
+            assert a.evaluate(ref, state) == value(inv, state, aut)
+
+
+def test_load_automaton(tmp_path):
+    aut = small_automaton()
+    inv = aut.add_expr(r'x < 3 \/ y = 2')
+    fname = str(tmp_path / 'contract.bin')
+    artifact.dump(fname, aut, roots=dict(inv=inv))
+    other = sym.Automaton()
+    with artifact.Artifact(fname) as a:
+        roots = a.load_automaton(other)
+    assert other.players == aut.players
+    assert other.varlist == aut.varlist
+    for state in states():
+        assert value(roots['inv'], state, other) == value(inv, state, aut)
+        for p in aut.players:
+            u = other.init[p]
+            assert value(u, state, other) == value(aut.init[p], state, aut)
+    for p in aut.players:
+        u = other.action[p]
+        v = aut.action[p]
+        for state in steps():
+            assert value(u, state, other) == value(v, state, aut)
+    goals = other.win['b']['[]<>']
+    assert len(goals) == 2
+    assert value(goals[0], dict(x=0, y=2), other)
+
+
+def test_not_an_artifact(tmp_path):
+    fname = str(tmp_path / 'other.bin')
+    with open(fname, 'wb') as f:
+        f.write(b'\0' * 64)
+    with pytest.raises(ValueError):
+        artifact.Artifact(fname)
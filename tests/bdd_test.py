@@ -0,0 +1,65 @@
+"""Tests of dumping and loading BDD node tables."""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+from dd import cudd
+
+import bdd as _bdd
+
+
+def make_bdd(vrs):
+    bdd = cudd.BDD()
+    # reordering thousands of variables is slow
+    bdd.configure(reordering=False)
+    for var in vrs:
+        bdd.add_var(var)
+    return bdd
+
+
+def some_bdds(bdd):
+    """Return `list` of BDDs, some with complemented edges."""
+    x, y, z = (bdd.var(var) for var in ('x', 'y', 'z'))
+    xor = (x & ~ y) | (~ x & y)
+    return [
+        bdd.true,
+        bdd.false,
+        x,
+        ~ y,
+        x & ~ y,
+        ~ (x | z),
+        (xor & z) | (~ xor & ~ z),
+        ~ xor]
+
+
+def test_dump_load_round_trip():
+    vrs = ['x', 'y', 'z']
+    source = make_bdd(vrs)
+    us = some_bdds(source)
+    nodes, refs = _bdd.dump_nodes(us)
+    # another variable order
+    target = make_bdd(reversed(vrs))
+    vs = _bdd.load_nodes(nodes, refs, target)
+    assert vs == some_bdds(target)
+
+
+def test_dump_deep_bdd():
+    # deeper than the recursion limit
+    n = 3000
+    vrs = ['x{i}'.format(i=i) for i in range(n)]
+    source = make_bdd(vrs)
+    u = source.true
+    parity = source.false
+    for var in reversed(vrs):
+        x = source.var(var)
+        u &= x
+        parity = (x & ~ parity) | (~ x & parity)
+    nodes, refs = _bdd.dump_nodes([u, ~ u, parity])
+    target = make_bdd(vrs)
+    v, not_v, parity_v = _bdd.load_nodes(nodes, refs, target)
+    assert v == ~ not_v
+    assert len(v) == len(u)
+    assert len(parity_v) == len(parity)
+    w = target.true
+    for var in vrs:
+        w &= target.var(var)
+    assert v == w
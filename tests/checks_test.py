@@ -0,0 +1,60 @@
+"""Tests of leveled self-checks."""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import pytest
+
+import checks
+
+
+def test_set_level():
+    old = checks.get_level()
+    try:
+        assert checks.set_level('cheap') == old
+        assert checks.get_level() == checks.CHEAP
+        assert checks.set_level(checks.FULL) == checks.CHEAP
+        assert checks.enabled(checks.CHEAP)
+        assert checks.enabled(checks.FULL)
+        assert not checks.enabled(checks.PARANOID)
+        for level in ('fast', 4, None):
+            with pytest.raises(ValueError):
+                checks.set_level(level)
+        assert checks.get_level() == checks.FULL
+    finally:
+        checks.set_level(old)
+
+
+def test_checking():
+    old = checks.get_level()
+    with checks.checking('off'):
+        assert checks.get_level() == checks.OFF
+    assert checks.get_level() == old
+
+
+def test_verify():
+    checks.reset_timings()
+    calls = list()
+
+    def check():
+        calls.append(1)
+        return False
+
+    with checks.checking(checks.CHEAP):
+        # not enabled, so not called
+        checks.verify(checks.FULL, 'skipped', check)
+        assert not calls
+        checks.verify(checks.CHEAP, 'passes', lambda: True)
+        with pytest.raises(AssertionError, match='^fails$'):
+            checks.verify(checks.CHEAP, 'fails', check)
+        with pytest.raises(AssertionError, match='fails: details'):
+            checks.verify(
+                checks.CHEAP, 'fails', check, lambda: 'details')
+    assert len(calls) == 2
+    assert set(checks.timings) == {'passes', 'fails'}
+    assert checks.timings['fails'][0] == 2
+    s = checks.format_timings()
+    assert 'fails' in s
+    assert 'total' in s
+    assert checks.total_time() >= 0
+    checks.reset_timings()
+    assert not checks.timings
@@ -0,0 +1,10 @@
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import os
+import sys
+
+
+# the modules are at the top level of the repository
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
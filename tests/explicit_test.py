@@ -0,0 +1,82 @@
+"""Tests of the explicit-state engine."""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import numpy as np
+
+import closure_noninterleaving as _closure
+import explicit
+import symbolic as sym
+
+
+def small_automaton():
+    """Return automaton of two counters, with few states."""
+    aut = sym.Automaton()
+    aut.players = dict(a=0, b=1)
+    aut.declare_variables(x=(0, 4), y=(0, 2))
+    aut.varlist = dict(a=['x'], b=['y'])
+    s = r'''
+        ANext ==
+            /\ x \in 0..4 /\ x' \in 0..4
+            /\ \/ x' = x + 1
+               \/ (y = 2 /\ x' = 0)
+
+        BNext ==
+            /\ y \in 0..2 /\ y' \in 0..2
+            /\ ((x = 3) => (y' = y))
+            /\ y' != 1
+        '''
+    aut.define(s)
+    aut.init_expr = dict(a='x = 0', b='y = 0')
+    aut.action_expr = dict(a='ANext', b='BNext')
+    aut.win_expr = dict(
+        a={'[]<>': ['x = 3']},
+        b={'[]<>': ['y = 2', 'y = 0']})
+    aut.build()
+    return aut
+
+
+def test_closure_explicit_equals_bdd():
+    aut = small_automaton()
+    players = list(aut.players)
+    assert explicit.is_small(
+        aut, relation=explicit.noninterleaving_relation(aut))
+    u = _closure.closure(players, aut, engine='bdd')
+    v = _closure.closure(players, aut, engine='explicit')
+    types = aut.add_expr(aut.type_hint_for(['x', 'y']))
+    assert u & types == v & types
+    assert v != aut.false
+    # within reachable states
+    start = _closure.reachable_states(aut)
+    u = _closure.closure(players, aut, start=start, engine='bdd')
+    v = _closure.closure(players, aut, start=start, engine='explicit')
+    assert u & types == v & types
+
+
+def test_is_small_bounds_edges():
+    aut = small_automaton()
+    relation = explicit.noninterleaving_relation(aut)
+    n = explicit.count_edges(relation, aut.vars_of_all_players, aut)
+    assert n > 0
+    assert explicit.is_small(aut, relation=relation, max_edges=n)
+    assert not explicit.is_small(
+        aut, relation=relation, max_edges=n - 1)
+
+
+def test_forall_preimage_excludes_states_without_moves():
+    # states 0, 1, 2, where only 0 and 1 move
+    space = _Space(3)
+    src = np.array([0, 0], dtype=np.int64)
+    dst = np.array([1, 2], dtype=np.int64)
+    moving = np.array([True, True, False])
+    game = explicit.Game(space, src, dst, moving=moving)
+    mask = np.array([False, True, True])
+    r = explicit.forall_preimage(mask, game)
+    # 1 moves without successors, like a deadlock
+    assert r.tolist() == [True, True, False]
+
+
+class _Space(object):
+
+    def __init__(self, n):
+        self.n = n
@@ -0,0 +1,84 @@
+"""Tests of incremental closure and unzip."""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+from explicit_test import small_automaton
+import closure_noninterleaving as _closure
+import incremental
+import symbolic as sym
+
+
+def check_result(result, aut):
+    """Assert `result` equals closure and unzip from scratch."""
+    players = list(aut.players)
+    z = _closure.closure(players, aut, engine='bdd')
+    assert result.closure == z
+    # as `closure_noninterleaving.unzip`
+    z_p = aut.replace_with_primed(aut.vars_of_all_players, z)
+    assembly_next = z & z_p & sym.conj_actions_of(players, aut)
+    for p in players:
+        u = _closure.project_action(assembly_next, p, players, aut)
+        assert result.unzipped.action[p] == u
+
+
+def test_run_reuses_projections(monkeypatch):
+    aut = small_automaton()
+    r = incremental.run(aut)
+    check_result(r, aut)
+    assert len(r.projections) == 2
+
+    def fail(*arg, **kw):
+        raise AssertionError('projection recomputed')
+
+    monkeypatch.setattr(incremental, '_projection_factor', fail)
+    s = incremental.run(aut, previous=r)
+    assert s.closure == r.closure
+    # the cache is kept across runs
+    assert set(s.projections) == set(r.projections)
+    check_result(s, aut)
+
+
+def test_classify():
+    aut = small_automaton()
+    u = aut.action['a']
+    v = u & aut.add_expr('y = 0')
+    old = dict(a=u, b=u)
+    kinds = incremental.classify(old, dict(a=v, b=u), aut)
+    assert kinds == dict(a=incremental.RESTRICTED, b=incremental.SAME)
+    kinds = incremental.classify(dict(a=v, b=u), old, aut)
+    assert kinds == dict(a=incremental.RELAXED, b=incremental.SAME)
+    # goals
+    g = aut.add_expr('x = 3')
+    h = aut.add_expr('x = 1')
+    kinds = incremental.classify(
+        old, old, aut, dict(a={g}, b={g}), dict(a={g, h}, b=set()))
+    assert kinds == dict(
+        a=incremental.RESTRICTED, b=incremental.RELAXED)
+    # restricted action, relaxed goals
+    kinds = incremental.classify(
+        old, dict(a=v, b=u), aut, dict(a={g}, b={g}), dict(a=set(), b={g}))
+    assert kinds['a'] == incremental.CHANGED
+
+
+def test_run_after_restricting_action():
+    aut = small_automaton()
+    r = incremental.run(aut)
+    aut.action['b'] &= aut.add_expr("y' = y")
+    s = incremental.run(aut, previous=r)
+    check_result(s, aut)
+
+
+def test_run_after_editing_goals():
+    aut = small_automaton()
+    r = incremental.run(aut)
+    assert r.closure != aut.false
+    goals = aut.win['b']['[]<>']
+    # `y` never changes to 1
+    aut.win['b']['[]<>'] = goals + [aut.add_expr('y = 1')]
+    s = incremental.run(aut, previous=r)
+    assert s.closure == aut.false
+    check_result(s, aut)
+    aut.win['b']['[]<>'] = goals
+    t = incremental.run(aut, previous=s)
+    assert t.closure == r.closure
+    check_result(t, aut)
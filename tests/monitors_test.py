@@ -0,0 +1,48 @@
+"""Tests of compiled monitors."""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import itertools
+
+from explicit_test import small_automaton
+import monitors
+
+
+def states():
+    for x, y, z in itertools.product(range(5), range(3), (False, True)):
+        yield dict(x=x, y=y, z=z)
+
+
+def test_monitors_equal_bdds(tmp_path):
+    aut = small_automaton()
+    aut.declare_variables(z='bool')
+    predicates = dict(
+        p=aut.add_expr(r'x < 3 /\ y = 2'),
+        q=aut.add_expr(r'z \/ x = y'),
+        r=aut.add_expr(r'~ z /\ (x = 4 \/ y = 0)'),
+        t=aut.true,
+        f=aut.false)
+    fname = str(tmp_path / 'contract_monitors.py')
+    monitors.dump(predicates, aut, fname)
+    module = monitors.load(fname)
+    assert module.VARS == dict(
+        x=('int', (0, 4)), y=('int', (0, 2)), z=('bool',))
+    assert set(module.ROOTS) == set(predicates)
+    for state in states():
+        values = module.evaluate_all(state)
+        for name, u in predicates.items():
+            v = aut.let(state, u)
+            assert values[name] == (v == aut.true), (name, state)
+    batch = list(states())[:4]
+    expected = [module.evaluate('p', s) for s in batch]
+    assert module.evaluate_batch('p', batch) == expected
+
+
+def test_bit_indices():
+    aut = small_automaton()
+    aut.declare_variables(z='bool')
+    bits = monitors.bit_indices(['x', 'z'], aut)
+    assert bits['z'] == ('z', 0)
+    xbits = aut.vars['x']['bitnames']
+    assert [bits[b] for b in xbits] == [
+        ('x', k) for k in range(len(xbits))]
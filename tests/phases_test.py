@@ -0,0 +1,57 @@
+"""Tests of recording phases."""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+from dd import bdd as _bdd
+from dd import cudd
+
+import phases
+
+
+def test_recorder_cudd():
+    bdd = cudd.BDD()
+    bdd.declare(*['x{i}'.format(i=i) for i in range(20)])
+    recorder = phases.Recorder(collect_garbage=True)
+    with phases.recording(recorder):
+        with phases.phase('outer', bdd):
+            with phases.phase('inner', bdd):
+                u = bdd.add_expr(r'x0 /\ x1 /\ x2 /\ x3')
+            del u
+    inner, outer = recorder.records
+    assert inner['name'] == 'outer/inner'
+    assert outer['name'] == 'outer'
+    m = inner['memory']
+    assert m['nodes_end'] >= m['nodes_start']
+    assert m['nodes_peak'] >= m['nodes_end']
+    assert m['rss_peak'] >= m['rss_end']
+    assert 'cache_hit_rate' in inner['delta']
+    assert 'outer/inner' in recorder.format_memory()
+    assert 'outer/inner' in recorder.format_deltas()
+
+
+def test_recorder_python_bdd():
+    bdd = _bdd.BDD()
+    bdd.declare('x', 'y')
+    recorder = phases.Recorder(
+        collect_garbage=True, sample_nodes=True, sample_interval=0.001)
+    with phases.recording(recorder):
+        with phases.phase('build', bdd):
+            u = bdd.add_expr(r'x /\ y')
+    (record,) = recorder.records
+    assert record['stats'] == dict()
+    # `u` remains referenced after garbage collection
+    assert record['memory']['nodes_end'] >= len(bdd) > 0
+    assert u != bdd.false
+
+
+def test_phase_outside_recording():
+    bdd = cudd.BDD()
+    with phases.phase('none', bdd):
+        pass
+
+
+def test_new_peak():
+    k = 'peak_live_nodes'
+    assert phases.new_peak({k: 10}, {k: 12}) == 12
+    assert phases.new_peak({k: 10}, {k: 10}) is None
+    assert phases.new_peak(dict(), dict()) is None
@@ -0,0 +1,138 @@
+"""Tests of the job server, without worker processes."""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import asyncio
+import json
+import queue
+
+import pytest
+
+from explicit_test import small_automaton
+import server
+
+
+def test_check_job():
+    srv = server.Server(workers=0)
+    srv._check_job(dict(id='a', spec='examples:landing_gear_example'))
+    srv._check_job(dict(automaton=dict(), options=dict(phases=[])))
+    bad = [
+        list(),
+        dict(id=1.5, spec='f'),
+        dict(spec='f', automaton=dict()),
+        dict(),
+        dict(spec='f', options=dict(inv_pdf='a.pdf')),
+        dict(spec='os:system'),
+        dict(spec=['examples'])]
+    for job in bad:
+        with pytest.raises(ValueError):
+            srv._check_job(job)
+
+
+def test_spec_module():
+    assert server._spec_module('landing_gear_example') == 'examples'
+    assert server._spec_module('a.b:f') == 'a.b'
+
+
+def test_summarize():
+    aut = small_automaton()
+    u = aut.add_expr('x = 1')
+    d = server.summarize(dict(inv=u, aut=aut, n=3), aut)
+    assert d == dict(
+        inv=dict(nodes=len(u)),
+        aut=dict(players=['a', 'b']),
+        n=3)
+
+
+async def talk(srv, lines, events=()):
+    """Send `lines` to `srv`, then `events`, return replies."""
+    tcp = await asyncio.start_server(
+        srv._handle_client, '127.0.0.1', 0, limit=srv.max_line)
+    port = tcp.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    replies = list()
+    for line in lines:
+        writer.write(line.encode('utf-8') + b'\n')
+        await writer.drain()
+        replies.append(json.loads(await reader.readline()))
+    for event in events:
+        await srv._send(dict(event))
+        replies.append(json.loads(await reader.readline()))
+    # the server closes the connection after the client does
+    writer.close()
+    assert await reader.read() == b''
+    tcp.close()
+    await tcp.wait_closed()
+    return replies
+
+
+def test_handle_client():
+    srv = server.Server(workers=0)
+    job = json.dumps(dict(id='a', spec='landing_gear_example'))
+    replies = asyncio.run(talk(srv, [job, job, 'not json'], [
+        dict(key=1, event='phase', record=dict(name='closure')),
+        dict(key=1, event='done', results=dict())]))
+    queued, running, malformed, phase, done = replies
+    assert queued == dict(id='a', event='queued')
+    assert running['event'] == 'error'
+    assert 'is running' in running['message']
+    assert malformed['event'] == 'error'
+    assert 'id' not in malformed
+    assert phase == dict(
+        id='a', event='phase', record=dict(name='closure'))
+    assert done == dict(id='a', event='done', results=dict())
+    # the job is not sent to a worker, and is finished
+    assert len(srv._pending) == 1
+    assert not srv._jobs
+
+
+def test_handle_client_long_line():
+    srv = server.Server(workers=0, max_line=2**10)
+    line = json.dumps(dict(spec='f', id='x' * 2**11))
+    (reply,) = asyncio.run(talk(srv, [line]))
+    assert reply['event'] == 'error'
+    assert 'longer than' in reply['message']
+    assert not srv._pending
+
+
+def run_worker(jobs):
+    q = queue.Queue()
+    for job in jobs:
+        q.put(job)
+    q.put(None)
+    events = queue.Queue()
+    server._worker_loop(0, q, events, None)
+    out = list()
+    while not events.empty():
+        out.append(events.get())
+    return out
+
+
+def test_worker_loop(monkeypatch):
+    monkeypatch.setattr(server, '_warm_up', lambda: None)
+
+    def run_job(job, events, worker, bdd_config=None):
+        if job['spec'] == 'fail':
+            raise RuntimeError('failed')
+        return dict(spec=job['spec'])
+
+    monkeypatch.setattr(server, 'run_job', run_job)
+    done, error = run_worker([
+        dict(key=1, spec='f'), dict(key=2, spec='fail')])
+    assert done == dict(
+        key=1, worker=0, event='done', results=dict(spec='f'))
+    assert error['key'] == 2
+    assert error['event'] == 'error'
+    assert 'RuntimeError' in error['message']
+
+
+def test_worker_loop_warm_up_fails(monkeypatch):
+    def fail():
+        raise ImportError('no solver')
+
+    monkeypatch.setattr(server, '_warm_up', fail)
+    events = run_worker([dict(key=1, spec='f'), dict(key=2, spec='g')])
+    assert [e['key'] for e in events] == [1, 2]
+    for e in events:
+        assert e['event'] == 'error'
+        assert 'no solver' in e['message']
@@ -0,0 +1,61 @@
+"""Tests of batched random simulation."""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import numpy as np
+
+from explicit_test import small_automaton
+import simulate
+
+
+def test_simulate():
+    aut = small_automaton()
+    goals = simulate.goals_of(aut)
+    assert set(goals) == {'a_0', 'b_0', 'b_1'}
+    report = simulate.simulate(
+        aut.action, aut, goals=goals,
+        walkers=200, steps=20, seed=0)
+    assert report['vars'] == ['x', 'y']
+    assert report['violations'] == 0
+    assert report['first_violation'] is None
+    assert report['violating_state'] is None
+    # from `x = 4 /\ y = 0`, no player can move
+    assert report['dead_ends'] > 0
+    # all walkers start at `y = 0`
+    assert report['walkers_visiting']['b_1'] == 200
+    assert report['visits']['b_1'] >= 200
+
+
+def test_simulate_violation():
+    aut = small_automaton()
+    inv = aut.add_expr('x < 2')
+    report = simulate.simulate(
+        aut.action, aut, inv=inv, walkers=50, steps=5, seed=0)
+    # `x` increments at each step, until a dead end
+    assert report['first_violation'] == 2
+    assert report['violating_state']['x'] == 2
+    assert report['violations'] > 0
+
+
+def test_step_samples_successors_uniformly():
+    aut = small_automaton()
+    sim = simulate.Simulator(aut.action, aut, seed=1)
+    assert sim.vars == ['x', 'y']
+    m = 20000
+    states = np.array([[1, 0]] * m, dtype=np.int64)
+    new, dead = sim.step(states)
+    assert not dead.any()
+    rows, counts = np.unique(new, axis=0, return_counts=True)
+    assert rows.tolist() == [[2, 0], [2, 2]]
+    assert abs(counts[0] - m / 2) < 0.05 * m
+
+
+def test_step_dead_end():
+    aut = small_automaton()
+    sim = simulate.Simulator(aut.action, aut, seed=1)
+    states = np.array([[4, 0], [0, 0]], dtype=np.int64)
+    new, dead = sim.step(states)
+    assert dead.tolist() == [True, False]
+    # walkers at dead ends remain where they are
+    assert new[0].tolist() == [4, 0]
+    assert new[1, 0] == 1
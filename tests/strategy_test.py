@@ -0,0 +1,64 @@
+"""Tests of strategies from attractor rings."""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+from symbolic_test import turn_automaton
+import fixpoint_interleaving as fx
+import strategy
+
+
+def choosing_automaton():
+    """Return `turn_automaton` where `b` can keep `y` unchanged."""
+    aut = turn_automaton()
+    aut.action['b'] = aut.add_expr(r'''
+        /\ y \in 0..3 /\ y' \in 0..3
+        /\ ((_i = 2) => (y' = x \/ y' = y))
+        /\ ((_i != 2) => (y' = y))
+        ''')
+    return aut
+
+
+def test_interleaving():
+    aut = choosing_automaton()
+    target = aut.add_expr('y = 2')
+    basin, rings, strategies = strategy.interleaving(target, ['b'], aut)
+    assert set(strategies) == {'b'}
+    assert rings[0] == target
+    # the rings partition the attractor
+    u = aut.false
+    for ring in rings:
+        assert ring & u == aut.false
+        u |= ring
+    assert u == basin
+    fx.clear_store(aut)
+    assert basin == fx.attractor(target, ['b'], aut)
+    # moves of `b` are allowed, and exist outside the target
+    s = aut.add_expr('_i = 2')
+    u = strategies['b'] & basin & s
+    assert u <= aut.action['b']
+    moves = aut.exist(["y'"], u)
+    assert basin & s <= moves
+    # `b` changes `y` to 2 when it can
+    state = aut.add_expr(r'x = 2 /\ y = 0 /\ _i = 2')
+    u = strategies['b'] & state
+    assert u != aut.false
+    assert u <= aut.add_expr("y' = 2")
+
+
+def test_interleaving_rings_stored():
+    aut = choosing_automaton()
+    target = aut.add_expr('y = 2')
+    r = strategy.interleaving(target, ['b'], aut)
+    s = strategy.interleaving(target, ['b'], aut)
+    assert r[0] == s[0]
+    assert r[1] == s[1]
+    assert r[2] == s[2]
+
+
+def test_minimize():
+    aut = choosing_automaton()
+    care = aut.add_expr('x = 1')
+    u = aut.add_expr(r'x = 1 /\ y = 2')
+    v = strategy.minimize(u, care, aut)
+    assert v & care == u & care
+    assert len(v) <= len(u)
@@ -0,0 +1,62 @@
+"""Tests of streaming enumeration."""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import numpy as np
+
+from explicit_test import small_automaton
+import stream
+
+
+def rows_of(batches):
+    return {(int(r['x']), int(r['y'])) for b in batches for r in b}
+
+
+def test_cubes_partition():
+    aut = small_automaton()
+    u = aut.add_expr(r'(x = 1 \/ x = 4) /\ y != 1')
+    bdd = aut.bdd
+    cubes = list(stream.cubes(u))
+    assert cubes
+    v = bdd.false
+    for c in cubes:
+        w = bdd.cube(c)
+        # disjoint
+        assert w & v == bdd.false
+        v |= w
+    assert v == u
+    assert list(stream.cubes(aut.false)) == list()
+    assert list(stream.cubes(aut.true)) == [dict()]
+
+
+def test_assignments_batches():
+    aut = small_automaton()
+    u = aut.add_expr(r'x < 3 /\ y \in 0..2')
+    batches = list(stream.assignments(u, ['y', 'x'], aut, batch_size=4))
+    assert [len(b) for b in batches] == [4, 4, 1]
+    assert batches[0].dtype.names == ('x', 'y')
+    expected = {(x, y) for x in range(3) for y in range(3)}
+    assert rows_of(batches) == expected
+    n = sum(len(b) for b in batches)
+    assert n == len(expected)
+
+
+def test_assignments_type_correct():
+    aut = small_automaton()
+    # `y` has 2 bits, so the value 3 is excluded
+    u = aut.add_expr('x = 4')
+    batches = list(stream.assignments(u, ['x', 'y'], aut))
+    assert rows_of(batches) == {(4, 0), (4, 1), (4, 2)}
+
+
+def test_dump_npy(tmp_path):
+    aut = small_automaton()
+    u = aut.add_expr(r'x \in 0..4 /\ y = 2')
+    prefix = str(tmp_path / 'states')
+    n = stream.dump_npy(u, ['x', 'y'], aut, prefix, batch_size=2)
+    assert n == 3
+    batches = [
+        np.load('{p}_{k:05}.npy'.format(p=prefix, k=k))
+        for k in range(n)]
+    assert rows_of(batches) == {(x, 2) for x in range(5)}
+    assert stream.dump_npy(aut.false, ['x'], aut, prefix) == 0
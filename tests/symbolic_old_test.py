@@ -0,0 +1,38 @@
+"""Tests of the interleaving automaton."""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import copy
+
+import symbolic_old
+
+
+def make_automaton():
+    aut = symbolic_old.Automaton()
+    aut.bdd.add_var('x')
+    aut.bdd.add_var('y')
+    aut.vars = dict(x=dict(type='bool', owner='a'))
+    return aut
+
+
+def test_add_expr_cache():
+    aut = make_automaton()
+    u = aut.add_expr('x')
+    assert aut.add_expr('x') is u
+    assert len(aut._expr_cache) == 1
+    # new declarations, new entries
+    aut.add_vars(dict(y=dict(type='bool', owner='a')))
+    assert aut.add_expr('x') == u
+    assert len(aut._expr_cache) == 2
+    aut.vars = dict(aut.vars)
+    aut.add_expr('x')
+    assert len(aut._expr_cache) == 3
+
+
+def test_copy_shares_declarations_version():
+    aut = make_automaton()
+    u = aut.add_expr('x')
+    other = copy.copy(aut)
+    assert other.add_expr('x') is u
+    other.add_vars(dict(y=dict(type='bool', owner='a')))
+    assert other._vars_version != aut._vars_version
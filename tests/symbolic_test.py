@@ -0,0 +1,159 @@
+"""Tests of symbolic automata."""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import copy
+
+import fixpoint_noninterleaving as fx
+import symbolic as sym
+
+
+def turn_automaton():
+    """Return automaton of two players that move in turns."""
+    aut = sym.Automaton()
+    aut.players = dict(a=1, b=2, scheduler=None)
+    aut.declare_variables(x=(0, 3), y=(0, 3), _i=(1, 2))
+    aut.varlist = dict(a=['x'], b=['y'], scheduler=['_i'])
+    s = r'''
+        ANext ==
+            /\ x \in 0..3 /\ x' \in 0..3
+            /\ ((_i = 1) => (x' = x + 1 \/ (x = 3 /\ x' = 0)))
+            /\ ((_i != 1) => (x' = x))
+
+        BNext ==
+            /\ y \in 0..3 /\ y' \in 0..3
+            /\ ((_i = 2) => (y' = x))
+            /\ ((_i != 2) => (y' = y))
+
+        SchedulerNext ==
+            /\ _i \in 1..2
+            /\ ((_i = 1) => (_i' = 2))
+            /\ ((_i = 2) => (_i' = 1))
+        '''
+    aut.define(s)
+    aut.init_expr = dict(a='x = 0', b='y = 0', scheduler='_i = 1')
+    aut.action_expr = dict(a='ANext', b='BNext', scheduler='SchedulerNext')
+    aut.win_expr = dict(
+        a={'[]<>': ['TRUE']},
+        b={'[]<>': ['TRUE']},
+        scheduler={'[]<>': ['TRUE']})
+    aut.build()
+    return aut
+
+
+def preimage(target, aut):
+    """Return predecessors of `target`, without slicing."""
+    action = sym.conj_actions_of(aut.players, aut)
+    vrs = aut.vars_of_all_players
+    u = aut.replace_with_primed(vrs, target) & action
+    return aut.exist(aut.prime_vars(vrs), u)
+
+
+def test_turn_actions():
+    aut = turn_automaton()
+    table = aut.turn_actions()
+    assert set(table) == {1, 2}
+    action = sym.conj_actions_of(aut.players, aut)
+    u = aut.cofactor_turn(action, turn=1, next_turn=2)
+    assert table[1] == u
+    # computed once
+    assert aut.turn_actions() is table
+
+
+def test_turn_preimage():
+    aut = turn_automaton()
+    for s in (r'y = 2 /\ _i = 1', 'x = 0', r'x = y /\ _i = 2'):
+        target = aut.add_expr(s)
+        assert fx.preimage(target, aut) == preimage(target, aut)
+    target = aut.add_expr(r'y = 2 /\ _i = 1')
+    assert fx.preimage(target, aut) == aut.add_expr(r'x = 2 /\ _i = 2')
+
+
+def test_cofactor_turn_table():
+    aut = turn_automaton()
+    inv = aut.add_expr(r'x <= y \/ _i = 1')
+    u = aut.cofactor_turn(inv, turn=1)
+    assert u == aut.true
+    table = aut._turn_cofactors
+    assert (inv, 1, None) in table.memo
+    assert aut.cofactor_turn(inv, turn=1) == u
+    # iterates are not remembered
+    v = aut.cofactor_turn(inv, turn=2, memoize=False)
+    assert (inv, 2, None) not in table.memo
+    assert v == aut.add_expr('x <= y')
+    # copies share the table
+    other = copy.copy(aut)
+    assert other._turn_table() is table
+    # editing an action empties the table
+    slices = aut.turn_actions()
+    aut.action['a'] &= aut.add_expr("(_i = 1) => (x' != 0)")
+    assert aut._turn_table() is not table
+    new_slices = aut.turn_actions()
+    assert new_slices[1] != slices[1]
+    assert new_slices[2] == slices[2]
+    assert other.turn_actions() is slices
+
+
+def test_cofactor_turn_bounded(monkeypatch):
+    monkeypatch.setattr(sym, 'TURN_COFACTORS', 2)
+    aut = turn_automaton()
+    for s in ('x = 0', 'x = 1', 'x = 2'):
+        u = aut.add_expr(r'{s} /\ _i = 1'.format(s=s))
+        aut.cofactor_turn(u, turn=1)
+    assert len(aut._turn_cofactors.memo) == 2
+
+
+def test_lazy_map_converts_on_read():
+    aut = turn_automaton()
+    aut.build()
+    pending = dict.items(aut.action)
+    assert all(isinstance(v, sym._Pending) for _, v in pending)
+    d = dict(aut.action)
+    assert set(d) == set(aut.players)
+    assert not any(isinstance(v, sym._Pending) for v in d.values())
+    aut.build()
+    d = {**aut.init}
+    assert d['a'] == aut.add_expr('x = 0')
+    other = aut.win.copy()
+    assert isinstance(other, sym._LazyMap)
+    assert other['a'] == {'[]<>': [aut.true]}
+
+
+def test_copy_converts_with_copy():
+    aut = turn_automaton()
+    aut.build()
+    other = copy.copy(aut)
+    aut.clear_expr_cache()
+    other.clear_expr_cache()
+    u = other.init['b']
+    assert u == aut.add_expr('y = 0')
+    # converted by `other`, so cached by `other`
+    assert ('y = 0', False) in other._expr_cache
+    assert isinstance(dict.get(aut.init, 'b'), sym._Pending)
+
+
+def test_normalize_expr():
+    s = r'''
+        /\  x = 1
+            /\ y  =   2   \* comment
+
+        '''
+    t = sym._normalize_expr(s)
+    assert t == '/\\ x = 1\n/\\ y = 2 \\* comment'
+    assert sym._normalize_expr('x  =\t1') == 'x = 1'
+
+
+def test_add_expr_cache_bounded(monkeypatch):
+    monkeypatch.setattr(sym, 'EXPR_CACHE', 2)
+    aut = turn_automaton()
+    aut.clear_expr_cache()
+    u = aut.add_expr('x = 0')
+    assert aut.add_expr(' x  =  0 ') is u
+    aut.add_expr('x = 1')
+    # `x = 0` is the most recently used
+    aut.add_expr('x = 0')
+    aut.add_expr('x = 2')
+    assert list(aut._expr_cache) == [('x = 0', False), ('x = 2', False)]
+    # declarations clear the cache
+    aut.declare_variables(z=(0, 1))
+    assert not aut._expr_cache
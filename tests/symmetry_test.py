@@ -0,0 +1,124 @@
+"""Tests of symmetry reduction."""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+import closure_noninterleaving as _closure
+import cpre_noninterleaving as cpre
+import fixpoint_noninterleaving as fx
+import symbolic as sym
+import symmetry
+
+
+def symmetric_automaton():
+    """Return automaton of two interchangeable counters and a toggle."""
+    aut = sym.Automaton()
+    aut.players = dict(a=0, b=1, c=2)
+    aut.declare_variables(x=(0, 2), y=(0, 2), z=(0, 1))
+    aut.varlist = dict(a=['x'], b=['y'], c=['z'])
+    s = r'''
+        ANext ==
+            /\ x \in 0..2 /\ x' \in 0..2
+            /\ \/ x' = x
+               \/ x' = x + 1
+               \/ (x = 2 /\ x' = 0)
+            /\ ((y = 2) => (x' != 2))
+
+        BNext ==
+            /\ y \in 0..2 /\ y' \in 0..2
+            /\ \/ y' = y
+               \/ y' = y + 1
+               \/ (y = 2 /\ y' = 0)
+            /\ ((x = 2) => (y' != 2))
+
+        CNext ==
+            /\ z \in 0..1 /\ z' \in 0..1
+            /\ ((x = y) => (z' = 1 - z))
+            /\ ((x != y) => (z' = z))
+        '''
+    aut.define(s)
+    aut.init_expr = dict(a='x = 0', b='y = 0', c='z = 0')
+    aut.action_expr = dict(a='ANext', b='BNext', c='CNext')
+    aut.win_expr = dict(
+        a={'[]<>': ['x = 2']},
+        b={'[]<>': ['y = 2']},
+        c={'[]<>': ['z = 0']})
+    aut.build()
+    return aut
+
+
+def test_declare():
+    aut = symmetric_automaton()
+    symmetry.declare(aut, [['a', 'b']])
+    assert aut.symmetry == [['a', 'b']]
+    assert list(symmetry.generators(aut)) == [('a', 'b')]
+    canon = symmetry.canonical(aut)
+    assert canon == aut.add_expr('x <= y')
+
+
+def test_closure_on_representatives():
+    aut = symmetric_automaton()
+    players = list(aut.players)
+    expected = _closure.closure(players, aut, engine='bdd')
+    symmetry.declare(aut, [['a', 'b']])
+    z = _closure.closure(players, aut, engine='bdd')
+    assert z == expected
+    assert z != aut.false
+    assert symmetry.is_symmetric(z, aut)
+
+
+def test_preimage_on_representatives():
+    aut = symmetric_automaton()
+    symmetry.declare(aut, [['a', 'b']])
+    canon = symmetry.canonical(aut)
+    for s in (r'x = 2 \/ y = 2', 'x = y', r'x + y = 1 /\ z = 1'):
+        u = aut.add_expr(s)
+        assert symmetry.is_symmetric(u, aut)
+        pre = fx.preimage(u, aut)
+        assert symmetry.preimage(u & canon, aut) == pre & canon
+
+
+def step_fixpoint(target, aut):
+    q = target
+    qold = None
+    while q != qold:
+        qold = q
+        q |= cpre.step(q, aut)
+    return q
+
+
+def test_attractor_on_representatives():
+    for team in (['a', 'b'], ['c']):
+        aut = symmetric_automaton()
+        symmetry.declare(aut, [['a', 'b']])
+        cpre.group_as_env_sys(team, aut)
+        target = aut.add_expr(r'x = 2 /\ y = 2')
+        assert cpre._is_symmetric(target, aut)
+        canon = symmetry.canonical(aut)
+        u = aut.add_expr(r'(x = 2 \/ y = 2) /\ z = 0')
+        assert (
+            cpre.symmetric_step(u & canon, aut) ==
+            cpre.step(u, aut) & canon)
+        q = symmetry.least_fixpoint(
+            cpre.symmetric_step, target & canon, aut)
+        expected = step_fixpoint(target, aut)
+        assert symmetry.orbit(q, aut) == expected
+        assert expected != target
+
+
+def test_is_symmetric_stored(monkeypatch):
+    aut = symmetric_automaton()
+    symmetry.declare(aut, [['a', 'b']])
+    cpre.group_as_env_sys(['a', 'b'], aut)
+    target = aut.add_expr('x = y')
+    assert cpre._is_symmetric(target, aut)
+
+    def fail(*arg, **kw):
+        raise AssertionError('actions checked again')
+
+    monkeypatch.setattr(symmetry, 'applies', fail)
+    assert cpre._is_symmetric(target, aut)
+    assert not cpre._is_symmetric(aut.add_expr('x = 0'), aut)
+    # a different team changes the actions
+    monkeypatch.undo()
+    cpre.group_as_env_sys(['a'], aut)
+    assert not cpre._is_symmetric(target, aut)
@@ -0,0 +1,79 @@
+"""Tests of counterexample traces."""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+from explicit_test import small_automaton
+import fixpoint_noninterleaving as fx
+import symbolic as sym
+import witness
+
+
+def test_shortest_trace():
+    aut = small_automaton()
+    init = sym.conj_init_of(aut.players, aut)
+    target = aut.add_expr('x = 3')
+    trace = witness.shortest_trace(init, target, aut)
+    assert [d['x'] for d in trace] == [0, 1, 2, 3]
+    assert trace[0]['y'] == 0
+    assert set(trace[0]) == {'x', 'y'}
+    # unreachable
+    target = aut.add_expr('y = 1')
+    assert witness.shortest_trace(init, target, aut) is None
+
+
+def test_witness_for_empty_closure_dead_end():
+    aut = small_automaton()
+    trace = witness.witness_for_empty_closure(aut)
+    assert trace[0] == dict(x=0, y=0)
+    u = witness.state_predicate(trace[-1], aut)
+    # a dead end, or a goal is lost
+    lost = fx.preimage(aut.true, aut) & u == aut.false
+    for player in aut.players:
+        for goal in aut.win[player]['[]<>']:
+            v = witness._closure.least_fixpoint(fx.preimage, goal, aut)
+            lost |= v & u == aut.false
+    assert lost
+
+
+def test_witness_for_empty_closure_last_iterate():
+    aut = small_automaton()
+    # `y` never changes to 1
+    aut.win['b']['[]<>'].append(aut.add_expr('y = 1'))
+    aut.init['a'] = aut.false
+    z, last = witness.last_closure_iterate(aut, fx.preimage)
+    assert z == aut.false
+    assert last != aut.false
+    trace = witness.witness_for_empty_closure(aut)
+    assert len(trace) == 1
+    u = witness.state_predicate(trace[0], aut)
+    assert u & last != aut.false
+
+
+def test_witness_for_nonempty_closure():
+    aut = small_automaton()
+    z, last = witness.last_closure_iterate(aut, fx.preimage)
+    assert z != aut.false
+    assert last == z
+
+
+def test_witness_for_not_inductive():
+    aut = small_automaton()
+    init = aut.add_expr(r'x = 0 /\ y = 0')
+    action = aut.add_expr(r'''
+        /\ ((x = 2) => (x' = 3))
+        /\ ((x != 2) => (x' = x))
+        /\ (y' = y)
+        ''')
+    # inductive
+    inv = aut.add_expr('x = 0')
+    trace = witness.witness_for_not_inductive(inv, init, action, aut)
+    assert trace is None
+    # reachable violation
+    init = aut.add_expr(r'x = 2 /\ y = 0')
+    inv = aut.add_expr(r'x = 0 \/ x = 2')
+    trace = witness.witness_for_not_inductive(inv, init, action, aut)
+    assert trace == [dict(x=2, y=0), dict(x=3, y=0)]
+    # unreachable violation
+    init = aut.add_expr(r'x = 0 /\ y = 1')
+    trace = witness.witness_for_not_inductive(inv, init, action, aut)
+    assert [d['x'] for d in trace] == [2, 3]
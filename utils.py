@@ -6,14 +6,12 @@ import logging
 import os
 import textwrap
 
-import ballpark
-import humanize
 from omega.symbolic import bdd as sym_bdd
 
 import symbolic as sym
 
 
-TURN = '_i'
+TURN = sym.TURN
 
 
 def check_support_inv_target(target, inv, aut):
@@ -33,19 +31,36 @@ def check_support_inv_target(target, inv, aut):
     assert sym_bdd.support_issubset(inv, vrs, aut)
 
 
-def assert_is_inductive_inv(inv, init, action, aut):
-    """Assert `inv` is inductive invariant wrt `init, action`."""
+def assert_is_inductive_inv(inv, init, action, aut, witness=False):
+    """Assert `inv` is inductive invariant wrt `init, action`.
+
+    @param witness: if `True`, then on failure include in
+        the message a shortest trace from `init` that
+        leaves `inv`, see `witness.witness_for_not_inductive`
+    """
     # init => inv
     assert init != aut.false, 'vacuous'
     u = inv | ~ init
-    assert u == aut.true, u
+    assert u == aut.true, _inductive_witness(
+        u, inv, init, action, aut, witness)
     # (inv /\ action) => inv
     inv_next = sym_bdd.prime(inv)
     u = inv & action
     assert u != aut.false, 'vacuous'
     u = inv_next | ~ u
     u = aut.forall(aut.vars_of_all_players, u)
-    assert u == aut.true, u
+    assert u == aut.true, _inductive_witness(
+        u, inv, init, action, aut, witness)
+
+
+def _inductive_witness(u, inv, init, action, aut, witness):
+    """Return assertion message for `assert_is_inductive_inv`."""
+    if not witness:
+        return u
+    import witness as _witness
+    trace = _witness.witness_for_not_inductive(inv, init, action, aut)
+    return 'not an inductive invariant, witness:\n{t}'.format(
+        t=_witness.format_trace(trace))
 
 
 def diagnose_not_inductive_inv(inv, action, aut):
@@ -141,6 +156,9 @@ def configure_loggers(loggers, level):
 
 def format_stats(d):
     """Return `str` of formatted BDD statistics `d`."""
+    # imported here, because only reports need them
+    import ballpark
+    import humanize
     s = (
         'Manager\n'
         '    bits: {n_vars}\n'
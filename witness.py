@@ -0,0 +1,188 @@
+"""Shortest counterexample traces from onion rings.
+
+A least fixpoint that records the states added at each
+iteration (onion rings) contains the distance of each state
+to the target. A shortest trace is extracted by picking one
+state in the ring nearest to the source, and then one
+successor in each next ring closer to the target.
+Only single states are enumerated, never whole sets.
+"""
+# Copyright 2017 by California Institute of Technology
+# All rights reserved. Licensed under BSD-3.
+#
+from omega.logic import syntax as stx
+
+import closure_noninterleaving as _closure
+import fixpoint_noninterleaving
+import symbolic as sym
+
+
+TURN = sym.TURN
+
+
+def shortest_trace(source, target, aut, image=None, preimage=None):
+    """Return shortest sequence of states from `source` to `target`.
+
+    Return `None` if `target` is unreachable from `source`.
+    Each state is a `dict` that maps variables to values.
+
+    @param image, preimage: functions with signature
+        `(u, aut)`, by default those of
+        `fixpoint_noninterleaving`
+    """
+    if image is None:
+        image = fixpoint_noninterleaving.image
+    if preimage is None:
+        preimage = fixpoint_noninterleaving.preimage
+    rings = list()
+    _closure.least_fixpoint(preimage, target, aut, rings=rings)
+    # nearest ring that intersects `source`
+    start = None
+    for k, ring in enumerate(rings):
+        if ring & source != aut.false:
+            start = k
+            break
+    if start is None:
+        return None
+    vrs = state_vars(aut)
+    state = aut.pick(rings[start] & source, care_vars=vrs)
+    trace = [state]
+    for ring in reversed(rings[:start]):
+        u = state_predicate(state, aut)
+        post = image(u, aut) & ring
+        assert post != aut.false, state
+        state = aut.pick(post, care_vars=vrs)
+        trace.append(state)
+    return trace
+
+
+def witness_for_empty_closure(aut, image=None, preimage=None):
+    """Return shortest trace from `init` to where a goal is lost.
+
+    The trace ends at a dead end, or at a state from where
+    some recurrence goal is unreachable.
+
+    If no such state is reachable, but the closure is empty,
+    then the goals are reachable, but not repeatedly. Then
+    the trace ends in the last nonempty iterate of the
+    closure, where each state can reach some goal only by
+    leaving the iterate, see `last_closure_iterate`. If that
+    iterate is unreachable from `init`, then the trace is
+    one state of the iterate.
+
+    Return `None` if the closure is nonempty.
+
+    @param image, preimage: as for `shortest_trace`
+    """
+    if preimage is None:
+        preimage = fixpoint_noninterleaving.preimage
+    init = sym.conj_init_of(aut.players, aut)
+    alive = preimage(aut.true, aut)
+    lost = ~ alive
+    for player in aut.players:
+        for goal in aut.win[player].get('[]<>', list()):
+            reach = _closure.least_fixpoint(preimage, goal, aut)
+            lost |= ~ reach
+    trace = shortest_trace(
+        init, lost, aut, image=image, preimage=preimage)
+    if trace is not None:
+        return trace
+    z, last = last_closure_iterate(aut, preimage)
+    if z != aut.false:
+        return None
+    trace = shortest_trace(
+        init, last, aut, image=image, preimage=preimage)
+    if trace is not None:
+        return trace
+    return [aut.pick(last, care_vars=state_vars(aut))]
+
+
+def last_closure_iterate(aut, preimage):
+    """Return closure and its last nonempty iterate.
+
+    Same fixpoint as `closure_noninterleaving.closure`,
+    with predecessors computed by `preimage`.
+    If the closure is nonempty, then it is the last
+    nonempty iterate.
+    """
+    z = aut.true
+    last = z
+    zold = None
+    while z != zold:
+        zold = z
+        z_pre = preimage(zold, aut)
+        for player in aut.players:
+            for goal in aut.win[player].get('[]<>', list()):
+                target = z_pre & goal
+                z &= _closure.least_fixpoint(preimage, target, aut)
+                if z == aut.false:
+                    return z, last
+                last = z
+    return z, last
+
+
+def witness_for_not_inductive(inv, init, action, aut):
+    """Return shortest trace from `init` that leaves `inv`.
+
+    The last state of the trace violates `inv`. If no
+    violation is reachable from `init`, but `inv` is not
+    inductive, then the trace is a step from a state in
+    `inv`, unreachable from `init`, to a state outside `inv`.
+    Return `None` if `inv` is an inductive invariant
+    (that `init` implies).
+    """
+    vrs = state_vars(aut)
+    vrs_p = aut.prime_vars(vrs)
+
+    def image(u, aut):
+        u = aut.exist(vrs, u & action)
+        return aut.replace_with_unprimed(vrs, u)
+
+    def preimage(u, aut):
+        u = aut.replace_with_primed(vrs, u)
+        return aut.exist(vrs_p, u & action)
+
+    # steps only within `inv`
+    trace = shortest_trace(
+        init, ~ inv, aut,
+        image=lambda u, aut: image(u & inv, aut),
+        preimage=lambda u, aut: inv & preimage(u, aut))
+    if trace is not None:
+        return trace
+    # unreachable step that leaves `inv`
+    return shortest_trace(
+        inv, ~ inv, aut, image=image,
+        preimage=lambda u, aut: inv & preimage(u, aut))
+
+
+def state_vars(aut):
+    """Return variables of states, including `TURN` if declared."""
+    vrs = set(aut.vars_of_all_players)
+    if TURN in aut.vars:
+        vrs.add(TURN)
+    return vrs
+
+
+def state_predicate(state, aut):
+    """Return BDD of the conjunction of `state` assignments."""
+    c = list()
+    for var, value in state.items():
+        if aut.vars[var]['type'] == 'bool':
+            s = var if value else '~ {var}'.format(var=var)
+        else:
+            s = '{var} = {value}'.format(var=var, value=value)
+        c.append(s)
+    return aut.add_expr(stx.conj(c))
+
+
+def format_trace(trace):
+    """Return `str` with one line per state in `trace`."""
+    if trace is None:
+        return 'no witness found'
+    lines = list()
+    for k, state in enumerate(trace):
+        s = ', '.join(
+            '{var} = {value}'.format(var=var, value=state[var])
+            for var in sorted(state))
+        lines.append('{k}: {s}'.format(k=k, s=s))
+    return '\n'.join(lines)